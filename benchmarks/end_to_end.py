@@ -0,0 +1,129 @@
+"""
+Benchmark the whole action end to end against a local fake GitHub API and Slack.
+
+For each push size and lookup backend, `action.main` runs in a fresh process against
+`benchmarks.fake_github`, checking a push event of that many commits and sending its
+messages to the fake Slack webhook. The table reports the wall time of `action.main`,
+the requests served by the fake and the peak memory (maximum RSS) of the process.
+
+Run from the repository root with:
+
+    python -m benchmarks.end_to_end --commits 1 100 10000 --latency 0.05 --jitter 0.02
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import fake_github
+
+
+def main() -> int:
+    """Run the benchmark and print a results table."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--commits", type=int, nargs="*", default=[1, 10, 100, 1000])
+    parser.add_argument("--lookup", nargs="*", default=["rest", "graphql", "compare"])
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--transport", default="requests")
+    parser.add_argument("--run-action", action="store_true", help=argparse.SUPPRESS)
+    fake_github.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.run_action:
+        return run_action()
+
+    fake = fake_github.create(args).start()
+    print(
+        f"{'commits':>8} {'lookup':>8} {'seconds':>8} {'requests':>9} "
+        f"{'errors':>7} {'peak MB':>8} {'unverified':>11}"
+    )
+    try:
+        for commits in args.commits:
+            for lookup in args.lookup:
+                fake.reset_counts()
+                result = run(fake, args, commits=commits, lookup=lookup)
+                counts = dict(fake.counts)
+                errors = sum(n for route, n in counts.items() if "failed" in route)
+                requests = sum(counts.values()) - counts.get("slack", 0)
+                print(
+                    f"{commits:>8} {lookup:>8} {result['seconds']:>8.2f} "
+                    f"{requests:>9} {errors:>7} {result['peak_rss_kb'] / 1024:>8.1f} "
+                    f"{result['unverified']:>11}"
+                )
+    finally:
+        fake.stop()
+    return 0
+
+
+def run(
+    fake: fake_github.FakeGitHub, args: argparse.Namespace, *, commits: int, lookup: str
+) -> dict:
+    """Run the action in a fresh process on a push of `commits` commits."""
+    with tempfile.TemporaryDirectory() as directory:
+        event_path = os.path.join(directory, "event.json")
+        result_path = os.path.join(directory, "result.json")
+        with open(event_path, "w", encoding="utf-8") as file:
+            json.dump(push_event(commits), file)
+
+        env = {
+            **os.environ,
+            "GITHUB_API_URL": fake.url,
+            "GITHUB_GRAPHQL_URL": f"{fake.url}/graphql",
+            "GITHUB_REPOSITORY": fake_github.REPO,
+            "GITHUB_EVENT_NAME": "push",
+            "GITHUB_EVENT_PATH": event_path,
+            "GITHUB_TOKEN": "benchmark-token",
+            "LOOKUP_BACKEND": lookup,
+            "FETCH_CONCURRENCY": str(args.concurrency),
+            "HTTP_TRANSPORT": args.transport,
+            "MESSAGE_BACKEND": "slack",
+            "SLACK_WEBHOOK_URL": f"{fake.url}/slack",
+            "BENCHMARK_RESULT_PATH": result_path,
+        }
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.end_to_end", "--run-action"],
+            env=env,
+            check=True,
+        )
+        with open(result_path, encoding="utf-8") as file:
+            return json.load(file)
+
+
+def push_event(commits: int) -> dict:
+    """
+    A push event of `commits` commits of the fake repository, after its first commit
+    (commit 0 would have the null SHA of a new branch).
+    """
+    shas = [f"{number:040x}" for number in range(1, commits + 2)]
+    return {
+        "before": shas[0],
+        "after": shas[-1],
+        "commits": [{"id": sha} for sha in shas[1:]],
+    }
+
+
+def run_action() -> int:
+    """Run `action.main` in this process and write its measurements to a file."""
+    # pylint: disable=import-outside-toplevel
+    from src import action
+
+    start = time.perf_counter()
+    unverified = action.main()
+    seconds = time.perf_counter() - start
+
+    result = {
+        "seconds": seconds,
+        "unverified": unverified,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+    with open(os.environ["BENCHMARK_RESULT_PATH"], "w", encoding="utf-8") as file:
+        json.dump(result, file)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
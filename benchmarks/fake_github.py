@@ -0,0 +1,283 @@
+"""
+A local stand-in for the GitHub REST and GraphQL APIs and a Slack webhook.
+
+The fake repository's history is a chain of commits whose SHAs are their position in
+the chain, so any push can be described without storing it: commit `n` has the SHA
+`f"{n:040x}"`. Every `unverified_every`-th commit is unverified, and commits are shared
+between `authors` authors.
+
+Responses can be delayed by a `latency` with random `jitter`, carry `X-RateLimit-*`
+headers counting down a request budget, and fail with a `502` at an `error_rate`.
+
+Run it on its own from the repository root with:
+
+    python -m benchmarks.fake_github --port 8080 --latency 0.05
+"""
+import argparse
+import collections
+import json
+import math
+import random
+import sys
+import threading
+import time
+from http import server
+from typing import Any, Dict, Optional, Tuple
+from urllib import parse
+
+REPO = "benchmark/repo"
+PAGE_SIZE = 100
+
+
+class FakeGitHub(server.ThreadingHTTPServer):
+    """An HTTP server serving the fake APIs, counting the requests to each."""
+
+    # pylint: disable=too-many-instance-attributes
+
+    daemon_threads = True
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        *,
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: Optional[int] = None,
+        rate_limit_window: float = 3600.0,
+        unverified_every: int = 10,
+        authors: int = 10,
+        seed: int = 0,
+    ):
+        super().__init__(("127.0.0.1", port), Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self.unverified_every = unverified_every
+        self.authors = authors
+
+        self.random = random.Random(seed)
+        self.counts: Dict[str, int] = collections.Counter()
+        self.lock = threading.Lock()
+        self.remaining = rate_limit
+        self.reset_at = math.ceil(time.time() + rate_limit_window)
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """The base URL of the fake APIs."""
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "FakeGitHub":
+        """Serve requests on a background thread."""
+        self.thread = threading.Thread(
+            target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving requests."""
+        self.shutdown()
+        self.server_close()
+
+    def reset_counts(self):
+        """Forget the requests counted so far."""
+        with self.lock:
+            self.counts.clear()
+
+    def commit(self, number: int) -> dict:
+        """The REST API commit object of commit `number`."""
+        sha = f"{number:040x}"
+        author = f"user{number % self.authors}"
+        return {
+            "sha": sha,
+            "html_url": f"https://github.com/{REPO}/commit/{sha}",
+            "author": {"login": author},
+            "commit": {
+                "author": {"name": author},
+                "verification": {"verified": number % self.unverified_every != 0},
+            },
+        }
+
+    def graphql_commit(self, sha: str) -> dict:
+        """The `VerifiedCommit` GraphQL node of the commit with `sha`."""
+        commit = self.commit(int(sha, 16))
+        return {
+            "oid": commit["sha"],
+            "url": commit["html_url"],
+            "signature": {"isValid": commit["commit"]["verification"]["verified"]},
+            "author": {"name": commit["commit"]["author"]["name"], "user": None},
+        }
+
+    def admit(self) -> Tuple[int, Dict[str, str]]:
+        """
+        Count a request against the rate limit and decide whether it fails.
+
+        Returns the status code to fail the request with, or 0, and the rate limit
+        headers to send.
+        """
+        with self.lock:
+            delay = max(0.0, self.latency + self.random.uniform(-1, 1) * self.jitter)
+            failed = self.random.random() < self.error_rate
+            if self.rate_limit is None or self.remaining is None:
+                headers: Dict[str, str] = {}
+                limited = False
+            else:
+                now = time.time()
+                if now >= self.reset_at:
+                    self.remaining = self.rate_limit
+                    self.reset_at = math.ceil(now + self.rate_limit_window)
+                limited = self.remaining <= 0
+                self.remaining = max(0, self.remaining - 1)
+                headers = {
+                    "X-RateLimit-Limit": str(self.rate_limit),
+                    "X-RateLimit-Remaining": str(self.remaining),
+                    "X-RateLimit-Reset": str(self.reset_at),
+                }
+
+        time.sleep(delay)
+        if limited:
+            return 403, headers
+        return (502 if failed else 0), headers
+
+
+class Handler(server.BaseHTTPRequestHandler):
+    """Serve a request to the fake APIs."""
+
+    protocol_version = "HTTP/1.1"
+    server: FakeGitHub
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handle a GET request."""
+        self.handle_api()
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handle a POST request."""
+        self.handle_api()
+
+    def handle_api(self):
+        """Route the request to the fake API it is for."""
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"null")
+        url = parse.urlsplit(self.path)
+        query = dict(parse.parse_qsl(url.query))
+        parts = url.path.strip("/").split("/")
+
+        if parts[0] == "slack":
+            self.count("slack")
+            self.reply(200, "ok")
+            return
+
+        status, headers = self.server.admit()
+        if status:
+            self.count(f"failed {status}")
+            message = "API rate limit exceeded" if status == 403 else "Bad Gateway"
+            self.reply(status, {"message": message}, headers)
+            return
+
+        if parts == ["graphql"]:
+            self.count("graphql")
+            self.reply(200, self.graphql(body), headers)
+        elif len(parts) == 4 and parts[3] == "commits":
+            self.count("commit")
+            self.reply(200, [self.server.commit(int(query["sha"], 16))], headers)
+        elif len(parts) == 5 and parts[3] == "compare":
+            self.count("compare")
+            self.compare(parts[4], query, headers)
+        else:
+            self.count("not found")
+            self.reply(404, {"message": "Not Found"}, headers)
+
+    def graphql(self, body: dict) -> dict:
+        """Answer a `GitHubApiClient.get_commits` query."""
+        variables = body["variables"]
+        nodes = {
+            f"c{name[3:]}": self.server.graphql_commit(sha)
+            for name, sha in variables.items()
+            if name.startswith("oid")
+        }
+        return {"data": {"repository": nodes}}
+
+    def compare(self, spec: str, query: Dict[str, str], headers: Dict[str, str]):
+        """Answer a page of the compare API for `{base}...{head}`."""
+        base, head = (int(sha, 16) for sha in spec.split("..."))
+        per_page = int(query.get("per_page", PAGE_SIZE))
+        page = int(query.get("page", 1))
+        first = base + 1 + (page - 1) * per_page
+        last = min(head, first + per_page - 1)
+        commits = [self.server.commit(number) for number in range(first, last + 1)]
+
+        if last < head:
+            next_query = parse.urlencode({**query, "page": page + 1})
+            next_url = f"{self.server.url}{parse.urlsplit(self.path).path}?{next_query}"
+            headers = {**headers, "Link": f'<{next_url}>; rel="next"'}
+        self.reply(200, {"total_commits": head - base, "commits": commits}, headers)
+
+    def count(self, route: str):
+        """Count a request to `route`."""
+        with self.server.lock:
+            self.server.counts[route] += 1
+
+    def reply(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None):
+        """Send a JSON response."""
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keep the output quiet."""
+
+
+def main() -> int:
+    """Run the fake APIs until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    add_arguments(parser)
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    fake = create(args, port=args.port)
+    print(f"Serving fake GitHub API at {fake.url}", file=sys.stderr)
+    try:
+        fake.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Add the options of the fake APIs to `parser`."""
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int)
+    parser.add_argument("--rate-limit-window", type=float, default=3600.0)
+    parser.add_argument("--unverified-every", type=int, default=10)
+    parser.add_argument("--authors", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def create(args: argparse.Namespace, *, port: int = 0) -> FakeGitHub:
+    """Create the fake APIs with the options parsed by `add_arguments`."""
+    return FakeGitHub(
+        port=port,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        rate_limit_window=args.rate_limit_window,
+        unverified_every=args.unverified_every,
+        authors=args.authors,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
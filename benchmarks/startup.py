@@ -0,0 +1,135 @@
+"""
+Benchmark the action's cold start with each HTTP transport.
+
+For each transport, fresh Python processes import the action, and separately start up
+and send their first GitHub API request to a local HTTP server, measuring the time
+from starting the process to the server receiving the request. With `--image` the
+same first request is also timed from `docker run` of the action's image.
+
+Run from the repository root with:
+
+    python -m benchmarks.startup --runs 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http import server
+from typing import Callable, List, Optional
+
+TRANSPORTS = ["requests", "stdlib"]
+
+IMPORT_SCRIPT = "import src.action"
+
+FIRST_REQUEST_SCRIPT = """
+import os
+from src import github
+client = github.GitHubApiClient("benchmark-token")
+client.base_url = os.environ["BENCHMARK_URL"]
+client.get_repository(repo="benchmark/repo")
+"""
+
+
+class Handler(server.BaseHTTPRequestHandler):
+    """Record when each request arrives and reply with an empty repository."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handle a GET request."""
+        self.server.arrivals.append(time.monotonic())  # type: ignore
+        body = b'{"default_branch": "main"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keep the benchmark output quiet."""
+
+
+def main() -> int:
+    """Run the benchmark and print a table of startup times."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--image", help="Also time `docker run` of this image")
+    args = parser.parse_args()
+
+    httpd = server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.arrivals = []  # type: ignore
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{httpd.server_address[1]}"
+
+    print(f"{'transport':>10} {'measure':>22} {'median ms':>10} {'min ms':>8}")
+    for transport in TRANSPORTS:
+        env = {**os.environ, "HTTP_TRANSPORT": transport, "BENCHMARK_URL": url}
+        measures = {
+            "import": lambda env=env: run_python(IMPORT_SCRIPT, env),
+            "first request": lambda env=env: first_request(
+                httpd, [sys.executable, "-c", FIRST_REQUEST_SCRIPT], env
+            ),
+        }
+        if args.image:
+            measures["container first request"] = lambda env=env: first_request(
+                httpd, docker_command(args.image, env), env
+            )
+
+        for name, measure in measures.items():
+            times = repeat(measure, args.runs)
+            print(
+                f"{transport:>10} {name:>22} {statistics.median(times) * 1000:>10.1f} "
+                f"{min(times) * 1000:>8.1f}"
+            )
+
+    httpd.shutdown()
+    return 0
+
+
+def repeat(measure: Callable[[], float], runs: int) -> List[float]:
+    """Take `runs` measurements, after a warm up run to fill the OS file cache."""
+    measure()
+    return [measure() for _ in range(runs)]
+
+
+def run_python(script: str, env: dict) -> float:
+    """Time a fresh Python process running `script`."""
+    start = time.monotonic()
+    subprocess.run([sys.executable, "-c", script], env=env, check=True)
+    return time.monotonic() - start
+
+
+def first_request(httpd: server.HTTPServer, command: List[str], env: dict) -> float:
+    """Time from starting `command` until the server receives its first request."""
+    arrivals: List[float] = httpd.arrivals  # type: ignore
+    arrivals.clear()
+    start = time.monotonic()
+    subprocess.run(command, env=env, check=True)
+    arrival: Optional[float] = arrivals[0] if arrivals else None
+    if arrival is None:
+        raise RuntimeError(f"{command[0]} finished without sending a request")
+    return arrival - start
+
+
+def docker_command(image: str, env: dict) -> List[str]:
+    """A `docker run` of the action's image sending the first request."""
+    return [
+        "docker",
+        "run",
+        "--rm",
+        "--network=host",
+        "--entrypoint=python3",
+        "-w=/opt/action",
+        f"-e=HTTP_TRANSPORT={env['HTTP_TRANSPORT']}",
+        f"-e=BENCHMARK_URL={env['BENCHMARK_URL']}",
+        image,
+        "-c",
+        FIRST_REQUEST_SCRIPT,
+    ]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Benchmark offline signature verification throughput against the number of workers.
+
+Builds a throwaway repository of SSH signed commits, then verifies every commit with
+`localgit.get_commits` using an increasing number of worker processes.
+
+Run from the repository root with:
+
+    python -m benchmarks.verify_signatures --commits 1000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent import futures
+from typing import List
+
+from src import localgit
+
+EMPTY_TREE = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+
+
+def main() -> int:
+    """Run the benchmark and print a throughput table."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--commits", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="*", default=default_workers())
+    parser.add_argument("--chunk-size", type=int, default=localgit.DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Creating {args.commits} signed commits...", file=sys.stderr)
+        repo_path, allowed_signers, shas = create_repository(directory, args.commits)
+        verifier = localgit.SignatureVerifier(allowed_signers=allowed_signers)
+
+        print(f"{'workers':>8} {'seconds':>9} {'commits/s':>10} {'speedup':>8}")
+        baseline = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            commits = localgit.get_commits(
+                repo="benchmark/repo",
+                shas=shas,
+                path=repo_path,
+                verifier=verifier,
+                workers=workers,
+            )
+            elapsed = time.perf_counter() - start
+            if not all(commit.verified for commit in commits):
+                raise RuntimeError("Benchmark commits failed verification")
+
+            baseline = baseline or elapsed
+            print(
+                f"{workers:>8} {elapsed:>9.2f} {len(shas) / elapsed:>10.1f} "
+                f"{baseline / elapsed:>7.2f}x"
+            )
+
+    return 0
+
+
+def default_workers() -> List[int]:
+    """Powers of two up to the number of CPU cores."""
+    workers = [1]
+    while workers[-1] * 2 <= (os.cpu_count() or 1):
+        workers.append(workers[-1] * 2)
+    return workers
+
+
+def create_repository(directory: str, count: int):
+    """
+    Create a repository in `directory` with a chain of `count` SSH signed commits.
+
+    Returns the repository path, the allowed signers file and the commit SHAs.
+    """
+    repo_path = os.path.join(directory, "repo")
+    key = os.path.join(directory, "key")
+    allowed_signers = os.path.join(directory, "allowed_signers")
+
+    subprocess.run(["git", "init", "-q", repo_path], check=True)
+    subprocess.run(
+        ["ssh-keygen", "-q", "-t", "ed25519", "-N", "", "-f", key], check=True
+    )
+    with open(f"{key}.pub", encoding="utf-8") as public_key:
+        with open(allowed_signers, "w", encoding="utf-8") as file:
+            file.write(f"bench@example.com {public_key.read()}")
+    subprocess.run(
+        ["git", "-C", repo_path, "hash-object", "-w", "-t", "tree", "/dev/null"],
+        check=True,
+        capture_output=True,
+    )
+
+    # Commits are independent root commits so they can be signed in parallel
+    payloads = [
+        (
+            f"tree {EMPTY_TREE}\n"
+            f"author Bench <bench@example.com> {1600000000 + i} +0000\n"
+            f"committer Bench <bench@example.com> {1600000000 + i} +0000\n"
+            f"\nBenchmark commit {i}\n"
+        ).encode()
+        for i in range(count)
+    ]
+    with futures.ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        objects = list(executor.map(lambda payload: sign(payload, key), payloads))
+
+    paths = []
+    for i, data in enumerate(objects):
+        path = os.path.join(directory, f"commit-{i}")
+        with open(path, "wb") as file:
+            file.write(data)
+        paths.append(path)
+
+    result = subprocess.run(
+        ["git", "-C", repo_path, "hash-object", "-w", "-t", "commit", "--stdin-paths"],
+        input="\n".join(paths).encode(),
+        check=True,
+        capture_output=True,
+    )
+    return repo_path, allowed_signers, result.stdout.decode().split()
+
+
+def sign(payload: bytes, key: str) -> bytes:
+    """Sign a commit `payload` with an SSH `key`, returning the signed commit object."""
+    result = subprocess.run(
+        ["ssh-keygen", "-Y", "sign", "-n", "git", "-f", key, "-q"],
+        input=payload,
+        check=True,
+        capture_output=True,
+    )
+    signature = result.stdout.decode().strip().replace("\n", "\n ")
+    headers, message = payload.decode().split("\n\n", 1)
+    return f"{headers}\ngpgsig {signature}\n\n{message}".encode()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
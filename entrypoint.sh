@@ -10,4 +10,10 @@
 set -eux
 
 cd /opt/action
-python3 -m src.action
+case "${CHECK_MODE:-push}" in
+    audit) python3 -m src.audit ;;
+    scan) python3 -m src.scan ;;
+    report) python3 -m src.report ;;
+    server) python3 -m src.server ;;
+    *) python3 -m src.action ;;
+esac
@@ -4,119 +4,623 @@ Verified Commtis Check GitHub Action.
 When run as a GitHub Action on every push to a repository, it can detect and check
 whenever a user pushes unverified commits to GitHub.
 """
+import contextlib
+import itertools
 import json
 import logging
 import os
 import sys
-from typing import Dict, List
-
-from . import github, messenger
+from concurrent import futures
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from . import (
+    cache,
+    github,
+    httpcache,
+    localgit,
+    messenger,
+    metrics,
+    pipeline,
+    profiling,
+)
 
 LOGGER = logging.getLogger("verified_commits_check")
 
+# The `before` SHA of a push event that created a new branch
+NULL_SHA = "0" * 40
+# Names of the pull request events the check can run on
+PULL_REQUEST_EVENTS = ("pull_request", "pull_request_target")
+
+
+def main():  # pylint: disable=too-many-locals,too-many-statements
+    """
+    Run the verified commits check and check on any unverified commits.
 
-def main():
-    """Run the verified commits check and check on any unverified commits."""
+    Returns 1 if any unverified commits were found, 0 otherwise.
+    """
     try:
         github_repository = os.environ["GITHUB_REPOSITORY"]
         github_event_path = os.environ["GITHUB_EVENT_PATH"]
         github_event_name = os.environ["GITHUB_EVENT_NAME"]
         github_token = os.environ["GITHUB_TOKEN"]
     except KeyError as ex:
-        LOGGER.error(f"Environment variable {ex} must be set")
+        LOGGER.error("Environment variable %s must be set", ex)
         raise ex
 
-    if github_event_name != "push":
+    if github_event_name != "push" and github_event_name not in PULL_REQUEST_EVENTS:
         LOGGER.error(
-            f"This action only supports push type events, not {github_event_name}"
+            "This action only supports push and pull request events, not %s",
+            github_event_name,
         )
         return 1
 
     event = load_event(github_event_path)
-    LOGGER.debug(f"Loaded event from {github_event_path}")
+    LOGGER.debug("Loaded event from %s", github_event_path)
+
+    lookup = os.environ.get("LOOKUP_BACKEND", "rest").lower()
+    commit_hashes: List[str] = []
+    repeated: Set[str] = set()
+    if github_event_name == "push":
+        new_only = commit_scope() == "new"
+        commit_hashes = get_commits_from_event(event, new_only=new_only)
+        LOGGER.debug("Event contained these hashes: %s", commit_hashes)
+        if new_only:
+            repeated = get_repeated_commits_from_event(event)
+        commit_range, lookup = select_commit_range(
+            event, lookup=lookup, new_only=new_only
+        )
+        pull_request = None
+    else:
+        pull_request, commit_range = get_pull_request_from_event(event)
+        LOGGER.debug("Event pull request: %s", pull_request)
+        if commit_range:
+            lookup = "compare"
+    LOGGER.debug("Event commit range: %s", commit_range)
+
+    concurrency = env_int("FETCH_CONCURRENCY", 1)
+    verification_cache = load_cache()
+    response_cache = load_response_cache()
+    github_client = github.GitHubApiClient(
+        github_token, pool_size=concurrency, response_cache=response_cache
+    )
+    fail_fast = env_flag("FAIL_FAST")
+    backend = select_backend()
+    if fail_fast and env_flag("DEFER_NOTIFICATIONS"):
+        # A later step without `FAIL_FAST` checks every commit and sends the messages
+        backend = pipeline.FanOut({})
+    notifier = pipeline.Notifier(
+        backend,
+        repo=github_repository,
+        batch_size=env_int("NOTIFY_BATCH_SIZE", pipeline.DEFAULT_BATCH_SIZE),
+        flush_interval=env_int(
+            "NOTIFY_FLUSH_INTERVAL", int(pipeline.DEFAULT_FLUSH_INTERVAL)
+        ),
+    )
+    with metrics.METRICS.phase("total"):
+        with backend, notifier:
+            with metrics.METRICS.phase("lookup"), contextlib.closing(
+                iter_unverified_commits(
+                    token=github_token,
+                    repo=github_repository,
+                    commit_hashes=commit_hashes,
+                    concurrency=concurrency,
+                    lookup=lookup,
+                    commit_range=commit_range,
+                    verification_cache=verification_cache,
+                    github_client=github_client,
+                    pull_request=pull_request,
+                    ordered=not fail_fast,
+                )
+            ) as unverified:
+                for commit in unverified:
+                    if commit.sha in repeated:
+                        continue
+                    LOGGER.debug(
+                        "Commit %s by %s is unverified", commit.sha, commit.author
+                    )
+                    notifier.put(commit)
+                    if fail_fast:
+                        LOGGER.info("Found an unverified commit, cancelling lookups")
+                        github_client.cancel()
+                        break
+        if verification_cache:
+            with metrics.METRICS.phase("save cache"):
+                verification_cache.save()
+        if response_cache:
+            with metrics.METRICS.phase("save cache"):
+                response_cache.save()
+    metrics.report("Verified commits check")
+
+    LOGGER.info("Found %s unverified commits", notifier.found)
+    return 1 if notifier.found else 0
+
+
+def send_messages(repo: str, grouped_commits: Dict[str, List[github.Commit]]):
+    """Send messages for the unverified commits."""
+    with select_backend() as backend:
+        backend(repo=repo, grouped_commits=grouped_commits)
 
-    commit_hashes = get_commits_from_event(event)
-    LOGGER.debug(f"Event contained these hashes: {commit_hashes}")
 
-    commits = get_unverified_commits(
-        token=github_token, repo=github_repository, commit_hashes=commit_hashes
+def select_backend() -> pipeline.FanOut:
+    """
+    Select the messaging backends based on the comma separated list of backend names
+    in the `MESSAGE_BACKEND` environment variable.
+
+    Messages are delivered to each backend concurrently, waiting at most
+    `MESSAGE_TIMEOUT` seconds for each backend at the end of the run.
+    """
+    backends = {
+        "console": messenger.send_batch_to_console,
+        "slack": messenger.send_batch_to_slack,
+        "webhook": messenger.send_batch_to_webhook,
+        "file": messenger.send_batch_to_file,
+    }
+
+    selected = {}
+    for name in os.environ.get("MESSAGE_BACKEND", "console").lower().split(","):
+        name = name.strip()
+        if name not in backends:
+            raise ValueError(f"Unknown message backend {name}")
+        selected[name] = backends[name]
+    LOGGER.debug("Selected messenger backends: %s", list(selected))
+
+    return pipeline.FanOut(
+        selected,
+        timeout=env_int("MESSAGE_TIMEOUT", int(pipeline.DEFAULT_DELIVERY_TIMEOUT)),
     )
-    LOGGER.debug(f"The following commits are unverified: {commits}")
 
-    grouped_commits = group_by_author(commits)
-    LOGGER.debug(f"Commits grouped by their author: {grouped_commits}")
 
-    send_messages(github_repository, grouped_commits)
+def group_by_author(
+    commits: List[github.Commit],
+) -> Dict[str, List[github.Commit]]:
+    """Group commits by their author."""
+    grouped: Dict[str, List[github.Commit]] = {}
+    with metrics.METRICS.timer("group_by_author"):
+        for commit in commits:
+            if commit.author not in grouped:
+                grouped[commit.author] = []
+            grouped[commit.author].append(commit)
+    return grouped
 
-    return len(commits)
 
+def get_unverified_commits(  # pylint: disable=too-many-arguments
+    *,
+    token: str,
+    repo: str,
+    commit_hashes: List[str],
+    concurrency: int = 1,
+    lookup: str = "rest",
+    commit_range: Optional[Tuple[str, str]] = None,
+    verification_cache: Optional[cache.VerificationCache] = None,
+    github_client: Optional[github.GitHubApiClient] = None,
+    pull_request: Optional[int] = None,
+) -> List[github.Commit]:
+    """
+    Get a subset commit_hashes that refer to unverified commits.
 
-def send_messages(repo: str, grouped_commits: Dict[str, dict]):
-    """Send messages for the unverified commits."""
-    backend = select_backend()
-    LOGGER.debug(f"Selected messenger backed: {backend}")
+    `token` should be a OAuth token to authenticate to GitHub.
+
+    `repo` should be the name of the GitHub repo to which the commits refer, in
+    `{owner}/{repo}` format.
 
-    for author, commits in grouped_commits.items():
-        backend(author=author, repo=repo, commits=commits)
+    `commit_hashes` should be a list of git hashes to check the verification status of.
+
+    `concurrency` is the maximum number of commit lookups to have in flight at once.
+
+    `lookup` selects how commits are fetched, either `rest` for one REST API request
+    per commit, `graphql` for batched GraphQL API requests, `compare` to list every
+    commit in `commit_range` through the compare API or `local` to verify the commits
+    offline from the local checkout.
+
+    `commit_range` is the `(before, after)` pair of SHAs of the push, when known.
 
+    `verification_cache`, when given, is checked before looking up each commit and is
+    updated with every commit that had to be looked up. It is not used by `local`
+    lookups.
 
-def select_backend():
+    `github_client`, when given, is used for the lookups instead of a new client for
+    `token`, so its connections and rate limit budget are shared with other checks.
+
+    `pull_request`, when given, is the number of a pull request whose commits are
+    checked instead of `commit_hashes`.
     """
-    Select the messaging backend function based on the `MESSAGE_BACKEND` environment
-    variable.
+    return list(
+        iter_unverified_commits(
+            token=token,
+            repo=repo,
+            commit_hashes=commit_hashes,
+            concurrency=concurrency,
+            lookup=lookup,
+            commit_range=commit_range,
+            verification_cache=verification_cache,
+            github_client=github_client,
+            pull_request=pull_request,
+        )
+    )
+
+
+def iter_unverified_commits(  # pylint: disable=too-many-arguments,too-many-locals
+    *,
+    token: str,
+    repo: str,
+    commit_hashes: List[str],
+    concurrency: int = 1,
+    lookup: str = "rest",
+    commit_range: Optional[Tuple[str, str]] = None,
+    verification_cache: Optional[cache.VerificationCache] = None,
+    github_client: Optional[github.GitHubApiClient] = None,
+    pull_request: Optional[int] = None,
+    ordered: bool = True,
+) -> Iterator[github.Commit]:
     """
-    message_backend = os.environ.get("MESSAGE_BACKEND", "console").lower()
-    if message_backend == "console":
-        return messenger.send_to_console
-    if message_backend == "slack":
-        return messenger.send_to_slack
+    Like `get_unverified_commits`, but yields each unverified commit as soon as it is
+    found, in push order.
 
-    raise ValueError(f"Unknown message backend {message_backend}")
+    Without `ordered`, commits are yielded as soon as they are found in any order,
+    cached commits first, so the first unverified commit is known as early as possible.
+    """
+    if github_client is None:
+        github_client = github.GitHubApiClient(token, pool_size=concurrency)
+    if lookup == "local":
+        # Local signature checks depend on the configured keys rather than on GitHub,
+        # so they neither use nor fill the cache of GitHub's verification results
+        verification_cache = None
+
+    cached: Dict[str, github.Commit] = {}
+    missing = commit_hashes
+    listed = commit_range is not None or pull_request is not None
+    if verification_cache is not None and not listed:
+        cached = verification_cache.get_many(repo, commit_hashes)
+        missing = [sha for sha in commit_hashes if sha not in cached]
+
+    fetched: Iterator[github.Commit] = iter(())
+    if missing or listed:
+        fetched = iter_commits(
+            github_client,
+            repo=repo,
+            commit_hashes=missing,
+            concurrency=concurrency,
+            lookup=lookup,
+            commit_range=commit_range,
+            pull_request=pull_request,
+            ordered=ordered,
+        )
 
+    commits = fetched
+    if cached and ordered:
+        commits = merge_cached(commit_hashes, cached, fetched)
+    elif cached:
+        commits = itertools.chain(cached.values(), fetched)
 
-def group_by_author(commits: List[dict]) -> Dict[str, List[dict]]:
-    """Group GitHub commit objects by their author."""
-    grouped: Dict[str, List[dict]] = {}
     for commit in commits:
-        name = commit["author"]["login"]
-        if name not in grouped:
-            grouped[name] = []
-        grouped[name].append(commit)
-    return grouped
+        metrics.METRICS.increment("commits.checked")
+        if verification_cache is not None and commit.sha not in cached:
+            verification_cache.put_many(repo, [commit])
+        if not is_commit_verified(commit):
+            metrics.METRICS.increment("commits.unverified")
+            yield commit
+
+    if verification_cache is not None:
+        LOGGER.info(
+            "Verification cache hits: %s, misses: %s",
+            verification_cache.hits,
+            verification_cache.misses,
+        )
+        lookups = verification_cache.hits + verification_cache.misses
+        metrics.METRICS.set("cache.hits", verification_cache.hits)
+        metrics.METRICS.set("cache.misses", verification_cache.misses)
+        metrics.METRICS.set(
+            "cache.hit_rate", verification_cache.hits / lookups if lookups else 0.0
+        )
 
 
-def get_unverified_commits(
-    *, token: str, repo: str, commit_hashes: List[str]
-) -> List[dict]:
+def merge_cached(
+    commit_hashes: List[str],
+    cached: Dict[str, github.Commit],
+    fetched: Iterator[github.Commit],
+) -> Iterator[github.Commit]:
     """
-    Get a subset commit_hashes that refer to unverified commits.
+    Merge the `cached` commits back between the `fetched` commits, in the order of
+    `commit_hashes`.
 
-    `token` should be a OAuth token to authenticate to GitHub.
+    `fetched` yields the commits missing from `cached` in the order of `commit_hashes`,
+    so each can be passed on as soon as it arrives.
+    """
+    for sha in commit_hashes:
+        if sha in cached:
+            yield cached[sha]
+            continue
+        for commit in fetched:
+            yield commit
+            break
+        else:
+            raise ValueError(f"Commit {sha} was not found")
+
+
+def fetch_commits(  # pylint: disable=too-many-arguments
+    github_client: github.GitHubApiClient,
+    *,
+    repo: str,
+    commit_hashes: List[str],
+    concurrency: int = 1,
+    lookup: str = "rest",
+    commit_range: Optional[Tuple[str, str]] = None,
+    pull_request: Optional[int] = None,
+) -> List[github.Commit]:
+    """
+    Fetch the commits for each of `commit_hashes`, in the same order.
 
-    `repo` should be the name of the GitHub repo to which the commits refer, in
-    `{owner}/{repo}` format.
+    See `iter_commits` for the meaning of the arguments.
+    """
+    return list(
+        iter_commits(
+            github_client,
+            repo=repo,
+            commit_hashes=commit_hashes,
+            concurrency=concurrency,
+            lookup=lookup,
+            commit_range=commit_range,
+            pull_request=pull_request,
+        )
+    )
 
-    `commit_hashes` should be a list of git hashes to check the verification status of.
+
+def iter_commits(  # pylint: disable=too-many-arguments
+    github_client: github.GitHubApiClient,
+    *,
+    repo: str,
+    commit_hashes: List[str],
+    concurrency: int = 1,
+    lookup: str = "rest",
+    commit_range: Optional[Tuple[str, str]] = None,
+    pull_request: Optional[int] = None,
+    ordered: bool = True,
+) -> Iterator[github.Commit]:
     """
-    github_client = github.GitHubApiClient(token)
-    commits = []
+    Fetch the commits for each of `commit_hashes`, yielding them in the same order as
+    soon as each is available.
 
-    for sha in commit_hashes:
-        commit = github_client.get_commit(repo=repo, sha=sha)
-        if not is_commit_verified(commit):
-            commits.append(commit)
+    With a `concurrency` greater than one the lookups are spread over a thread pool of
+    at most that many workers. If any lookup fails, lookups that have not started yet
+    are cancelled and the first error (in push order) is raised once the in-flight
+    lookups have finished. The same happens when the iterator is closed early. Without
+    `ordered`, each commit is yielded as soon as its lookup finishes instead, in any
+    order.
+
+    A `lookup` of `graphql` resolves the commits in batches instead, see
+    `GitHubApiClient.get_commits`.
 
-    return commits
+    A `lookup` of `compare` lists every commit in `commit_range` page by page instead,
+    which also covers commits past the push event's 20 commit limit. Without a
+    `commit_range` it falls back to looking up each of `commit_hashes`.
 
+    A `lookup` of `local` reads and verifies the commits from the local checkout
+    without using the GitHub API, see `localgit.get_commits`.
 
-def is_commit_verified(commit: dict) -> bool:
+    With a `pull_request` number, the commits of that pull request are listed 100 at a
+    time instead, with their verification details, whatever the `lookup`.
+    """
+    if pull_request is not None:
+        yield from github_client.list_pull_request_commits(
+            repo=repo, number=pull_request
+        )
+        return
+    if lookup == "compare":
+        if commit_range:
+            before, after = commit_range
+            yield from github_client.compare_commits(repo=repo, base=before, head=after)
+            return
+        LOGGER.debug("No commit range to compare, looking up each commit instead")
+        lookup = "rest"
+
+    if lookup == "graphql":
+        yield from github_client.get_commits(repo=repo, shas=commit_hashes)
+        return
+    if lookup == "local":
+        yield from localgit.get_commits(
+            repo=repo,
+            shas=commit_hashes,
+            path=localgit.repository_path(),
+            verifier=localgit.SignatureVerifier.from_env(),
+            workers=env_int("VERIFY_WORKERS", 1),
+        )
+        return
+    if lookup != "rest":
+        raise ValueError(f"Unknown lookup backend {lookup}")
+
+    if concurrency <= 1 or len(commit_hashes) <= 1:
+        for sha in commit_hashes:
+            yield github_client.get_commit(repo=repo, sha=sha)
+        return
+
+    executor = futures.ThreadPoolExecutor(
+        max_workers=min(concurrency, len(commit_hashes)),
+        thread_name_prefix="get_commit",
+    )
+    try:
+        pending = [
+            executor.submit(github_client.get_commit, repo=repo, sha=sha)
+            for sha in commit_hashes
+        ]
+        for future in pending if ordered else futures.as_completed(pending):
+            yield future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def is_commit_verified(commit: github.Commit) -> bool:
     """`True` if a Github commit is verified, `False` otherwise."""
-    return commit["commit"]["verification"]["verified"]
+    return commit.verified
+
+
+def get_commits_from_event(event: dict, *, new_only: bool = False) -> List[str]:
+    """
+    Get a list of commit hashes from a GitHub push event object.
+
+    With `new_only`, commits the event marks as not `distinct`, that were already in
+    the repository before the push, are left out.
+    """
+    return [
+        commit["id"]
+        for commit in event["commits"]
+        if not new_only or commit.get("distinct", True)
+    ]
+
+
+def get_repeated_commits_from_event(event: dict) -> Set[str]:
+    """
+    Get the hashes of the commits in a GitHub push event object that are not
+    `distinct`, that is that were already in the repository before the push.
+    """
+    return {
+        commit["id"] for commit in event["commits"] if not commit.get("distinct", True)
+    }
+
+
+def load_cache() -> Optional[cache.VerificationCache]:
+    """
+    Load the verification cache from the path in the `VERIFICATION_CACHE_PATH`
+    environment variable, `None` if it is not set.
+
+    Relative paths are relative to the GitHub Actions workspace, `GITHUB_WORKSPACE`.
+    """
+    path = os.environ.get("VERIFICATION_CACHE_PATH")
+    if not path:
+        return None
+    path = os.path.join(os.environ.get("GITHUB_WORKSPACE", ""), path)
+    return cache.VerificationCache.load(
+        path, max_entries=env_int("VERIFICATION_CACHE_SIZE", cache.DEFAULT_MAX_ENTRIES)
+    )
+
+
+def load_response_cache() -> Optional[httpcache.ResponseCache]:
+    """
+    Load the GitHub API response cache from the path in the `RESPONSE_CACHE_PATH`
+    environment variable, `None` if it is not set.
+
+    Relative paths are relative to the GitHub Actions workspace, `GITHUB_WORKSPACE`.
+    """
+    path = os.environ.get("RESPONSE_CACHE_PATH")
+    if not path:
+        return None
+    path = os.path.join(os.environ.get("GITHUB_WORKSPACE", ""), path)
+    return httpcache.ResponseCache.load(
+        path, max_bytes=env_int("RESPONSE_CACHE_SIZE", httpcache.DEFAULT_MAX_SIZE) << 20
+    )
+
+
+def env_flag(name: str) -> bool:
+    """Read a `true` or `false` setting from the environment variable `name`."""
+    value = os.environ.get(name, "").strip().lower()
+    if value in ("", "false", "0", "no"):
+        return False
+    if value in ("true", "1", "yes"):
+        return True
+    raise ValueError(f"{name} must be true or false, not {value!r}")
+
+
+def env_int(name: str, default: int) -> int:
+    """Read a positive integer setting from the environment variable `name`."""
+    value = os.environ.get(name)
+    if not value:
+        return default
+
+    try:
+        number = int(value)
+    except ValueError as ex:
+        raise ValueError(f"{name} must be an integer, not {value!r}") from ex
+    if number < 1:
+        raise ValueError(f"{name} must be at least 1, not {number}")
+    return number
+
+
+def get_range_from_event(event: dict) -> Optional[Tuple[str, str]]:
+    """
+    Get the `(before, after)` SHAs of the commits pushed in a GitHub push event object.
+
+    Returns `None` when the push has no usable range, that is when it created or
+    deleted a branch or was a force push.
+    """
+    before = event.get("before")
+    after = event.get("after")
+    if not before or not after or NULL_SHA in (before, after):
+        return None
+    if event.get("created") or event.get("deleted") or event.get("forced"):
+        return None
+    return before, after
+
+
+def get_pull_request_from_event(
+    event: dict,
+) -> Tuple[Optional[int], Optional[Tuple[str, str]]]:
+    """
+    Get the number of the pull request of a GitHub pull request event object, or the
+    `(base, head)` SHAs to compare to list its commits.
+
+    Pull requests of up to `github.PULL_REQUEST_COMMITS_LIMIT` commits have their
+    commits listed by number, which returns `(number, None)`. Larger pull requests are
+    compared between the SHAs of their base and head instead, which returns
+    `(None, (base, head))`.
+    """
+    pull_request = event["pull_request"]
+    if pull_request.get("commits", 0) > github.PULL_REQUEST_COMMITS_LIMIT:
+        return None, (pull_request["base"]["sha"], pull_request["head"]["sha"])
+    return pull_request["number"], None
+
+
+def get_new_branch_range_from_event(event: dict) -> Optional[Tuple[str, str]]:
+    """
+    Get the `(default branch, after)` pair of a GitHub push event object that created
+    a branch, whose new commits are those between the merge base of the two and
+    `after`.
+
+    Returns `None` for any other push, or when the created branch is the default
+    branch itself.
+    """
+    after = event.get("after")
+    if not event.get("created") and event.get("before") != NULL_SHA:
+        return None
+    if event.get("deleted") or not after or after == NULL_SHA:
+        return None
 
+    default_branch = (event.get("repository") or {}).get("default_branch")
+    if not default_branch or event.get("ref") == f"refs/heads/{default_branch}":
+        return None
+    return default_branch, after
 
-def get_commits_from_event(event: dict) -> List[str]:
-    """Get a list of commit hashes from a GitHub push event object."""
-    return [commit["id"] for commit in event["commits"]]
+
+def select_commit_range(
+    event: dict, *, lookup: str, new_only: bool = False
+) -> Tuple[Optional[Tuple[str, str]], str]:
+    """
+    Select the range of commits to list for a GitHub push event object, and the lookup
+    backend to use for it.
+
+    Returns the `(base, head)` range to list with the compare API, or `None` to look
+    up each commit in the event, and the lookup backend.
+
+    With `new_only`, a push that created a branch is resolved against the default
+    branch, so only the commits that are not already on the default branch are looked
+    up, however many commits the event lists.
+    """
+    if new_only and lookup != "local":
+        new_branch_range = get_new_branch_range_from_event(event)
+        if new_branch_range:
+            return new_branch_range, "compare"
+    if lookup == "compare":
+        return get_range_from_event(event), lookup
+    return None, lookup
+
+
+def commit_scope() -> str:
+    """
+    Get which pushed commits to check from the `COMMIT_SCOPE` environment variable,
+    `all` (the default) or `new` for only commits that are new to the repository.
+    """
+    scope = os.environ.get("COMMIT_SCOPE", "all").lower()
+    if scope not in ("all", "new"):
+        raise ValueError(f"Unknown commit scope {scope}")
+    return scope
 
 
 def load_event(path: str) -> dict:
@@ -125,15 +629,24 @@ def load_event(path: str) -> dict:
         return json.load(file)
 
 
-if __name__ == "__main__":
-    # Configure root logger formatting
+def configure_logging():
+    """
+    Configure the root logger to write formatted logs at the level set in the
+    `LOG_LEVEL` environment variable.
+    """
+    level = os.environ.get("LOG_LEVEL", "INFO").upper()
     logging_handler = logging.StreamHandler()
-    logging_handler.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+    logging_handler.setLevel(level)
     logging_handler.setFormatter(
         logging.Formatter("[%(levelname)s %(name)s %(lineno)d] %(message)s")
     )
 
     logger = logging.getLogger()
+    logger.setLevel(level)
     logger.addHandler(logging_handler)
 
-    sys.exit(main())
+
+if __name__ == "__main__":
+    configure_logging()
+    with profiling.profile():
+        sys.exit(main())
@@ -1,11 +1,14 @@
 """Unit tests for the action.py module."""
 import os
 import json
+import threading
+import time
 from unittest import mock
 
 import pytest  # type: ignore
 
-from . import action, messenger
+from . import action, cache, messenger, pipeline
+from .conftest import make_commit
 
 
 def test_load_event_not_json():
@@ -31,6 +34,21 @@ def test_get_commits_from_event(event, commits):
     assert result == commits
 
 
+def test_get_commits_from_event_new_only():
+    """Test commits that are not distinct are left out with `new_only`."""
+    event = {
+        "commits": [
+            {"id": "hash-1", "distinct": False},
+            {"id": "hash-2", "distinct": True},
+            {"id": "hash-3"},
+        ]
+    }
+
+    assert action.get_commits_from_event(event) == ["hash-1", "hash-2", "hash-3"]
+    assert action.get_commits_from_event(event, new_only=True) == ["hash-2", "hash-3"]
+    assert action.get_repeated_commits_from_event(event) == {"hash-1"}
+
+
 def test_get_commits_from_event_no_commits_key():
     """Test the get_commits_from_event fails correctly with no "commits" key."""
     with pytest.raises(KeyError):
@@ -38,31 +56,121 @@ def test_get_commits_from_event_no_commits_key():
 
 
 @pytest.mark.parametrize(
-    "commit, verified",
+    "commits, selected",
     [
-        ({"commit": {"verification": {"verified": True}}}, True),
-        ({"commit": {"verification": {"verified": False}}}, False),
+        (3, (7, None)),
+        (action.github.PULL_REQUEST_COMMITS_LIMIT, (7, None)),
+        (action.github.PULL_REQUEST_COMMITS_LIMIT + 1, (None, ("base", "head"))),
     ],
 )
-def test_is_commit_verified(commit, verified):
+def test_get_pull_request_from_event(commits, selected):
     """
-    Test is_commit_verified pulls the commit verification status out of the GitHub API
-    response correctly.
+    Test pull requests are listed by number, or compared between their base and head
+    when they have too many commits to list.
     """
-    result = action.is_commit_verified(commit)
-    assert result == verified
+    event = {
+        "pull_request": {
+            "number": 7,
+            "commits": commits,
+            "base": {"sha": "base"},
+            "head": {"sha": "head"},
+        }
+    }
+    assert action.get_pull_request_from_event(event) == selected
+
+
+NEW_BRANCH_EVENT = {
+    "ref": "refs/heads/feature",
+    "before": action.NULL_SHA,
+    "after": "hash-3",
+    "created": True,
+    "repository": {"default_branch": "main"},
+    "commits": [],
+}
 
 
 @pytest.mark.parametrize(
-    "commit", [({}), ({"commit": {}}), ({"commit": {"verification": {}}})]
+    "event, commit_range",
+    [
+        (NEW_BRANCH_EVENT, ("main", "hash-3")),
+        ({**NEW_BRANCH_EVENT, "ref": "refs/heads/main"}, None),
+        ({**NEW_BRANCH_EVENT, "repository": {}}, None),
+        ({**NEW_BRANCH_EVENT, "created": False, "before": "hash-0"}, None),
+        ({**NEW_BRANCH_EVENT, "deleted": True, "after": action.NULL_SHA}, None),
+    ],
 )
-def test_is_commit_verified_no_verified_key(commit):
+def test_get_new_branch_range_from_event(event, commit_range):
     """
-    Test is_commit_verified fails correctly when the verification keys are not present
-    in the GitHub API response object.
+    Test get_new_branch_range_from_event resolves pushes creating a branch against the
+    default branch.
     """
-    with pytest.raises(KeyError):
-        action.is_commit_verified(commit)
+    assert action.get_new_branch_range_from_event(event) == commit_range
+
+
+@pytest.mark.parametrize(
+    "event, lookup, new_only, selected",
+    [
+        (NEW_BRANCH_EVENT, "rest", True, (("main", "hash-3"), "compare")),
+        (NEW_BRANCH_EVENT, "graphql", False, (None, "graphql")),
+        (NEW_BRANCH_EVENT, "local", True, (None, "local")),
+        (NEW_BRANCH_EVENT, "compare", False, (None, "compare")),
+        (
+            {"before": "hash-0", "after": "hash-3"},
+            "compare",
+            True,
+            (("hash-0", "hash-3"), "compare"),
+        ),
+        ({"before": "hash-0", "after": "hash-3"}, "rest", True, (None, "rest")),
+    ],
+)
+def test_select_commit_range(event, lookup, new_only, selected):
+    """Test the commit range and lookup backend selected for a push event."""
+    assert action.select_commit_range(event, lookup=lookup, new_only=new_only) == (
+        selected
+    )
+
+
+@pytest.mark.parametrize("value", ["all", "new", "NEW"])
+def test_commit_scope(value):
+    """Test the commit scope is read from the environment."""
+    with mock.patch.dict(os.environ, {"COMMIT_SCOPE": value}):
+        assert action.commit_scope() == value.lower()
+
+
+def test_commit_scope_unknown():
+    """Test an unknown commit scope fails correctly."""
+    with mock.patch.dict(os.environ, {"COMMIT_SCOPE": "some"}):
+        with pytest.raises(ValueError):
+            action.commit_scope()
+
+
+@pytest.mark.parametrize(
+    "event, commit_range",
+    [
+        ({"before": "hash-0", "after": "hash-3"}, ("hash-0", "hash-3")),
+        ({"before": action.NULL_SHA, "after": "hash-3"}, None),
+        ({"before": "hash-0", "after": action.NULL_SHA}, None),
+        ({"before": "hash-0", "after": "hash-3", "created": True}, None),
+        ({"before": "hash-0", "after": "hash-3", "forced": True}, None),
+        ({"commits": []}, None),
+    ],
+)
+def test_get_range_from_event(event, commit_range):
+    """
+    Test get_range_from_event only returns a commit range for plain pushes to existing
+    branches.
+    """
+    assert action.get_range_from_event(event) == commit_range
+
+
+@pytest.mark.parametrize(
+    "commit, verified",
+    [(make_commit("hash-1", True), True), (make_commit("hash-1", False), False)],
+)
+def test_is_commit_verified(commit, verified):
+    """Test is_commit_verified reads the commit verification status correctly."""
+    result = action.is_commit_verified(commit)
+    assert result == verified
 
 
 @mock.patch("src.action.github")
@@ -74,73 +182,333 @@ def test_get_unverified_commits(github):
     token = "test-github-token"
     repo = "github/repo-name"
     hashes = ["hash-1", "hash-2", "hash-3", "hash-4"]
-    expected = [
-        {"commit": {"id": "hash-2", "verification": {"verified": False}}},
-        {"commit": {"id": "hash-4", "verification": {"verified": False}}},
-    ]
+    expected = [make_commit("hash-2", False), make_commit("hash-4", False)]
 
     github.GitHubApiClient.return_value.get_commit.side_effect = [
-        {"commit": {"id": "hash-1", "verification": {"verified": True}}},
-        {"commit": {"id": "hash-2", "verification": {"verified": False}}},
-        {"commit": {"id": "hash-3", "verification": {"verified": True}}},
-        {"commit": {"id": "hash-4", "verification": {"verified": False}}},
+        make_commit("hash-1", True),
+        make_commit("hash-2", False),
+        make_commit("hash-3", True),
+        make_commit("hash-4", False),
     ]
 
     result = action.get_unverified_commits(token=token, repo=repo, commit_hashes=hashes)
     assert result == expected
-    github.GitHubApiClient.assert_called_once_with(token)
+    github.GitHubApiClient.assert_called_once_with(token, pool_size=1)
 
 
-def test_group_by_author():
+@mock.patch("src.action.github")
+def test_get_unverified_commits_concurrent(github):
     """
-    Test group_by_author groups a list of commit objects from the GitHub API correctly.
+    Test get_unverified_commits returns commits in push order when the lookups are
+    run concurrently and finish out of order.
     """
-    commits = [
-        {"id": 1, "author": {"login": "user1"}},
-        {"id": 2, "author": {"login": "user1"}},
-        {"id": 3, "author": {"login": "user2"}},
-        {"id": 4, "author": {"login": "user2"}},
-        {"id": 5, "author": {"login": "user2"}},
-    ]
+    hashes = [f"hash-{i}" for i in range(8)]
 
-    expected = {
-        "user1": [
-            {"id": 1, "author": {"login": "user1"}},
-            {"id": 2, "author": {"login": "user1"}},
-        ],
-        "user2": [
-            {"id": 3, "author": {"login": "user2"}},
-            {"id": 4, "author": {"login": "user2"}},
-            {"id": 5, "author": {"login": "user2"}},
-        ],
+    def mock_get_commit(repo, sha):
+        assert repo == "github/repo-name"
+        index = int(sha.split("-")[1])
+        time.sleep((len(hashes) - index) * 0.005)
+        return make_commit(sha, index % 2 == 0)
+
+    github.GitHubApiClient.return_value.get_commit = mock_get_commit
+
+    result = action.get_unverified_commits(
+        token="test-github-token",
+        repo="github/repo-name",
+        commit_hashes=hashes,
+        concurrency=4,
+    )
+    assert [commit.sha for commit in result] == ["hash-1", "hash-3", "hash-5", "hash-7"]
+
+
+def test_iter_commits_unordered():
+    """Test iter_commits without `ordered` yields each commit as its lookup finishes."""
+    hashes = [f"hash-{i}" for i in range(4)]
+    client = mock.MagicMock()
+
+    def mock_get_commit(repo, sha):  # pylint: disable=unused-argument
+        time.sleep((len(hashes) - int(sha.split("-")[1])) * 0.02)
+        return make_commit(sha, True)
+
+    client.get_commit = mock_get_commit
+
+    result = action.iter_commits(
+        client,
+        repo="github/repo-name",
+        commit_hashes=hashes,
+        concurrency=4,
+        ordered=False,
+    )
+    assert next(result).sha == "hash-3"
+    assert sorted(commit.sha for commit in result) == hashes[:3]
+
+
+@mock.patch("src.action.github")
+def test_get_unverified_commits_cached(github):
+    """
+    Test get_unverified_commits only looks up commits missing from the verification
+    cache and adds them to it.
+    """
+    repo = "github/repo-name"
+    verification_cache = cache.VerificationCache()
+    verification_cache.put_many(
+        repo, [make_commit("hash-1", False), make_commit("hash-2", True)]
+    )
+
+    def mock_get_commit(repo, sha):  # pylint: disable=redefined-outer-name
+        assert repo == "github/repo-name"
+        assert sha == "hash-3"
+        return make_commit(sha, False)
+
+    github.GitHubApiClient.return_value.get_commit = mock_get_commit
+
+    result = action.get_unverified_commits(
+        token="test-github-token",
+        repo=repo,
+        commit_hashes=["hash-1", "hash-2", "hash-3"],
+        verification_cache=verification_cache,
+    )
+
+    assert result == [make_commit("hash-1", False), make_commit("hash-3", False)]
+    assert verification_cache.hits == 2
+    assert verification_cache.misses == 1
+    assert len(verification_cache) == 3
+
+
+@mock.patch("src.action.localgit")
+def test_get_unverified_commits_local_skips_cache(localgit):
+    """
+    Test local lookups neither read nor fill the cache of GitHub's verification
+    results.
+    """
+    repo = "github/repo-name"
+    verification_cache = cache.VerificationCache()
+    verification_cache.put_many(repo, [make_commit("hash-1", True)])
+    localgit.get_commits.return_value = [make_commit("hash-1", False)]
+
+    result = action.get_unverified_commits(
+        token="test-github-token",
+        repo=repo,
+        commit_hashes=["hash-1"],
+        lookup="local",
+        verification_cache=verification_cache,
+        github_client=mock.MagicMock(),
+    )
+
+    assert result == [make_commit("hash-1", False)]
+    assert verification_cache.hits == 0
+    assert verification_cache.get_many(repo, ["hash-1"])["hash-1"].verified
+
+
+def test_load_cache_not_configured():
+    """Test load_cache returns `None` when no cache path is configured."""
+    with mock.patch.dict(os.environ, {"VERIFICATION_CACHE_PATH": ""}):
+        assert action.load_cache() is None
+
+
+def test_load_cache(tmp_path):
+    """Test load_cache loads the cache from the configured path."""
+    path = str(tmp_path / "verification.json.gz")
+    env = {
+        "GITHUB_WORKSPACE": "/github/workspace",
+        "VERIFICATION_CACHE_PATH": path,
+        "VERIFICATION_CACHE_SIZE": "5",
     }
+    with mock.patch.dict(os.environ, env):
+        verification_cache = action.load_cache()
 
-    result = action.group_by_author(commits)
-    assert result == expected
+    assert verification_cache is not None
+    assert verification_cache.path == path
+    assert verification_cache.max_entries == 5
 
 
-@pytest.mark.parametrize("commits", [[{}], [{"author": {}}]])
-def test_group_by_author_no_author_key(commits):
+def test_load_cache_relative_path():
+    """Test load_cache resolves relative paths against the GitHub workspace."""
+    env = {
+        "GITHUB_WORKSPACE": "/github/workspace",
+        "VERIFICATION_CACHE_PATH": "cache/verification.json.gz",
+    }
+    with mock.patch.dict(os.environ, env):
+        verification_cache = action.load_cache()
+
+    assert verification_cache is not None
+    assert verification_cache.path == "/github/workspace/cache/verification.json.gz"
+
+
+def test_fetch_commits_graphql():
+    """Test fetch_commits uses the batched GraphQL lookup when configured to."""
+    client = mock.MagicMock()
+    hashes = ["hash-1", "hash-2"]
+    client.get_commits.return_value = [make_commit(sha, True) for sha in hashes]
+
+    result = action.fetch_commits(
+        client, repo="github/repo-name", commit_hashes=hashes, lookup="graphql"
+    )
+
+    assert result == client.get_commits.return_value
+    client.get_commits.assert_called_once_with(repo="github/repo-name", shas=hashes)
+    assert not client.get_commit.called  # pylint: disable=no-member
+
+
+def test_fetch_commits_compare():
+    """Test fetch_commits lists the commit range through the compare API."""
+    client = mock.MagicMock()
+    commits = [make_commit("hash-1", True), make_commit("hash-2", True)]
+    client.compare_commits.return_value = iter(commits)
+
+    result = action.fetch_commits(
+        client,
+        repo="github/repo-name",
+        commit_hashes=["hash-2"],
+        lookup="compare",
+        commit_range=("hash-0", "hash-2"),
+    )
+
+    assert result == commits
+    client.compare_commits.assert_called_once_with(
+        repo="github/repo-name", base="hash-0", head="hash-2"
+    )
+
+
+def test_fetch_commits_compare_no_range():
+    """Test fetch_commits falls back to per commit lookups without a commit range."""
+    client = mock.MagicMock()
+
+    result = action.fetch_commits(
+        client, repo="github/repo-name", commit_hashes=["hash-1"], lookup="compare"
+    )
+
+    # pylint: disable=no-member
+    assert result == [client.get_commit.return_value]
+    client.get_commit.assert_called_once_with(repo="github/repo-name", sha="hash-1")
+    assert not client.compare_commits.called
+
+
+@mock.patch("src.action.localgit")
+def test_fetch_commits_local(localgit):
+    """Test fetch_commits verifies commits from the local checkout if configured to."""
+    client = mock.MagicMock()
+    localgit.get_commits.return_value = [make_commit("hash-1", True)]
+
+    result = action.fetch_commits(
+        client, repo="github/repo-name", commit_hashes=["hash-1"], lookup="local"
+    )
+
+    assert result == localgit.get_commits.return_value
+    localgit.get_commits.assert_called_once_with(
+        repo="github/repo-name",
+        shas=["hash-1"],
+        path=localgit.repository_path.return_value,
+        verifier=localgit.SignatureVerifier.from_env.return_value,
+        workers=1,
+    )
+    assert not client.method_calls
+
+
+def test_fetch_commits_unknown_lookup():
+    """Test fetch_commits fails correctly for an unknown lookup backend."""
+    with pytest.raises(ValueError):
+        action.fetch_commits(
+            mock.MagicMock(), repo="github/repo-name", commit_hashes=[], lookup="nope"
+        )
+
+
+def test_fetch_commits_concurrent_failure():
     """
-    Test group_by_author fails correctly when the author keys are not present in the
-    GitHub API response object.
+    Test fetch_commits raises the lookup error and does not start queued lookups once
+    a concurrent lookup has failed.
     """
-    with pytest.raises(KeyError):
-        action.group_by_author(commits)
+    client = mock.MagicMock()
+    started = []
+
+    def mock_get_commit(repo, sha):  # pylint: disable=unused-argument
+        started.append(sha)
+        if sha == "hash-0":
+            raise ConnectionError("lookup failed")
+        time.sleep(0.01)
+        return make_commit(sha, True)
+
+    client.get_commit = mock_get_commit
+    hashes = [f"hash-{i}" for i in range(50)]
+
+    with pytest.raises(ConnectionError):
+        action.fetch_commits(
+            client, repo="github/repo-name", commit_hashes=hashes, concurrency=2
+        )
+    assert len(started) < len(hashes)
+
+
+@pytest.mark.parametrize("value, expected", [(None, 3), ("", 3), ("1", 1), ("16", 16)])
+def test_env_int(value, expected):
+    """Test env_int reads integer settings and falls back to the default."""
+    with mock.patch.dict(os.environ, {"TEST_INT_SETTING": value or ""}):
+        assert action.env_int("TEST_INT_SETTING", 3) == expected
 
 
 @pytest.mark.parametrize(
-    "env_name, func",
-    [("console", messenger.send_to_console), ("slack", messenger.send_to_slack)],
+    "value, expected",
+    [(None, False), ("false", False), ("0", False), ("true", True), ("Yes", True)],
 )
-def test_select_backend(env_name, func):
+def test_env_flag(value, expected):
+    """Test env_flag reads true or false settings, false by default."""
+    with mock.patch.dict(os.environ, {"TEST_FLAG_SETTING": value or ""}):
+        assert action.env_flag("TEST_FLAG_SETTING") is expected
+
+
+def test_env_flag_invalid():
+    """Test env_flag fails correctly when the setting is not true or false."""
+    with mock.patch.dict(os.environ, {"TEST_FLAG_SETTING": "maybe"}):
+        with pytest.raises(ValueError):
+            action.env_flag("TEST_FLAG_SETTING")
+
+
+@pytest.mark.parametrize("value", ["abc", "0", "-2"])
+def test_env_int_invalid(value):
+    """Test env_int fails correctly when the setting is not a positive integer."""
+    with mock.patch.dict(os.environ, {"TEST_INT_SETTING": value}):
+        with pytest.raises(ValueError):
+            action.env_int("TEST_INT_SETTING", 3)
+
+
+def test_group_by_author():
+    """Test group_by_author groups a list of commits correctly."""
+    commits = [
+        make_commit("hash-1", False, author="user1"),
+        make_commit("hash-2", False, author="user1"),
+        make_commit("hash-3", False, author="user2"),
+        make_commit("hash-4", False, author="user2"),
+        make_commit("hash-5", False, author="user2"),
+    ]
+
+    expected = {"user1": commits[:2], "user2": commits[2:]}
+
+    result = action.group_by_author(commits)
+    assert result == expected
+
+
+@pytest.mark.parametrize(
+    "env_name, funcs",
+    [
+        ("console", [messenger.send_batch_to_console]),
+        ("slack", [messenger.send_batch_to_slack]),
+        (
+            "console, webhook,file",
+            [
+                messenger.send_batch_to_console,
+                messenger.send_batch_to_webhook,
+                messenger.send_batch_to_file,
+            ],
+        ),
+    ],
+)
+def test_select_backend(env_name, funcs):
     """
-    Test select_backend correctly selects the backend messenger from the
+    Test select_backend correctly selects the backend messengers from the
     `MESSAGE_BACKEND` env var.
     """
     os.environ["MESSAGE_BACKEND"] = env_name
     result = action.select_backend()
-    assert result == func  # pylint: disable=comparison-with-callable
+    assert [delivery.backend for delivery in result.deliveries] == funcs
 
 
 def test_select_backend_unknown():
@@ -159,28 +527,25 @@ def test_send_messages(messenger):  # pylint: disable=redefined-outer-name
     repo = "github/repo-name"
     grouped_commits = {
         "user1": [
-            {"id": 1, "author": {"login": "user1"}},
-            {"id": 2, "author": {"login": "user1"}},
+            make_commit("hash-1", False, author="user1"),
+            make_commit("hash-2", False, author="user1"),
         ],
         "user2": [
-            {"id": 3, "author": {"login": "user2"}},
-            {"id": 4, "author": {"login": "user2"}},
-            {"id": 5, "author": {"login": "user2"}},
+            make_commit("hash-3", False, author="user2"),
+            make_commit("hash-4", False, author="user2"),
+            make_commit("hash-5", False, author="user2"),
         ],
     }
 
     action.send_messages(repo, grouped_commits)
 
-    messenger.send_to_console.assert_any_call(
-        author="user1", repo=repo, commits=grouped_commits["user1"]
-    )
-    messenger.send_to_console.assert_any_call(
-        author="user2", repo=repo, commits=grouped_commits["user2"]
+    messenger.send_batch_to_console.assert_called_once_with(
+        repo=repo, grouped_commits=grouped_commits
     )
 
 
 @mock.patch("src.action.github")
-def test_main(github):
+def test_main(github, tmp_path):
     """Test the action end-to-end to see everything working together correctly."""
     os.environ["GITHUB_REPOSITORY"] = "github/repo-name"
     os.environ["GITHUB_EVENT_PATH"] = "./events/unit_test.json"
@@ -189,30 +554,200 @@ def test_main(github):
 
     def mock_get_commit(repo, sha):
         assert repo == "github/repo-name"
-        if sha == "hash-1":
-            return {
-                "author": {"login": "user1"},
-                "commit": {"verification": {"verified": False}},
-                "html_url": f"https://github.com/{repo}/commit/{sha}",
-            }
-        return {
-            "author": {"login": "user1"},
-            "commit": {"verification": {"verified": True}},
-            "html_url": f"https://github.com/{repo}/commit/{sha}",
-        }
+        return make_commit(sha, sha != "hash-1")
 
     github.GitHubApiClient.return_value.get_commit = mock_get_commit
 
-    commit_count = action.main()
-    assert commit_count == 1
-    github.GitHubApiClient.assert_called_once_with("github-test-token")
+    summary_path = tmp_path / "summary.md"
+    with mock.patch.dict(os.environ, {"GITHUB_STEP_SUMMARY": str(summary_path)}):
+        assert action.main() == 1
+    github.GitHubApiClient.assert_called_once_with(
+        "github-test-token", pool_size=1, response_cache=None
+    )
+    assert "| lookup |" in summary_path.read_text()
 
 
 def test_main_event_name_check():
-    """Ensure non-push events exit cleanly."""
+    """Ensure events other than pushes and pull requests exit cleanly."""
     os.environ["GITHUB_REPOSITORY"] = "github/repo-name"
     os.environ["GITHUB_EVENT_PATH"] = "./events/unit_test.json"
-    os.environ["GITHUB_EVENT_NAME"] = "pull_request"
+    os.environ["GITHUB_EVENT_NAME"] = "issues"
     os.environ["GITHUB_TOKEN"] = "github-test-token"
 
     assert action.main() == 1
+
+
+@mock.patch("src.action.github")
+def test_main_notifies_while_fetching(github):
+    """Test notifications are sent while later commits are still being looked up."""
+    os.environ["GITHUB_REPOSITORY"] = "github/repo-name"
+    os.environ["GITHUB_EVENT_PATH"] = "./events/unit_test.json"
+    os.environ["GITHUB_EVENT_NAME"] = "push"
+    os.environ["GITHUB_TOKEN"] = "github-test-token"
+    notified = threading.Event()
+    lookups = []
+
+    def mock_get_commit(repo, sha):  # pylint: disable=unused-argument
+        if lookups:
+            assert notified.wait(timeout=5)
+        lookups.append(sha)
+        return make_commit(sha, False)
+
+    github.GitHubApiClient.return_value.get_commit = mock_get_commit
+    backend = mock.Mock(side_effect=lambda **_: notified.set())
+    fan_out = pipeline.FanOut({"test": backend})
+
+    with mock.patch.dict(os.environ, {"NOTIFY_BATCH_SIZE": "1"}), mock.patch(
+        "src.action.select_backend", return_value=fan_out
+    ):
+        assert action.main() == 1
+
+    assert backend.call_count == len(lookups)
+
+
+@pytest.mark.parametrize("defer", [False, True])
+@mock.patch("src.action.github")
+def test_main_fail_fast(github, defer):
+    """
+    Test `FAIL_FAST` fails on the first unverified commit without looking up the rest,
+    notifying it unless notifications are deferred.
+    """
+    os.environ["GITHUB_REPOSITORY"] = "github/repo-name"
+    os.environ["GITHUB_EVENT_PATH"] = "./events/unit_test.json"
+    os.environ["GITHUB_EVENT_NAME"] = "push"
+    os.environ["GITHUB_TOKEN"] = "github-test-token"
+    client = github.GitHubApiClient.return_value
+    client.get_commit.side_effect = lambda repo, sha: make_commit(sha, sha != "hash-1")
+    backend = mock.Mock()
+    env = {"FAIL_FAST": "true", "DEFER_NOTIFICATIONS": str(defer).lower()}
+
+    with mock.patch.dict(os.environ, env), mock.patch(
+        "src.action.select_backend", return_value=pipeline.FanOut({"test": backend})
+    ):
+        assert action.main() == 1
+
+    assert [call.kwargs["sha"] for call in client.get_commit.call_args_list] == [
+        "hash-0",
+        "hash-1",
+    ]
+    client.cancel.assert_called_once_with()
+    assert backend.call_count == (0 if defer else 1)
+
+
+@mock.patch("src.action.github")
+def test_main_many_unverified_commits(github, tmp_path):
+    """
+    Test the exit code stays 1 however many unverified commits are found, as exit codes
+    are truncated to 8 bits and 256 would pass the check.
+    """
+    event_path = tmp_path / "event.json"
+    event_path.write_text(
+        json.dumps(
+            {
+                "pull_request": {
+                    "number": 7,
+                    "commits": 256,
+                    "base": {"sha": "base"},
+                    "head": {"sha": "head"},
+                }
+            }
+        )
+    )
+    github.PULL_REQUEST_COMMITS_LIMIT = 250
+    github.GitHubApiClient.return_value.compare_commits.return_value = [
+        make_commit(f"hash-{i}", False) for i in range(256)
+    ]
+    env = {
+        "GITHUB_REPOSITORY": "github/repo-name",
+        "GITHUB_EVENT_PATH": str(event_path),
+        "GITHUB_EVENT_NAME": "pull_request",
+        "GITHUB_TOKEN": "github-test-token",
+        "GITHUB_STEP_SUMMARY": "",
+    }
+
+    with mock.patch.dict(os.environ, env), mock.patch(
+        "src.action.select_backend", return_value=pipeline.FanOut({})
+    ):
+        assert action.main() == 1
+
+
+@mock.patch("src.action.github")
+def test_main_new_commits_only(github, tmp_path):
+    """
+    Test only new commits are checked with `COMMIT_SCOPE: new`, resolving a new branch
+    against the default branch.
+    """
+    event_path = tmp_path / "event.json"
+    event_path.write_text(
+        json.dumps(
+            {
+                **NEW_BRANCH_EVENT,
+                "commits": [
+                    {"id": "hash-1", "distinct": False},
+                    {"id": "hash-2", "distinct": True},
+                ],
+            }
+        )
+    )
+    client = github.GitHubApiClient.return_value
+    client.compare_commits.return_value = [
+        make_commit("hash-1", False),
+        make_commit("hash-2", False),
+    ]
+    env = {
+        "GITHUB_REPOSITORY": "github/repo-name",
+        "GITHUB_EVENT_PATH": str(event_path),
+        "GITHUB_EVENT_NAME": "push",
+        "GITHUB_TOKEN": "github-test-token",
+        "COMMIT_SCOPE": "new",
+        "LOOKUP_BACKEND": "rest",
+        "GITHUB_STEP_SUMMARY": "",
+    }
+
+    with mock.patch.dict(os.environ, env):
+        assert action.main() == 1
+
+    client.compare_commits.assert_called_once_with(
+        repo="github/repo-name", base="main", head="hash-3"
+    )
+    assert not client.get_commit.called
+
+
+@pytest.mark.parametrize("event_name", action.PULL_REQUEST_EVENTS)
+@mock.patch("src.action.github")
+def test_main_pull_request(github, event_name, tmp_path):
+    """Test the commits of a pull request are listed and checked."""
+    event_path = tmp_path / "event.json"
+    event_path.write_text(
+        json.dumps(
+            {
+                "pull_request": {
+                    "number": 7,
+                    "commits": 2,
+                    "base": {"sha": "base"},
+                    "head": {"sha": "head"},
+                }
+            }
+        )
+    )
+    github.PULL_REQUEST_COMMITS_LIMIT = 250
+    client = github.GitHubApiClient.return_value
+    client.list_pull_request_commits.return_value = [
+        make_commit("hash-1", True),
+        make_commit("hash-2", False),
+    ]
+    env = {
+        "GITHUB_REPOSITORY": "github/repo-name",
+        "GITHUB_EVENT_PATH": str(event_path),
+        "GITHUB_EVENT_NAME": event_name,
+        "GITHUB_TOKEN": "github-test-token",
+        "GITHUB_STEP_SUMMARY": "",
+    }
+
+    with mock.patch.dict(os.environ, env):
+        assert action.main() == 1
+
+    client.list_pull_request_commits.assert_called_once_with(
+        repo="github/repo-name", number=7
+    )
+    assert not client.get_commit.called
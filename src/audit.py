@@ -0,0 +1,356 @@
+"""
+Audit the verification of every commit on a branch, or in a range of commits.
+
+Where the action checks the commits of a single push, an audit walks the history of
+`AUDIT_REF` (the repository's default branch by default) page by page. Commits are
+classified as each page arrives, so memory use does not grow with the number of commits,
+and progress is saved to a checkpoint after every page so an interrupted audit of a
+large repository can pick up where it stopped.
+
+With an audit index (`AUDIT_INDEX_PATH`) every audited commit is also recorded in a
+local SQLite index, and a completed audit of a branch saves the commit it reached as the
+branch's high-water mark, so the next audit only visits the commits added since.
+"""
+import contextlib
+import json
+import logging
+import os
+import sys
+from typing import ContextManager, Dict, IO, Iterator, List, Optional, Tuple
+
+from . import action, auditindex, github, metrics, profiling, storage
+
+LOGGER = logging.getLogger("verified_commits_check.audit")
+
+
+class AuditCheckpoint:  # pylint: disable=too-many-instance-attributes
+    """
+    The progress of an audit of the commits of `repo` from `head`, optionally back to
+    `base`, saved after every page of commits. `ref` and `base_ref` are the branches,
+    tags or commits `head` and `base` were resolved from, and `since` and `until` limit
+    the audit to the commits in that window.
+
+    `next_url` is the URL of the next page of commits to audit, `None` before the first
+    page and once the audit is `complete`.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        *,
+        repo: str,
+        head: str,
+        base: Optional[str] = None,
+        ref: Optional[str] = None,
+        base_ref: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ):
+        self.repo = repo
+        self.head = head
+        self.base = base
+        self.ref = ref
+        self.base_ref = base_ref
+        self.since = since
+        self.until = until
+        self.next_url: Optional[str] = None
+        self.complete = False
+        self.scanned = 0
+        self.unverified = 0
+        self.authors: Dict[str, int] = {}
+
+    def matches(  # pylint: disable=too-many-arguments
+        self,
+        *,
+        repo: str,
+        ref: str,
+        base_ref: Optional[str],
+        since: Optional[str],
+        until: Optional[str],
+    ) -> bool:
+        """`True` if this checkpoint is of the audit of `ref` with the same options."""
+        return (self.repo, self.ref, self.base_ref, self.since, self.until) == (
+            repo,
+            ref,
+            base_ref,
+            since,
+            until,
+        )
+
+    def record(self, commit: github.Commit):
+        """Record that `commit` has been audited."""
+        self.scanned += 1
+        if not commit.verified:
+            self.unverified += 1
+            self.authors[commit.author] = self.authors.get(commit.author, 0) + 1
+
+    @classmethod
+    def load(cls, path: str) -> Optional["AuditCheckpoint"]:
+        """Load a checkpoint from the file at `path`, `None` if there isn't one."""
+        try:
+            data = storage.load_json(path)
+        except FileNotFoundError:
+            return None
+
+        checkpoint = cls(
+            repo=data["repo"],
+            head=data["head"],
+            base=data.get("base"),
+            ref=data.get("ref"),
+            base_ref=data.get("base_ref"),
+            since=data.get("since"),
+            until=data.get("until"),
+        )
+        checkpoint.next_url = data.get("next_url")
+        checkpoint.complete = data.get("complete", False)
+        checkpoint.scanned = data.get("scanned", 0)
+        checkpoint.unverified = data.get("unverified", 0)
+        checkpoint.authors = data.get("authors", {})
+        return checkpoint
+
+    def save(self, path: str):
+        """Atomically write the checkpoint to the file at `path`."""
+        data = {
+            "repo": self.repo,
+            "head": self.head,
+            "base": self.base,
+            "ref": self.ref,
+            "base_ref": self.base_ref,
+            "since": self.since,
+            "until": self.until,
+            "next_url": self.next_url,
+            "complete": self.complete,
+            "scanned": self.scanned,
+            "unverified": self.unverified,
+            "authors": self.authors,
+        }
+        storage.save_json(path, data)
+
+
+def main() -> int:
+    """
+    Run an audit of the repository configured in the environment.
+
+    Returns 1 if any unverified commits were found, 0 otherwise.
+    """
+    try:
+        github_repository = os.environ["GITHUB_REPOSITORY"]
+        github_token = os.environ["GITHUB_TOKEN"]
+    except KeyError as ex:
+        LOGGER.error("Environment variable %s must be set", ex)
+        raise ex
+
+    response_cache = action.load_response_cache()
+    client = github.GitHubApiClient(github_token, response_cache=response_cache)
+    index = auditindex.open_index()
+    with contextlib.ExitStack() as stack:
+        if index:
+            stack.enter_context(index)
+        checkpoint = start_audit(
+            client,
+            repo=github_repository,
+            ref=os.environ.get("AUDIT_REF"),
+            base_ref=os.environ.get("AUDIT_BASE"),
+            since=os.environ.get("AUDIT_SINCE"),
+            until=os.environ.get("AUDIT_UNTIL"),
+            checkpoint_path=os.environ.get("AUDIT_CHECKPOINT_PATH"),
+            index=index,
+        )
+
+        with open_report(
+            os.environ.get("AUDIT_REPORT_PATH"), resume=checkpoint.scanned > 0
+        ) as report:
+            audit(
+                client,
+                checkpoint,
+                since=checkpoint.since,
+                until=checkpoint.until,
+                checkpoint_path=os.environ.get("AUDIT_CHECKPOINT_PATH"),
+                report=report,
+                index=index,
+            )
+
+    if response_cache:
+        response_cache.save()
+    log_summary(checkpoint)
+    metrics.report("Verified commits audit")
+    return 1 if checkpoint.unverified else 0
+
+
+def start_audit(  # pylint: disable=too-many-arguments
+    client: github.GitHubApiClient,
+    *,
+    repo: str,
+    ref: Optional[str] = None,
+    base_ref: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    checkpoint_path: Optional[str] = None,
+    index: Optional[auditindex.AuditIndex] = None,
+) -> AuditCheckpoint:
+    """
+    Resume the incomplete audit saved at `checkpoint_path` if it is an audit of the
+    same refs and window, or resolve the refs to audit to commit SHAs.
+
+    Resolving the refs up front keeps pagination stable while the audit runs, and a
+    resumed audit keeps the head it was started from, even if new commits were pushed
+    to the branch since.
+
+    Without a `base_ref`, an `index` holding a high-water mark for `ref` limits the
+    audit to the commits added since the last completed audit.
+    """
+    if not ref:
+        ref = client.get_repository(repo=repo)["default_branch"]
+    if checkpoint_path:
+        saved = AuditCheckpoint.load(checkpoint_path)
+        if (
+            saved
+            and not saved.complete
+            and saved.matches(
+                repo=repo, ref=ref, base_ref=base_ref, since=since, until=until
+            )
+        ):
+            LOGGER.info(
+                "Resuming audit of %s from %s after %s commits",
+                repo,
+                saved.head,
+                saved.scanned,
+            )
+            return saved
+
+    head = client.get_commit(repo=repo, sha=ref).sha
+    base = client.get_commit(repo=repo, sha=base_ref).sha if base_ref else None
+    if index and not base_ref:
+        base = index.high_water_mark(repo, ref)
+        if base:
+            LOGGER.info("Auditing commits added since the last audit (%s)", base)
+    checkpoint = AuditCheckpoint(
+        repo=repo,
+        head=head,
+        base=base,
+        ref=ref,
+        base_ref=base_ref,
+        since=since,
+        until=until,
+    )
+    if base == head:
+        checkpoint.complete = True
+    LOGGER.info("Auditing %s commits from %s (%s)", repo, ref, head)
+    return checkpoint
+
+
+def audit(  # pylint: disable=too-many-arguments
+    client: github.GitHubApiClient,
+    checkpoint: AuditCheckpoint,
+    *,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    checkpoint_path: Optional[str] = None,
+    report: Optional[IO[str]] = None,
+    index: Optional[auditindex.AuditIndex] = None,
+) -> AuditCheckpoint:
+    """
+    Audit the commits described by `checkpoint`, continuing from its progress.
+
+    Each unverified commit is logged and written to `report` as a line of JSON as soon
+    as it is found. The checkpoint is saved to `checkpoint_path` after every page.
+
+    Each page of commits is also recorded in `index`. Once the audit is complete its
+    head becomes the high-water mark of the audited ref, unless the audit skipped
+    commits because of `since`, `until` or a base other than the last mark.
+    """
+    for commits, next_url in iter_pages(client, checkpoint, since=since, until=until):
+        if index:
+            with metrics.METRICS.timer("index.write"):
+                index.put_many(checkpoint.repo, commits)
+        for commit in commits:
+            checkpoint.record(commit)
+            if not commit.verified:
+                LOGGER.info(
+                    "Unverified commit by %s: %s", commit.author, commit.html_url
+                )
+                if report:
+                    entry = commit_report(checkpoint.repo, commit)
+                    report.write(json.dumps(entry) + "\n")
+
+        checkpoint.next_url = next_url
+        checkpoint.complete = next_url is None
+        if report:
+            report.flush()
+        if checkpoint_path:
+            checkpoint.save(checkpoint_path)
+        LOGGER.debug("Audited %s commits", checkpoint.scanned)
+
+    if index and checkpoint.complete and checkpoint.ref and not since and not until:
+        if checkpoint.base in (
+            None,
+            index.high_water_mark(checkpoint.repo, checkpoint.ref),
+        ):
+            index.set_high_water_mark(checkpoint.repo, checkpoint.ref, checkpoint.head)
+    return checkpoint
+
+
+def iter_pages(
+    client: github.GitHubApiClient,
+    checkpoint: AuditCheckpoint,
+    *,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+) -> Iterator[Tuple[List[github.Commit], Optional[str]]]:
+    """Stream the remaining pages of commits to audit, with each next page's URL."""
+    if checkpoint.complete:
+        return iter(())
+    if checkpoint.base:
+        return client.compare_commit_pages(
+            repo=checkpoint.repo,
+            base=checkpoint.base,
+            head=checkpoint.head,
+            page_url=checkpoint.next_url,
+        )
+    return client.list_commits(
+        repo=checkpoint.repo,
+        sha=checkpoint.head,
+        since=since,
+        until=until,
+        page_url=checkpoint.next_url,
+    )
+
+
+def commit_report(repo: str, commit: github.Commit) -> dict:
+    """Get the audit report entry for an unverified commit of `repo`."""
+    return {
+        "repo": repo,
+        "sha": commit.sha,
+        "author": commit.author,
+        "html_url": commit.html_url,
+    }
+
+
+def open_report(
+    path: Optional[str], *, resume: bool
+) -> ContextManager[Optional[IO[str]]]:
+    """
+    Open the JSON lines report at `path`, appending to it when resuming an audit.
+
+    Without a `path` no report is written.
+    """
+    if not path:
+        return contextlib.nullcontext()
+    return open(path, "a" if resume else "w", encoding="utf-8")
+
+
+def log_summary(checkpoint: AuditCheckpoint):
+    """Log the results of an audit."""
+    LOGGER.info(
+        "Audited %s commits in %s, %s unverified",
+        checkpoint.scanned,
+        checkpoint.repo,
+        checkpoint.unverified,
+    )
+    for author, count in sorted(checkpoint.authors.items(), key=lambda i: -i[1]):
+        LOGGER.info("\t%s: %s unverified commits", author, count)
+
+
+if __name__ == "__main__":
+    action.configure_logging()
+    with profiling.profile():
+        sys.exit(main())
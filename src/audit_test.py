@@ -0,0 +1,238 @@
+"""Unit tests for the audit.py module."""
+import json
+import os
+from unittest import mock
+
+import pytest  # type: ignore
+
+from . import audit
+from . import auditindex
+from .conftest import make_commit
+
+
+def make_pages():
+    """Three pages of commits as yielded by `GitHubApiClient.list_commits`."""
+    return [
+        ([make_commit("hash-1", True), make_commit("hash-2", False)], "page-2"),
+        ([make_commit("hash-3", False, author="user2")], "page-3"),
+        ([make_commit("hash-4", True)], None),
+    ]
+
+
+@pytest.fixture(name="client")
+def fixture_client():
+    """A mock GitHub API client for the `github/repo-name` repo."""
+    client = mock.MagicMock()
+    client.get_repository.return_value = {"default_branch": "main"}
+    client.get_commit.side_effect = lambda repo, sha: make_commit(f"{sha}-sha", True)
+    client.list_commits.return_value = iter(make_pages())
+    return client
+
+
+def test_start_audit_default_branch(client):
+    """Test start_audit resolves the default branch to a commit SHA."""
+    checkpoint = audit.start_audit(client, repo="github/repo-name")
+
+    assert checkpoint.head == "main-sha"
+    assert checkpoint.base is None
+    assert checkpoint.scanned == 0
+
+
+def test_audit(client, tmp_path):
+    """
+    Test audit classifies every streamed commit, writes unverified commits to the
+    report and marks the checkpoint complete.
+    """
+    report_path = tmp_path / "report.jsonl"
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    checkpoint = audit.start_audit(client, repo="github/repo-name", ref="main")
+
+    with open(report_path, "w", encoding="utf-8") as report:
+        audit.audit(client, checkpoint, checkpoint_path=checkpoint_path, report=report)
+
+    assert checkpoint.scanned == 4
+    assert checkpoint.unverified == 2
+    assert checkpoint.authors == {"user1": 1, "user2": 1}
+    assert checkpoint.complete
+    client.list_commits.assert_called_once_with(
+        repo="github/repo-name", sha="main-sha", since=None, until=None, page_url=None
+    )
+
+    lines = report_path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["sha"] for line in lines] == ["hash-2", "hash-3"]
+
+    saved = audit.AuditCheckpoint.load(checkpoint_path)
+    assert saved is not None
+    assert saved.complete
+    assert saved.scanned == 4
+
+
+def test_audit_resume(client, tmp_path):
+    """Test an interrupted audit resumes from the page after its last checkpoint."""
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    checkpoint = audit.start_audit(client, repo="github/repo-name", ref="main")
+
+    def interrupted():
+        yield make_pages()[0]
+        raise ConnectionError("interrupted")
+
+    client.list_commits.return_value = interrupted()
+    with pytest.raises(ConnectionError):
+        audit.audit(client, checkpoint, checkpoint_path=checkpoint_path)
+
+    # Commits pushed since do not restart the audit
+    client.get_commit.side_effect = lambda repo, sha: make_commit("new-sha", True)
+    client.list_commits.return_value = iter(make_pages()[1:])
+    resumed = audit.start_audit(
+        client, repo="github/repo-name", ref="main", checkpoint_path=checkpoint_path
+    )
+    assert resumed.head == "main-sha"
+    assert resumed.scanned == 2
+    assert resumed.next_url == "page-2"
+
+    audit.audit(client, resumed, checkpoint_path=checkpoint_path)
+
+    assert resumed.scanned == 4
+    assert resumed.unverified == 2
+    assert client.list_commits.call_args.kwargs["page_url"] == "page-2"
+
+
+def test_start_audit_other_checkpoint(client, tmp_path):
+    """Test a checkpoint of a different audit is not resumed."""
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    other = audit.AuditCheckpoint(
+        repo="github/repo-name", head="old-sha", ref="main", since="2022-01-01"
+    )
+    other.scanned = 10
+    other.save(checkpoint_path)
+
+    checkpoint = audit.start_audit(
+        client, repo="github/repo-name", ref="main", checkpoint_path=checkpoint_path
+    )
+    assert checkpoint.head == "main-sha"
+    assert checkpoint.scanned == 0
+
+
+def test_start_audit_complete_checkpoint(client, tmp_path):
+    """Test a completed audit is not resumed, the next one starts from the new head."""
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    done = audit.AuditCheckpoint(repo="github/repo-name", head="old-sha", ref="main")
+    done.scanned = 10
+    done.complete = True
+    done.save(checkpoint_path)
+
+    checkpoint = audit.start_audit(
+        client, repo="github/repo-name", ref="main", checkpoint_path=checkpoint_path
+    )
+    assert checkpoint.head == "main-sha"
+    assert not checkpoint.complete
+
+
+def test_audit_range(client):
+    """Test audits of a commit range stream pages from the compare API."""
+    client.compare_commit_pages.return_value = iter(make_pages())
+    checkpoint = audit.start_audit(
+        client, repo="github/repo-name", ref="main", base_ref="v1.0"
+    )
+
+    audit.audit(client, checkpoint)
+
+    assert checkpoint.unverified == 2
+    client.compare_commit_pages.assert_called_once_with(
+        repo="github/repo-name", base="v1.0-sha", head="main-sha", page_url=None
+    )
+    assert not client.list_commits.called
+
+
+def test_audit_complete(client):
+    """Test a complete audit makes no further requests."""
+    checkpoint = audit.AuditCheckpoint(repo="github/repo-name", head="main-sha")
+    checkpoint.complete = True
+
+    audit.audit(client, checkpoint)
+
+    assert not client.list_commits.called
+
+
+@mock.patch("src.audit.github")
+def test_main(mock_github, tmp_path):
+    """Test the audit end-to-end with settings from the environment."""
+    client = mock_github.GitHubApiClient.return_value
+    client.get_repository.return_value = {"default_branch": "main"}
+    client.get_commit.return_value = make_commit("main-sha", True)
+    client.list_commits.return_value = iter(make_pages())
+    env = {
+        "GITHUB_REPOSITORY": "github/repo-name",
+        "GITHUB_TOKEN": "github-test-token",
+        "AUDIT_REPORT_PATH": str(tmp_path / "report.jsonl"),
+    }
+
+    with mock.patch.dict(os.environ, env):
+        assert audit.main() == 1
+
+    mock_github.GitHubApiClient.assert_called_once_with(
+        "github-test-token", response_cache=None
+    )
+    assert len((tmp_path / "report.jsonl").read_text().splitlines()) == 2
+
+
+def test_audit_index_incremental(client, tmp_path):
+    """
+    Test a completed audit records its commits and high-water mark in the index, and
+    the next audit only visits the commits added since.
+    """
+    with auditindex.AuditIndex(str(tmp_path / "index.db")) as index:
+        checkpoint = audit.start_audit(
+            client, repo="github/repo-name", ref="main", index=index
+        )
+        audit.audit(client, checkpoint, index=index)
+
+        assert index.high_water_mark("github/repo-name", "main") == "main-sha"
+        assert index.unverified_authors("github/repo-name") == {
+            "user1": 1,
+            "user2": 1,
+        }
+
+        client.get_commit.side_effect = lambda repo, sha: make_commit("new-sha", True)
+        client.compare_commit_pages.return_value = iter(
+            [([make_commit("hash-5", False)], None)]
+        )
+        checkpoint = audit.start_audit(
+            client, repo="github/repo-name", ref="main", index=index
+        )
+        audit.audit(client, checkpoint, index=index)
+
+        assert checkpoint.scanned == 1
+        client.compare_commit_pages.assert_called_once_with(
+            repo="github/repo-name", base="main-sha", head="new-sha", page_url=None
+        )
+        assert client.list_commits.call_count == 1
+        assert index.high_water_mark("github/repo-name", "main") == "new-sha"
+        assert index.unverified_authors("github/repo-name") == {"user1": 2, "user2": 1}
+
+
+def test_audit_index_up_to_date(client, tmp_path):
+    """Test an audit of a ref that has not moved since its high-water mark is done."""
+    with auditindex.AuditIndex(str(tmp_path / "index.db")) as index:
+        index.set_high_water_mark("github/repo-name", "main", "main-sha")
+        checkpoint = audit.start_audit(
+            client, repo="github/repo-name", ref="main", index=index
+        )
+        audit.audit(client, checkpoint, index=index)
+
+    assert checkpoint.complete
+    assert checkpoint.scanned == 0
+    assert not client.list_commits.called
+    assert not client.compare_commit_pages.called
+
+
+def test_audit_index_filtered_no_mark(client, tmp_path):
+    """Test an audit filtered by date does not move the high-water mark."""
+    with auditindex.AuditIndex(str(tmp_path / "index.db")) as index:
+        checkpoint = audit.start_audit(
+            client, repo="github/repo-name", ref="main", index=index
+        )
+        audit.audit(client, checkpoint, since="2024-01-01T00:00:00Z", index=index)
+
+        assert index.high_water_mark("github/repo-name", "main") is None
+        assert len(index.get_many("github/repo-name", ["hash-1", "hash-4"])) == 2
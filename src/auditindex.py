@@ -0,0 +1,211 @@
+"""
+Local SQLite index of audited commits.
+
+Every commit an audit sees is recorded in the index with its verification status and
+author, and each completed audit of a branch records the commit it reached as the
+branch's high-water mark. The next audit of the branch then only visits the commits
+added since, and questions like "which of our commits are unverified, by author" are
+answered from the index without calling the GitHub API.
+
+The index is a single SQLite file, so it can be kept between scheduled runs like the
+verification cache, and it stays fast with millions of commits: commits are keyed by
+`(repo, sha)`, unverified commits have their own partial index by author, and each page
+of commits is written in a single transaction.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import github
+
+LOGGER = logging.getLogger(__name__)
+
+# Version of the index schema, stored in the database's `user_version`
+SCHEMA_VERSION = 1
+# Statements creating the index schema
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS commits (
+        repo TEXT NOT NULL,
+        sha TEXT NOT NULL,
+        verified INTEGER NOT NULL,
+        author TEXT NOT NULL,
+        html_url TEXT,
+        checked_at INTEGER NOT NULL,
+        PRIMARY KEY (repo, sha)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS commits_unverified_by_author
+    ON commits (repo, author) WHERE verified = 0
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS high_water_marks (
+        repo TEXT NOT NULL,
+        ref TEXT NOT NULL,
+        sha TEXT NOT NULL,
+        checked_at INTEGER NOT NULL,
+        PRIMARY KEY (repo, ref)
+    ) WITHOUT ROWID
+    """,
+)
+
+
+class AuditIndex:
+    """
+    An index of the audited commits of any number of repositories, stored in the SQLite
+    database at `path`.
+
+    Commits are keyed by `(repo, sha)` and hold their verification status, author and
+    the time they were checked. Only unverified commits keep their `html_url`, as only
+    they are reported; verified commits get the github.com URL back when read.
+
+    A single `AuditIndex` is safe to use from several threads.
+    """
+
+    def __init__(self, path: str, clock=time.time):
+        self.path = path
+        self.clock = clock
+
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            self._connection.close()
+            raise ValueError(f"Audit index {path} has unknown schema version {version}")
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.execute("PRAGMA synchronous = NORMAL")
+            for statement in SCHEMA:
+                self._connection.execute(statement)
+            self._connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def __enter__(self) -> "AuditIndex":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
+
+    def put_many(self, repo: str, commits: Iterable[github.Commit]):
+        """Record the verification of `commits` of `repo` in a single transaction."""
+        checked_at = int(self.clock())
+        rows = [
+            (
+                repo,
+                commit.sha,
+                int(commit.verified),
+                commit.author,
+                None if commit.verified else commit.html_url,
+                checked_at,
+            )
+            for commit in commits
+        ]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO commits VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def get_many(self, repo: str, shas: List[str]) -> Dict[str, github.Commit]:
+        """Get the indexed commits of `repo` among `shas`, keyed by SHA."""
+        found: Dict[str, github.Commit] = {}
+        # Stay well below SQLite's limit on the number of query parameters
+        for start in range(0, len(shas), 500):
+            chunk = shas[start : start + 500]
+            with self._lock:
+                rows = self._connection.execute(
+                    "SELECT sha, verified, author, html_url FROM commits "
+                    f"WHERE repo = ? AND sha IN ({', '.join('?' for _ in chunk)})",
+                    [repo, *chunk],
+                ).fetchall()
+            for sha, verified, author, html_url in rows:
+                found[sha] = to_commit(repo, sha, verified, author, html_url)
+        return found
+
+    def high_water_mark(self, repo: str, ref: str) -> Optional[str]:
+        """The SHA the last completed audit of `ref` in `repo` reached, if any."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT sha FROM high_water_marks WHERE repo = ? AND ref = ?",
+                (repo, ref),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_high_water_mark(self, repo: str, ref: str, sha: str):
+        """Record that every commit of `ref` in `repo` up to `sha` has been audited."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO high_water_marks VALUES (?, ?, ?, ?)",
+                (repo, ref, sha, int(self.clock())),
+            )
+
+    def unverified_authors(self, repo: Optional[str] = None) -> Dict[str, int]:
+        """
+        Count the indexed unverified commits of each author, in `repo` or in every
+        repository, most unverified commits first.
+        """
+        query = "SELECT author, COUNT(*) FROM commits WHERE verified = 0"
+        params: List[str] = []
+        if repo:
+            query += " AND repo = ?"
+            params.append(repo)
+        query += " GROUP BY author ORDER BY COUNT(*) DESC, author"
+        with self._lock:
+            return dict(self._connection.execute(query, params).fetchall())
+
+    def unverified_commits(
+        self, repo: Optional[str] = None, *, author: Optional[str] = None
+    ) -> Iterator[Tuple[str, github.Commit]]:
+        """
+        Yield the indexed unverified commits, of `repo` and by `author` when they are
+        given, with the repository each commit belongs to.
+        """
+        query = "SELECT repo, sha, verified, author, html_url FROM commits"
+        query += " WHERE verified = 0"
+        params: List[str] = []
+        if repo:
+            query += " AND repo = ?"
+            params.append(repo)
+        if author:
+            query += " AND author = ?"
+            params.append(author)
+        query += " ORDER BY repo, author, checked_at"
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+        for row_repo, sha, verified, row_author, html_url in rows:
+            yield row_repo, to_commit(row_repo, sha, verified, row_author, html_url)
+
+
+def to_commit(
+    repo: str, sha: str, verified: int, author: str, html_url: Optional[str]
+) -> github.Commit:
+    """Build a `Commit` from an indexed row."""
+    return github.Commit(
+        sha=sha,
+        html_url=html_url or github.commit_html_url(repo, sha),
+        author=author,
+        verified=bool(verified),
+    )
+
+
+def open_index() -> Optional[AuditIndex]:
+    """
+    Open the audit index at the path in the `AUDIT_INDEX_PATH` environment variable,
+    `None` if it is not set.
+
+    Relative paths are relative to the GitHub Actions workspace, `GITHUB_WORKSPACE`.
+    """
+    path = os.environ.get("AUDIT_INDEX_PATH")
+    if not path:
+        return None
+    path = os.path.join(os.environ.get("GITHUB_WORKSPACE", ""), path)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    return AuditIndex(path)
@@ -0,0 +1,103 @@
+"""Unit tests for the auditindex.py module."""
+import pytest  # type: ignore
+
+from . import auditindex
+from .conftest import make_commit
+
+
+@pytest.fixture(name="index")
+def fixture_index(tmp_path):
+    """An empty audit index in a temporary file."""
+    with auditindex.AuditIndex(str(tmp_path / "index.db")) as index:
+        yield index
+
+
+def test_audit_index_get_many(index):
+    """Test get_many returns only the indexed commits of the repo."""
+    index.put_many(
+        "github/repo-name", [make_commit("hash-1", True), make_commit("hash-2", False)]
+    )
+    index.put_many("github/other-repo", [make_commit("hash-3", True)])
+
+    result = index.get_many("github/repo-name", ["hash-1", "hash-2", "hash-3"])
+
+    assert result == {
+        "hash-1": make_commit("hash-1", True),
+        "hash-2": make_commit("hash-2", False),
+    }
+
+
+def test_audit_index_put_many_replaces(index):
+    """Test recording a commit again replaces its earlier record."""
+    index.put_many("github/repo-name", [make_commit("hash-1", False)])
+    index.put_many("github/repo-name", [make_commit("hash-1", True)])
+
+    assert index.get_many("github/repo-name", ["hash-1"]) == {
+        "hash-1": make_commit("hash-1", True)
+    }
+    assert not index.unverified_authors()
+
+
+def test_audit_index_high_water_mark(index):
+    """Test high-water marks are kept for each repo and ref."""
+    assert index.high_water_mark("github/repo-name", "main") is None
+
+    index.set_high_water_mark("github/repo-name", "main", "hash-1")
+    index.set_high_water_mark("github/repo-name", "main", "hash-2")
+    index.set_high_water_mark("github/repo-name", "release", "hash-3")
+
+    assert index.high_water_mark("github/repo-name", "main") == "hash-2"
+    assert index.high_water_mark("github/repo-name", "release") == "hash-3"
+    assert index.high_water_mark("github/other-repo", "main") is None
+
+
+def test_audit_index_unverified_queries(index):
+    """Test unverified commits are counted and listed by repo and author."""
+    index.put_many(
+        "github/repo-name",
+        [
+            make_commit("hash-1", False),
+            make_commit("hash-2", False, author="user2"),
+            make_commit("hash-3", False, author="user2"),
+            make_commit("hash-4", True),
+        ],
+    )
+    index.put_many(
+        "github/other-repo",
+        [make_commit("hash-5", False, repo="github/other-repo")],
+    )
+
+    assert index.unverified_authors() == {"user2": 2, "user1": 2}
+    assert index.unverified_authors("github/repo-name") == {"user2": 2, "user1": 1}
+    assert list(index.unverified_commits("github/repo-name", author="user1")) == [
+        ("github/repo-name", make_commit("hash-1", False))
+    ]
+    assert [commit.sha for _, commit in index.unverified_commits()] == [
+        "hash-5",
+        "hash-1",
+        "hash-2",
+        "hash-3",
+    ]
+
+
+def test_audit_index_persists(tmp_path):
+    """Test an index reopened from its file keeps its commits and marks."""
+    path = str(tmp_path / "index.db")
+    with auditindex.AuditIndex(path) as index:
+        index.put_many("github/repo-name", [make_commit("hash-1", False)])
+        index.set_high_water_mark("github/repo-name", "main", "hash-1")
+
+    with auditindex.AuditIndex(path) as index:
+        assert index.high_water_mark("github/repo-name", "main") == "hash-1"
+        assert index.unverified_authors() == {"user1": 1}
+
+
+def test_audit_index_unknown_schema(tmp_path):
+    """Test an index with a newer schema is refused rather than misread."""
+    path = str(tmp_path / "index.db")
+    with auditindex.AuditIndex(path) as index:
+        # pylint: disable=protected-access
+        index._connection.execute("PRAGMA user_version = 99")
+
+    with pytest.raises(ValueError):
+        auditindex.AuditIndex(path)
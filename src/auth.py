@@ -0,0 +1,110 @@
+"""
+Credentials used to authenticate to the GitHub API.
+
+Each token has its own rate limit, so a `CredentialPool` of several tokens multiplies
+the request budget of a busy scan. Every credential has its own
+`ratelimit.RateLimiter`, and each request is sent with the credential that has the most
+budget left, failing over to the others while one is paused by a rate limit.
+"""
+import abc
+import logging
+import os
+from typing import List, Optional
+
+from . import ratelimit
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Credential(abc.ABC):  # pylint: disable=too-few-public-methods
+    """
+    A credential for the GitHub API, with the `rate_limiter` scheduling the requests
+    sent with it. `name` identifies the credential in logs without revealing it.
+    """
+
+    def __init__(self, *, name: str, rate_limiter: ratelimit.RateLimiter):
+        self.name = name
+        self.rate_limiter = rate_limiter
+
+    @abc.abstractmethod
+    def token(self) -> str:
+        """The token to send the next request with."""
+
+
+class StaticToken(Credential):  # pylint: disable=too-few-public-methods
+    """A personal access token, or the workflow's `GITHUB_TOKEN`."""
+
+    def __init__(
+        self,
+        token: str,
+        *,
+        name: str = "token",
+        rate_limiter: Optional[ratelimit.RateLimiter] = None,
+    ):
+        if not token:
+            raise ValueError("GitHub token value must not be None or empty")
+        super().__init__(
+            name=name, rate_limiter=rate_limiter or ratelimit.RateLimiter()
+        )
+        self._token = token
+
+    def token(self) -> str:
+        return self._token
+
+
+class CredentialPool:
+    """
+    A pool of `credentials`, spreading requests across their rate limits.
+
+    `select` picks the credential to send each request with: the one with the most
+    budget left among those not paused by a rate limit, or the one that resumes first
+    when every credential is paused.
+    """
+
+    def __init__(self, credentials: List[Credential]):
+        if not credentials:
+            raise ValueError("A credential pool needs at least one credential")
+        self.credentials = credentials
+
+    def __len__(self) -> int:
+        return len(self.credentials)
+
+    @classmethod
+    def from_environment(
+        cls, token: str, *, max_concurrency: int, **kwargs
+    ) -> "CredentialPool":
+        """
+        Build the pool of `token` and the comma separated extra tokens in the
+        `GITHUB_TOKENS` environment variable.
+
+        Each credential's rate limiter allows `max_concurrency` requests in flight.
+        `kwargs` are passed to `token`'s `StaticToken`.
+        """
+        credentials: List[Credential] = [StaticToken(token, **kwargs)]
+        extra_tokens = os.environ.get("GITHUB_TOKENS", "").split(",")
+        for index, extra in enumerate(filter(None, map(str.strip, extra_tokens))):
+            credentials.append(
+                StaticToken(
+                    extra,
+                    name=f"token {index + 1}",
+                    rate_limiter=ratelimit.RateLimiter(max_concurrency=max_concurrency),
+                )
+            )
+
+        if len(credentials) > 1:
+            LOGGER.info("Using a pool of %s GitHub API credentials", len(credentials))
+        return cls(credentials)
+
+    def select(self) -> Credential:
+        """The credential to send the next request with."""
+        available = [
+            credential
+            for credential in self.credentials
+            if not credential.rate_limiter.paused
+        ]
+        if not available:
+            return min(
+                self.credentials,
+                key=lambda credential: credential.rate_limiter.blocked_until,
+            )
+        return max(available, key=lambda credential: credential.rate_limiter.budget)
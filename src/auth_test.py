@@ -0,0 +1,79 @@
+"""Unit tests for the auth.py module."""
+import os
+from unittest import mock
+
+import pytest  # type: ignore
+
+from . import auth, ratelimit
+
+
+def make_token(name, *, remaining=None, blocked_until=0.0, now=1000.0):
+    """Build a static token whose rate limiter is in the given state."""
+    limiter = ratelimit.RateLimiter(clock=lambda: now)
+    limiter.remaining = remaining
+    limiter.reset_at = now + 3600 if remaining is not None else 0.0
+    limiter.blocked_until = blocked_until
+    return auth.StaticToken(name, name=name, rate_limiter=limiter)
+
+
+def test_static_token_empty():
+    """Test a static token must not be empty."""
+    with pytest.raises(ValueError):
+        auth.StaticToken("")
+
+
+def test_credential_abstract():
+    """Test a credential must implement `token`."""
+    with pytest.raises(TypeError):
+        auth.Credential(  # pylint: disable=abstract-class-instantiated
+            name="base", rate_limiter=ratelimit.RateLimiter()
+        )
+
+
+def test_credential_pool_select_most_budget():
+    """Test the credential with the most remaining budget is selected."""
+    pool = auth.CredentialPool(
+        [make_token("low", remaining=10), make_token("high", remaining=4000)]
+    )
+    assert pool.select().name == "high"
+
+
+def test_credential_pool_select_unknown_budget():
+    """Test a credential whose budget is not known yet is preferred."""
+    pool = auth.CredentialPool([make_token("used", remaining=4000), make_token("new")])
+    assert pool.select().name == "new"
+
+
+def test_credential_pool_fail_over():
+    """Test credentials paused by a rate limit are skipped while others are not."""
+    pool = auth.CredentialPool(
+        [make_token("paused", blocked_until=2000.0), make_token("low", remaining=5)]
+    )
+    assert pool.select().name == "low"
+
+
+def test_credential_pool_all_paused():
+    """Test the credential that resumes first is selected when every one is paused."""
+    pool = auth.CredentialPool(
+        [
+            make_token("later", blocked_until=3000.0),
+            make_token("sooner", blocked_until=2000.0),
+        ]
+    )
+    assert pool.select().name == "sooner"
+
+
+def test_credential_pool_from_environment():
+    """Test extra tokens are added to the pool from the environment."""
+    with mock.patch.dict(os.environ, {"GITHUB_TOKENS": "token-1, token-2,"}):
+        pool = auth.CredentialPool.from_environment(
+            "github-test-token", max_concurrency=4
+        )
+
+    assert [credential.name for credential in pool.credentials] == [
+        "token",
+        "token 1",
+        "token 2",
+    ]
+    assert pool.credentials[1].token() == "token-1"
+    assert pool.credentials[1].rate_limiter.max_concurrency == 4
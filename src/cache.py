@@ -0,0 +1,120 @@
+"""Persistent cache of commit verification results."""
+import collections
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from . import github, storage
+
+LOGGER = logging.getLogger(__name__)
+
+# Default maximum number of commits kept in the cache
+DEFAULT_MAX_ENTRIES = 10000
+# Version of the on-disk format, caches with a different version are ignored
+CACHE_VERSION = 1
+
+# A cached commit's `(repo, sha)` key and its `(verified, author)` value
+CacheKey = Tuple[str, str]
+CacheValue = Tuple[bool, str]
+
+
+class VerificationCache:
+    """
+    A size bounded LRU cache of commit verification results, keyed by `(repo, sha)`.
+
+    A commit's verification status never changes once GitHub has computed it, so
+    entries never expire and are only evicted once more than `max_entries` commits are
+    cached, least recently used first.
+
+    On disk the cache is a gzipped JSON document holding one `[repo, sha, verified,
+    author]` entry per commit, from least to most recently used.
+    """
+
+    def __init__(
+        self, path: Optional[str] = None, max_entries: int = DEFAULT_MAX_ENTRIES
+    ):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: "collections.OrderedDict[CacheKey, CacheValue]"
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @classmethod
+    def load(
+        cls, path: str, max_entries: int = DEFAULT_MAX_ENTRIES
+    ) -> "VerificationCache":
+        """
+        Load a cache from the file at `path`, an empty cache if the file is missing,
+        unreadable, outdated or has a malformed entry.
+        """
+        cache = cls(path, max_entries)
+        entries = storage.load_entries(
+            path, version=CACHE_VERSION, kind="verification cache"
+        )
+        try:
+            for repo, sha, verified, author in entries:
+                cache._store(repo, sha, bool(verified), author)
+        except (TypeError, ValueError) as ex:
+            LOGGER.warning("Ignoring malformed verification cache %s: %s", path, ex)
+            return cls(path, max_entries)
+        LOGGER.debug("Loaded %s commits from verification cache %s", len(cache), path)
+        return cache
+
+    def save(self):
+        """Atomically write the cache to its `path`."""
+        if not self.path:
+            raise ValueError("VerificationCache has no path to save to")
+
+        with self._lock:
+            entries = [
+                [repo, sha, int(verified), author]
+                for (repo, sha), (verified, author) in self._entries.items()
+            ]
+
+        storage.save_entries(self.path, entries, version=CACHE_VERSION)
+        LOGGER.debug(
+            "Saved %s commits to verification cache %s", len(entries), self.path
+        )
+
+    def get_many(self, repo: str, shas: Iterable[str]) -> Dict[str, github.Commit]:
+        """
+        Get the cached commits of `repo` for each of `shas`, keyed by SHA.
+
+        SHAs not in the cache are left out of the result.
+        """
+        found = {}
+        with self._lock:
+            for sha in shas:
+                entry = self._entries.get((repo, sha))
+                if entry is None:
+                    self.misses += 1
+                    continue
+                self.hits += 1
+                self._entries.move_to_end((repo, sha))
+                verified, author = entry
+                found[sha] = github.Commit(
+                    sha=sha,
+                    html_url=github.commit_html_url(repo, sha),
+                    author=author,
+                    verified=verified,
+                )
+        return found
+
+    def put_many(self, repo: str, commits: List[github.Commit]):
+        """Add commits from `repo` to the cache."""
+        with self._lock:
+            for commit in commits:
+                self._store(repo, commit.sha, commit.verified, commit.author)
+
+    def _store(self, repo: str, sha: str, verified: bool, author: str):
+        """Store a single entry, evicting the least recently used if needed."""
+        self._entries[(repo, sha)] = (verified, author)
+        self._entries.move_to_end((repo, sha))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,118 @@
+"""Unit tests for the cache.py module."""
+import gzip
+import json
+import os
+from unittest import mock
+
+from . import cache
+from .conftest import make_commit
+
+
+def test_verification_cache_get_many():
+    """Test get_many returns only cached commits and counts hits and misses."""
+    verification_cache = cache.VerificationCache()
+    verification_cache.put_many(
+        "github/repo-name", [make_commit("hash-1", True), make_commit("hash-2", False)]
+    )
+
+    result = verification_cache.get_many(
+        "github/repo-name", ["hash-1", "hash-2", "hash-3"]
+    )
+
+    assert result == {
+        "hash-1": make_commit("hash-1", True),
+        "hash-2": make_commit("hash-2", False),
+    }
+    assert verification_cache.hits == 2
+    assert verification_cache.misses == 1
+
+
+def test_verification_cache_keyed_by_repo():
+    """Test commits are cached separately for each repo."""
+    verification_cache = cache.VerificationCache()
+    verification_cache.put_many("github/repo-name", [make_commit("hash-1", True)])
+
+    assert not verification_cache.get_many("github/other-repo", ["hash-1"])
+
+
+def test_verification_cache_lru_eviction():
+    """Test the least recently used commits are evicted once the cache is full."""
+    verification_cache = cache.VerificationCache(max_entries=2)
+    verification_cache.put_many(
+        "github/repo-name", [make_commit("hash-1", True), make_commit("hash-2", True)]
+    )
+    verification_cache.get_many("github/repo-name", ["hash-1"])
+    verification_cache.put_many("github/repo-name", [make_commit("hash-3", True)])
+
+    result = verification_cache.get_many(
+        "github/repo-name", ["hash-1", "hash-2", "hash-3"]
+    )
+    assert set(result) == {"hash-1", "hash-3"}
+    assert len(verification_cache) == 2
+
+
+def test_verification_cache_save_and_load(tmp_path):
+    """Test a saved cache loads back with the same entries in the same LRU order."""
+    path = str(tmp_path / "cache" / "verification.json.gz")
+    verification_cache = cache.VerificationCache(path)
+    verification_cache.put_many(
+        "github/repo-name",
+        [make_commit("hash-1", True), make_commit("hash-2", False, author="User Two")],
+    )
+    verification_cache.save()
+
+    loaded = cache.VerificationCache.load(path, max_entries=1)
+
+    assert len(loaded) == 1
+    assert loaded.get_many("github/repo-name", ["hash-2"]) == {
+        "hash-2": make_commit("hash-2", False, author="User Two")
+    }
+
+
+def test_verification_cache_load_missing(tmp_path):
+    """Test loading a cache file that does not exist gives an empty cache."""
+    loaded = cache.VerificationCache.load(str(tmp_path / "missing.json.gz"))
+    assert len(loaded) == 0
+
+
+def test_verification_cache_load_corrupt(tmp_path):
+    """Test loading a corrupt cache file gives an empty cache instead of failing."""
+    path = tmp_path / "corrupt.json.gz"
+    path.write_bytes(b"not gzip")
+
+    loaded = cache.VerificationCache.load(str(path))
+    assert len(loaded) == 0
+
+
+def test_verification_cache_load_other_version(tmp_path):
+    """Test loading a cache file with a different format version is ignored."""
+    path = tmp_path / "old.json.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        json.dump({"version": 0, "entries": [["github/repo-name", "a", 1, "b"]]}, file)
+
+    loaded = cache.VerificationCache.load(str(path))
+    assert len(loaded) == 0
+
+
+def test_verification_cache_load_malformed_entry(tmp_path):
+    """Test a cache file with a malformed entry is discarded instead of failing."""
+    path = tmp_path / "malformed.json.gz"
+    entries = [["github/repo-name", "a", 1, "b"], ["github/repo-name", "c"]]
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        json.dump({"version": cache.CACHE_VERSION, "entries": entries}, file)
+
+    loaded = cache.VerificationCache.load(str(path))
+    assert len(loaded) == 0
+
+
+def test_verification_cache_server_url():
+    """Test cached commits link to the GitHub Enterprise Server of the run."""
+    verification_cache = cache.VerificationCache()
+    verification_cache.put_many("github/repo-name", [make_commit("hash-1", True)])
+
+    with mock.patch.dict(os.environ, {"GITHUB_SERVER_URL": "https://ghe.example.com"}):
+        found = verification_cache.get_many("github/repo-name", ["hash-1"])
+    assert (
+        found["hash-1"].html_url
+        == "https://ghe.example.com/github/repo-name/commit/hash-1"
+    )
@@ -0,0 +1,8 @@
+"""Helpers shared by the unit tests."""
+from . import github
+
+
+def make_commit(sha, verified, author="user1", repo="github/repo-name"):
+    """Build a commit of `repo` for tests."""
+    html_url = github.commit_html_url(repo, sha)
+    return github.Commit(sha=sha, html_url=html_url, author=author, verified=verified)
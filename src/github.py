@@ -1,24 +1,181 @@
 """API interactions with GitHub."""
 import logging
 import json
+import os
+import random
+import threading
 from urllib import parse
-from typing import Dict, Optional
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
-import requests
+from . import auth, httpcache, metrics, ratelimit, transport
 
 LOGGER = logging.getLogger(__name__)
 
+# Default maximum number of kept-alive connections to the GitHub API
+DEFAULT_POOL_SIZE = 10
+# Default number of times a request is retried after a connection error or 5xx status
+DEFAULT_RETRIES = 3
+# Default base delay in seconds between retries, doubled after each failed attempt
+DEFAULT_BACKOFF = 0.5
+# Upper bound in seconds on the delay between retries
+MAX_BACKOFF = 30.0
+# Default timeout in seconds for connecting to and reading from the GitHub API
+DEFAULT_TIMEOUT = 30.0
+# Default number of times a request is retried after being rejected by a rate limit
+DEFAULT_RATE_LIMIT_RETRIES = 10
 
-class GitHubApiClient:
-    """API Client for interacting with GitHub's v3 REST API."""
+# Maximum number of commits listed by the pull request commits endpoint
+PULL_REQUEST_COMMITS_LIMIT = 250
+
+# Number of commits resolved by a single GraphQL query, each commit is one aliased
+# `object(oid:)` lookup so this keeps every query well inside GitHub's node limits.
+GRAPHQL_CHUNK_SIZE = 100
+
+GRAPHQL_COMMIT_FRAGMENT = """
+fragment VerifiedCommit on Commit {
+  oid
+  url
+  signature { isValid }
+  author { name user { login } }
+}
+"""
+
+
+class RequestCancelled(Exception):
+    """Raised by requests started after their `GitHubApiClient` was cancelled."""
+
+
+class Commit:
+    """
+    The verification details of a git commit on GitHub.
+
+    Only the fields needed to check and report on a commit are kept, API responses are
+    projected to a `Commit` as soon as they are received so the rest of the payload can
+    be freed straight away.
+
+    `author` is the GitHub login of the commit's author, or the author's git name if
+    the commit is not linked to a GitHub user.
+    """
+
+    __slots__ = ("sha", "html_url", "author", "verified")
+
+    def __init__(self, *, sha: str, html_url: str, author: str, verified: bool):
+        self.sha = sha
+        self.html_url = html_url
+        self.author = author
+        self.verified = verified
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Commit):
+            return NotImplemented
+        return all(
+            getattr(self, slot) == getattr(other, slot) for slot in self.__slots__
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"Commit(sha={self.sha!r}, author={self.author!r}, "
+            f"verified={self.verified!r})"
+        )
+
+    @classmethod
+    def from_rest(cls, payload: dict) -> "Commit":
+        """Project a REST API commit object to a `Commit`."""
+        user = payload.get("author") or {}
+        return cls(
+            sha=payload["sha"],
+            html_url=payload["html_url"],
+            author=user.get("login") or payload["commit"]["author"]["name"],
+            verified=payload["commit"]["verification"]["verified"],
+        )
+
+    @classmethod
+    def from_graphql(cls, node: dict) -> "Commit":
+        """Project a `VerifiedCommit` GraphQL node to a `Commit`."""
+        author = node.get("author") or {}
+        user = author.get("user") or {}
+        signature = node.get("signature") or {}
+        return cls(
+            sha=node["oid"],
+            html_url=node["url"],
+            author=user.get("login") or author.get("name") or "",
+            verified=bool(signature.get("isValid")),
+        )
+
+
+class GitHubApiClient:  # pylint: disable=too-many-instance-attributes
+    """
+    API Client for interacting with GitHub's v3 REST API.
+
+    Each client owns a pooled HTTP session, so connections to GitHub are kept alive and
+    reused between requests. Requests that fail with a connection error or a 5xx status
+    code are retried up to `retries` times with exponential backoff and jitter.
+
+    Requests are scheduled by a `ratelimit.RateLimiter`, which can be shared between
+    clients that use the same token. Requests rejected by a rate limit are retried once
+    the limit allows, up to `rate_limit_retries` times.
+
+    Requests are sent with the `credentials` pool, by default `token` and any extra
+    credentials configured in the environment (see `auth.CredentialPool`). Each request
+    uses the credential with the most rate limit budget left, so a rate limited
+    request is retried with another credential when one has budget.
+
+    The API is reached at `GITHUB_API_URL` and `GITHUB_GRAPHQL_URL` when they are set,
+    as they are on GitHub Enterprise Server, or github.com's API otherwise.
+
+    Once `cancel` is called, requests that have not been sent yet, including retries,
+    raise `RequestCancelled` instead.
+
+    With a `response_cache`, GET requests are sent as conditional requests revalidating
+    the cached response to the same URL, and `304 Not Modified` responses, which do not
+    count against the rate limit, are answered from the cache.
+    """
 
     base_url = "https://api.github.com"
+    graphql_url = "https://api.github.com/graphql"
 
-    def __init__(self, token):
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        token,
+        *,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        timeout: float = DEFAULT_TIMEOUT,
+        rate_limiter: Optional[ratelimit.RateLimiter] = None,
+        rate_limit_retries: int = DEFAULT_RATE_LIMIT_RETRIES,
+        response_cache: Optional[httpcache.ResponseCache] = None,
+        credentials: Optional[auth.CredentialPool] = None,
+    ):
         self.token = token
         if not self.token:
             raise ValueError("GitHub token value must not be None or empty")
 
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.rate_limit_retries = rate_limit_retries
+        self.response_cache = response_cache
+
+        self.base_url = os.environ.get("GITHUB_API_URL") or self.base_url
+        self.graphql_url = os.environ.get("GITHUB_GRAPHQL_URL") or self.graphql_url
+
+        self.credentials = credentials or auth.CredentialPool.from_environment(
+            token,
+            max_concurrency=pool_size,
+            rate_limiter=rate_limiter
+            or ratelimit.RateLimiter(max_concurrency=pool_size),
+        )
+        self.rate_limiter = self.credentials.credentials[0].rate_limiter
+
+        self.session = transport.new_session(pool_size=pool_size)
+        self.session.headers.update(self.headers(None))
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Stop sending requests, so outstanding lookups finish as soon as possible."""
+        self._cancelled.set()
+
     def headers(self, extra: Optional[Dict[str, str]]) -> Dict[str, str]:
         """
         Generate a dict of headers to include in each request.
@@ -36,6 +193,96 @@ class GitHubApiClient:
 
         return {**headers, **extra}
 
+    def request(self, method: str, url: str, **kwargs) -> transport.Response:
+        """
+        Perform a HTTP request through the client's session, retrying on connection
+        errors, 5xx responses and rate limits.
+
+        The default headers are already set on the session, so any `headers` passed in
+        `kwargs` only need to contain the headers specific to this request.
+        """
+        if kwargs.get("json") is not None:
+            metrics.METRICS.increment(
+                "github.bytes_sent", len(transport.dumps(kwargs["json"]))
+            )
+
+        attempt = 0
+        rate_limited = 0
+        while True:
+            if self._cancelled.is_set():
+                raise RequestCancelled(f"{method} {url} was cancelled")
+            credential = self.credentials.select()
+            request_kwargs = kwargs
+            token = credential.token()
+            if token != self.token:
+                # The session's default headers authenticate with `token`
+                headers = {**(kwargs.get("headers") or {})}
+                headers["Authorization"] = f"token {token}"
+                request_kwargs = {**kwargs, "headers": headers}
+
+            rate_limiter = credential.rate_limiter
+            self._acquire(rate_limiter, method, url)
+            resp: Optional[transport.Response] = None
+            try:
+                metrics.METRICS.increment("github.requests")
+                with metrics.METRICS.timer("github.request"):
+                    resp = self.session.request(
+                        method, url, timeout=self.timeout, **request_kwargs
+                    )
+            except transport.transient_errors() as ex:
+                metrics.METRICS.increment("github.errors")
+                if attempt >= self.retries:
+                    raise
+                LOGGER.warning("%s %s failed, retrying: %s", method, url, ex)
+            finally:
+                # Release the slot whatever the request raised, or it is never freed
+                limited = rate_limiter.release(resp)
+
+            if resp is not None:
+                metrics.METRICS.increment(
+                    "github.bytes_received", len(resp.content or b"")
+                )
+                if limited:
+                    metrics.METRICS.increment("github.rate_limited")
+                    if rate_limited < self.rate_limit_retries:
+                        # The next attempt uses another credential with budget left, or
+                        # the rate limiter waits out the limit
+                        rate_limited += 1
+                        continue
+                    return resp
+                if resp.status_code < 500 or attempt >= self.retries:
+                    return resp
+                metrics.METRICS.increment("github.errors")
+                LOGGER.warning(
+                    "%s %s returned %s, retrying", method, url, resp.status_code
+                )
+
+            metrics.METRICS.increment("github.retries")
+            if self._cancelled.wait(backoff_delay(attempt, self.backoff)):
+                raise RequestCancelled(f"{method} {url} was cancelled")
+            attempt += 1
+
+    def _acquire(self, rate_limiter: ratelimit.RateLimiter, method: str, url: str):
+        """
+        Acquire a slot of `rate_limiter` for a request, raising `RequestCancelled`
+        instead if the client is cancelled while waiting for it.
+        """
+        if not rate_limiter.acquire(self._cancelled):
+            raise RequestCancelled(f"{method} {url} was cancelled")
+        if self._cancelled.is_set():
+            # Cancelled just as the slot was acquired, so it is never used
+            rate_limiter.release(None)
+            raise RequestCancelled(f"{method} {url} was cancelled")
+
+    def url(self, endpoint: str) -> str:
+        """
+        Get the URL of an API `endpoint`, relative to `base_url` even when that has a
+        path, like `/api/v3` on GitHub Enterprise Server.
+
+        Full URLs, like the pagination links in responses, are returned unchanged.
+        """
+        return parse.urljoin(f"{self.base_url.rstrip('/')}/", endpoint.lstrip("/"))
+
     def get(
         self,
         endpoint: str,
@@ -44,26 +291,312 @@ class GitHubApiClient:
         headers: Optional[Dict[str, str]] = None,
     ) -> Optional[dict]:
         """Perform a HTTP GET request and unwrap the response."""
-        headers = self.headers(headers)
-        url = parse.urljoin(self.base_url, endpoint)
+        url = self.url(endpoint)
 
-        LOGGER.debug(f"GET {url}")
-        resp = requests.get(url, params=params, headers=headers)
+        LOGGER.debug("GET %s", url)
+        resp = self.request_cached(url, params=params, headers=headers)
         return unwrap_requests_response(resp)
 
-    def get_commit(self, *, repo: str, sha: str) -> dict:
-        """Get the details of a specified git commit."""
-        LOGGER.debug(f"get_commit({repo}, {sha})")
+    def request_cached(
+        self,
+        url: str,
+        *,
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> transport.Response:
+        """
+        Perform a HTTP GET request, revalidating the cached response to the same URL
+        when the client has a `response_cache`.
+        """
+        if self.response_cache is None:
+            return self.request("GET", url, params=params, headers=headers)
+
+        key = transport.add_params(url, params) if params else url
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            headers = {**(headers or {}), **cached.validators}
+
+        resp = self.request("GET", url, params=params, headers=headers)
+        if resp.status_code == 304 and cached is not None:
+            metrics.METRICS.increment("github.not_modified")
+            return cached.response()
+        if resp.status_code == 200:
+            self.response_cache.put(key, resp)
+        return resp
+
+    def get_pages(
+        self,
+        endpoint: str,
+        *,
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Iterator[Union[dict, list]]:
+        """
+        Perform HTTP GET requests following the `Link: rel="next"` pagination header,
+        yielding the unwrapped response of each page as it is fetched.
+        """
+        for body, _ in self.get_linked_pages(endpoint, params=params, headers=headers):
+            yield body
+
+    def get_linked_pages(
+        self,
+        endpoint: str,
+        *,
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Iterator[Tuple[Union[dict, list], Optional[str]]]:
+        """
+        Like `get_pages`, but yields each page together with the URL of the next page,
+        or `None` on the last page.
+
+        `endpoint` can also be the URL of a page returned by an earlier call, which
+        resumes the walk from that page.
+        """
+        url: Optional[str] = self.url(endpoint)
+
+        while url:
+            LOGGER.debug("GET %s", url)
+            resp = self.request_cached(url, params=params, headers=headers)
+            body = unwrap_requests_response(resp)
+            if body is None:
+                raise ValueError(f"Invalid empty response from GitHub API {url}")
+
+            # The next page URL already includes the original query parameters
+            url = resp.links.get("next", {}).get("url")
+            params = None
+            yield body, url
+
+    def post(
+        self,
+        endpoint: str,
+        *,
+        body: dict,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Optional[dict]:
+        """Perform a HTTP POST request with a JSON `body` and unwrap the response."""
+        url = self.url(endpoint)
+
+        LOGGER.debug("POST %s", url)
+        resp = self.request("POST", url, json=body, headers=headers)
+        return unwrap_requests_response(resp)
+
+    def graphql(self, query: str, variables: Dict[str, str]) -> dict:
+        """Run a query against GitHub's v4 GraphQL API and return its `data`."""
+        resp = self.post(
+            self.graphql_url, body={"query": query, "variables": variables}
+        )
+        if not resp:
+            raise ValueError("Invalid empty response from GitHub GraphQL API")
+        if resp.get("errors"):
+            LOGGER.debug("GitHub GraphQL errors: %s", json.dumps(resp["errors"]))
+            messages = "; ".join(error.get("message", "") for error in resp["errors"])
+            raise ValueError(f"GitHub GraphQL API error: {messages}")
+        return resp["data"]
+
+    def get_commit(self, *, repo: str, sha: str) -> Commit:
+        """
+        Get the details of a specified git commit.
+
+        The commit is read from the list commits endpoint, starting at `sha`, which
+        unlike the single commit endpoint does not include the commit's diff. When the
+        listed commit is not `sha` itself, as for an abbreviated SHA or a ref, it is
+        read from the single commit endpoint instead.
+        """
+        LOGGER.debug("get_commit(%s, %s)", repo, sha)
+        endpoint = f"/repos/{repo}/commits"
+        resp = self.get(endpoint, params={"sha": sha, "per_page": "1"})
+        if not resp:
+            raise ValueError(f"Invalid empty response from GitHub API {endpoint}")
+        if resp[0]["sha"] == sha:
+            return Commit.from_rest(resp[0])
+
         endpoint = f"/repos/{repo}/commits/{sha}"
         resp = self.get(endpoint)
+        if not resp:
+            raise ValueError(f"Invalid empty response from GitHub API {endpoint}")
+        return Commit.from_rest(resp)
+
+    def get_repository(self, *, repo: str) -> dict:
+        """Get the details of a GitHub repository."""
+        LOGGER.debug("get_repository(%s)", repo)
+        endpoint = f"/repos/{repo}"
+        resp = self.get(endpoint)
         if not resp:
             raise ValueError(f"Invalid empty response from GitHub API {endpoint}")
         return resp
 
+    def list_repositories(self, *, owner: str, per_page: int = 100) -> Iterator[dict]:
+        """
+        List the repositories of the organisation or user `owner`, streaming them a
+        page of `per_page` at a time.
+        """
+        LOGGER.debug("list_repositories(%s)", owner)
+        account = self.get(f"/users/{owner}")
+        if not isinstance(account, dict):
+            raise ValueError(f"Invalid response from GitHub API for user {owner}")
+
+        kind = "orgs" if account.get("type") == "Organization" else "users"
+        params = {"per_page": str(per_page)}
+        for page in self.get_pages(f"/{kind}/{owner}/repos", params=params):
+            if not isinstance(page, list):
+                raise ValueError(f"Invalid response from GitHub API {owner} repos")
+            yield from page
+
+    def list_commits(  # pylint: disable=too-many-arguments
+        self,
+        *,
+        repo: str,
+        sha: str,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        per_page: int = 100,
+        page_url: Optional[str] = None,
+    ) -> Iterator[Tuple[List[Commit], Optional[str]]]:
+        """
+        Walk the history of `repo` from `sha` backwards, `per_page` commits at a time.
+
+        `since` and `until` optionally limit the walk to commits made between these ISO
+        8601 timestamps.
+
+        Yields each page of commits together with the URL of the next page, which can
+        be passed back as `page_url` to resume the walk from that page.
+        """
+        LOGGER.debug("list_commits(%s, %s)", repo, sha)
+        params = {"sha": sha, "per_page": str(per_page)}
+        if since:
+            params["since"] = since
+        if until:
+            params["until"] = until
+
+        if page_url:
+            pages = self.get_linked_pages(page_url)
+        else:
+            pages = self.get_linked_pages(f"/repos/{repo}/commits", params=params)
+        for page, next_url in pages:
+            if not isinstance(page, list):
+                raise ValueError(f"Invalid response from GitHub API {repo} commits")
+            yield [Commit.from_rest(commit) for commit in page], next_url
+
+    def list_pull_request_commits(
+        self, *, repo: str, number: int, per_page: int = 100
+    ) -> Iterator[Commit]:
+        """
+        Get the commits of pull request `number`, oldest first, `per_page` at a time.
+
+        The endpoint lists at most `PULL_REQUEST_COMMITS_LIMIT` commits, larger pull
+        requests should be listed with `compare_commits` between their base and head.
+        """
+        LOGGER.debug("list_pull_request_commits(%s, %s)", repo, number)
+        endpoint = f"/repos/{repo}/pulls/{number}/commits"
+        for page in self.get_pages(endpoint, params={"per_page": str(per_page)}):
+            if not isinstance(page, list):
+                raise ValueError(f"Invalid response from GitHub API {endpoint}")
+            yield from (Commit.from_rest(commit) for commit in page)
+
+    def compare_commits(
+        self, *, repo: str, base: str, head: str, per_page: int = 100
+    ) -> Iterator[Commit]:
+        """
+        Get the commits reachable from `head` but not from `base`, oldest first.
+
+        Commits are fetched `per_page` at a time through the paginated compare endpoint.
+        """
+        for commits, _ in self.compare_commit_pages(
+            repo=repo, base=base, head=head, per_page=per_page
+        ):
+            yield from commits
+
+    def compare_commit_pages(  # pylint: disable=too-many-arguments
+        self,
+        *,
+        repo: str,
+        base: str,
+        head: str,
+        per_page: int = 100,
+        page_url: Optional[str] = None,
+    ) -> Iterator[Tuple[List[Commit], Optional[str]]]:
+        """
+        Like `compare_commits`, but yields each page of commits together with the URL
+        of the next page, which can be passed back as `page_url` to resume from it.
+        """
+        LOGGER.debug("compare_commits(%s, %s...%s)", repo, base, head)
+        endpoint = f"/repos/{repo}/compare/{base}...{head}"
+        if page_url:
+            pages = self.get_linked_pages(page_url)
+        else:
+            pages = self.get_linked_pages(endpoint, params={"per_page": str(per_page)})
+        for page, next_url in pages:
+            if not isinstance(page, dict):
+                raise ValueError(f"Invalid response from GitHub API {endpoint}")
+            yield [
+                Commit.from_rest(commit) for commit in page.get("commits", [])
+            ], next_url
+
+    def get_commits(
+        self, *, repo: str, shas: List[str], chunk_size: int = GRAPHQL_CHUNK_SIZE
+    ) -> List[Commit]:
+        """
+        Get the verification details of many git commits through the GraphQL API.
+
+        The commits are resolved `chunk_size` at a time, so each chunk costs a single
+        request. The returned commits are in the same order as `shas`.
+        """
+        LOGGER.debug("get_commits(%s, %s commits)", repo, len(shas))
+        owner, name = repo.split("/", 1)
+        commits = []
+
+        for start in range(0, len(shas), chunk_size):
+            chunk = shas[start : start + chunk_size]
+            variables = {"owner": owner, "name": name}
+            variables.update({f"oid{i}": sha for i, sha in enumerate(chunk)})
+
+            data = self.graphql(build_commits_query(len(chunk)), variables)
+            repository = data.get("repository") or {}
+            for i, sha in enumerate(chunk):
+                node = repository.get(f"c{i}")
+                if not node:
+                    raise ValueError(f"Commit {sha} not found in {repo}")
+                commits.append(Commit.from_graphql(node))
+
+        return commits
+
+
+def backoff_delay(attempt: int, backoff: float) -> float:
+    """
+    Get the delay before retrying a request that has already failed `attempt + 1`
+    times, using exponential backoff with full jitter.
+    """
+    return random.uniform(0, min(MAX_BACKOFF, backoff * 2**attempt))
+
+
+def build_commits_query(count: int) -> str:
+    """Build a GraphQL query that looks up `count` commits by their object ID."""
+    params = ", ".join(f"$oid{i}: GitObjectID!" for i in range(count))
+    lookups = "\n".join(
+        f"    c{i}: object(oid: $oid{i}) {{ ...VerifiedCommit }}" for i in range(count)
+    )
+    return (
+        f"query($owner: String!, $name: String!, {params}) {{\n"
+        "  repository(owner: $owner, name: $name) {\n"
+        f"{lookups}\n"
+        "  }\n"
+        "}\n"
+        f"{GRAPHQL_COMMIT_FRAGMENT}"
+    )
+
+
+def commit_html_url(repo: str, sha: str) -> str:
+    """
+    Get the URL of the web page for a commit on GitHub, or on the GitHub Enterprise
+    Server in `GITHUB_SERVER_URL`.
+    """
+    server_url = os.environ.get("GITHUB_SERVER_URL") or "https://github.com"
+    return f"{server_url.rstrip('/')}/{repo}/commit/{sha}"
+
 
-def unwrap_requests_response(response: requests.Response) -> Optional[dict]:
+def unwrap_requests_response(response: transport.Response) -> Optional[dict]:
     """
-    Get JSON body from a `requests.Response` and check the response status code is in
+    Get JSON body from a response and check the response status code is in
     [200, 300).
     """
     body = None
@@ -71,15 +604,15 @@ def unwrap_requests_response(response: requests.Response) -> Optional[dict]:
         try:
             body = response.json()
         except Exception as ex:
-            LOGGER.error(f"Error reading JSON from response body: {ex}")
-            LOGGER.debug(f"Raw GitHub API response: {response.text}")
+            LOGGER.error("Error reading JSON from response body: %s", ex)
+            LOGGER.debug("Raw GitHub API response: %s", response.text)
             raise ex
 
     try:
         response.raise_for_status()
     except Exception as ex:
-        LOGGER.error(f"GitHub API error: {ex}")
-        LOGGER.debug(f"GitHub API response body: {json.dumps(body, indent=2)}")
+        LOGGER.error("GitHub API error: %s", ex)
+        LOGGER.debug("GitHub API response body: %s", json.dumps(body, indent=2))
         raise ex
 
     return body
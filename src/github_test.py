@@ -1,10 +1,12 @@
 """Unit tests for the github.py module."""
 import json
+import os
 from unittest import mock
 
 import pytest  # type: ignore
+import requests
 
-from . import github
+from . import auth, github, httpcache, metrics, ratelimit, transport
 
 
 def test_unwrap_requests_response_no_body_okay():
@@ -68,11 +70,53 @@ def test_github_api_client_headers(extra):
         assert headers["Authorization"] == "token github-test-token"
 
 
-@mock.patch("src.github.requests")
-def test_github_api_client_get(requests):
+def rest_commit(sha, verified, login="user1"):
+    """Build a REST API commit object for tests."""
+    return {
+        "sha": sha,
+        "html_url": f"https://github.com/github/repo-name/commit/{sha}",
+        "author": {"login": login} if login else None,
+        "commit": {
+            "author": {"name": "User One"},
+            "verification": {"verified": verified},
+        },
+        "files": [{"patch": "@@ -1 +1 @@"}],
+    }
+
+
+@pytest.fixture(name="session")
+def fixture_session():
+    """
+    Patch the session created by `GitHubApiClient`, with requests returning an okay
+    response by default.
+    """
+    with mock.patch("src.github.transport.new_session") as new_session:
+        session = new_session.return_value
+        session.request.return_value.status_code = 200
+        session.request.return_value.headers = {}
+        yield session
+
+
+def test_github_api_client_session(session):
+    """
+    Test `GitHubApiClient` sets the default headers once on its pooled session.
+    """
+    github.GitHubApiClient("github-test-token", pool_size=4)
+
+    session.headers.update.assert_called_once_with(
+        {
+            "Accept": "application/vnd.github.v3+json",
+            "Authorization": "token github-test-token",
+        }
+    )
+    # pylint: disable=no-member
+    github.transport.new_session.assert_called_once_with(pool_size=4)
+
+
+def test_github_api_client_get(session):
     """
-    Test `GitHubApiClient.get` method correctly builds headers and the API URL, then
-    calls `requests.get` to do a HTTP GET call to the GitHub API.
+    Test `GitHubApiClient.get` method correctly builds the API URL, then calls the
+    session to do a HTTP GET call to the GitHub API with only the extra headers.
     """
     endpoint = "/api/endpoint"
     params = {"key": "value"}
@@ -81,40 +125,241 @@ def test_github_api_client_get(requests):
     client = github.GitHubApiClient("github-test-token")
     client.get(endpoint, params=params, headers=headers)
 
-    expected_headers = {
-        "Accept": "application/vnd.github.v3+json",
-        "Authorization": "token github-test-token",
-        "X-custom-header": "hello",
+    session.request.assert_called_once_with(
+        "GET",
+        "https://api.github.com/api/endpoint",
+        timeout=github.DEFAULT_TIMEOUT,
+        params=params,
+        headers=headers,
+    )
+
+
+@mock.patch("src.github.backoff_delay", return_value=0)
+def test_github_api_client_request_retry_server_error(backoff_delay, session):
+    """
+    Test `GitHubApiClient.request` retries 5xx responses with a backoff between each
+    attempt.
+    """
+    error = mock.MagicMock(status_code=502, headers={})
+    okay = mock.MagicMock(status_code=200, headers={})
+    session.request.side_effect = [error, error, okay]
+
+    client = github.GitHubApiClient("github-test-token", retries=3)
+    result = client.request("GET", "https://api.github.com/api/endpoint")
+
+    assert result is okay
+    assert session.request.call_count == 3
+    assert backoff_delay.call_count == 2
+
+
+@mock.patch("src.github.backoff_delay", return_value=0)
+def test_github_api_client_request_retry_connection_error(backoff_delay, session):
+    """
+    Test `GitHubApiClient.request` retries connection errors, then raises once it runs
+    out of retries.
+    """
+    session.request.side_effect = requests.ConnectionError("reset")
+
+    client = github.GitHubApiClient("github-test-token", retries=2)
+    with pytest.raises(requests.ConnectionError):
+        client.request("GET", "https://api.github.com/api/endpoint")
+
+    assert session.request.call_count == 3
+    assert backoff_delay.call_count == 2
+
+
+@mock.patch("src.github.backoff_delay", return_value=0)
+def test_github_api_client_request_no_retry_invalid_url(backoff_delay, session):
+    """Test `GitHubApiClient.request` fails fast on an invalid URL."""
+    session.request.side_effect = requests.exceptions.InvalidURL("not a url")
+
+    client = github.GitHubApiClient("github-test-token", retries=2)
+    with pytest.raises(requests.exceptions.InvalidURL):
+        client.request("GET", "https://api.github.com:bad/api/endpoint")
+
+    assert session.request.call_count == 1
+    assert not backoff_delay.called
+
+
+def test_github_api_client_request_releases_on_error(session):
+    """
+    Test `GitHubApiClient.request` releases its rate limiter slot when sending the
+    request raises an error that is not retried.
+    """
+    session.request.side_effect = ValueError("Invalid URL")
+
+    client = github.GitHubApiClient("github-test-token")
+    with pytest.raises(ValueError):
+        client.request("GET", "not a url")
+
+    assert client.rate_limiter.in_flight == 0
+
+
+@mock.patch("src.github.backoff_delay", return_value=0)
+def test_github_api_client_request_metrics(
+    backoff_delay, session
+):  # pylint: disable=unused-argument
+    """Test `GitHubApiClient.request` records the requests, retries and bytes sent."""
+    error = mock.MagicMock(status_code=502, headers={}, content=b"")
+    okay = mock.MagicMock(status_code=200, headers={}, content=b"[1, 2]")
+    session.request.side_effect = [error, okay]
+
+    run_metrics = metrics.Metrics()
+    with mock.patch.object(metrics, "METRICS", run_metrics):
+        client = github.GitHubApiClient("github-test-token")
+        client.request("POST", "https://api.github.com/graphql", json={"a": 1})
+
+    assert run_metrics.counters == {
+        "github.bytes_sent": len(b'{"a": 1}'),
+        "github.requests": 2,
+        "github.bytes_received": len(b"[1, 2]"),
+        "github.errors": 1,
+        "github.retries": 1,
     }
+    assert run_metrics.histograms["github.request"].count == 2
 
-    requests.get.assert_called_once_with(
-        "https://api.github.com/api/endpoint", params=params, headers=expected_headers
-    )
+
+def test_github_api_client_cancel(session):
+    """Test requests are no longer sent once the client is cancelled."""
+    client = github.GitHubApiClient("github-test-token")
+    client.cancel()
+
+    with pytest.raises(github.RequestCancelled):
+        client.get("/api/endpoint")
+    assert not session.request.called
 
 
-@mock.patch("src.github.requests")
-def test_github_api_client_get_commit(requests):
+def test_github_api_client_cancel_while_acquiring(session):
     """
-    Test `GitHubApiClient.get_commits` correctly builds the API endpoint and triggers
-    the HTTP GET call via `requests.get`.
+    Test a request cancelled while it acquires its rate limiter slot is not sent, and
+    releases the slot.
+    """
+    client = github.GitHubApiClient("github-test-token")
+    acquire = client.rate_limiter.acquire
+
+    def cancel_while_acquiring(cancelled):  # pylint: disable=unused-argument
+        acquired = acquire()
+        client.cancel()
+        return acquired
+
+    with mock.patch.object(client.rate_limiter, "acquire", cancel_while_acquiring):
+        with pytest.raises(github.RequestCancelled):
+            client.get("/api/endpoint")
+    assert not session.request.called
+    assert client.rate_limiter.in_flight == 0
+
+
+@mock.patch("src.github.backoff_delay", return_value=0)
+def test_github_api_client_request_no_retry_client_error(backoff_delay, session):
+    """Test `GitHubApiClient.request` does not retry 4xx responses."""
+    session.request.return_value.status_code = 404
+
+    client = github.GitHubApiClient("github-test-token")
+    result = client.request("GET", "https://api.github.com/api/endpoint")
+
+    assert result.status_code == 404
+    assert session.request.call_count == 1
+    assert not backoff_delay.called
+
+
+@pytest.mark.parametrize("attempt", [0, 1, 5, 20])
+def test_backoff_delay(attempt):
+    """Test backoff_delay grows exponentially and stays within the maximum."""
+    for _ in range(20):
+        delay = github.backoff_delay(attempt, 0.5)
+        assert 0 <= delay <= min(github.MAX_BACKOFF, 0.5 * 2**attempt)
+
+
+def test_github_api_client_get_revalidates_cached_response(session):
+    """
+    Test `GitHubApiClient.get` sends the validators of a cached response and answers a
+    `304 Not Modified` from the cache.
+    """
+    metrics.METRICS.reset()
+    url = "https://api.github.com/api/endpoint?key=value"
+    session.request.side_effect = [
+        transport.StdlibResponse(
+            status_code=200,
+            headers=transport.Headers([("ETag", '"abc"')]),
+            content=b'{"value": 1}',
+            url=url,
+        ),
+        transport.StdlibResponse(
+            status_code=304,
+            headers=transport.Headers([("ETag", '"abc"')]),
+            content=b"",
+            url=url,
+        ),
+    ]
+    response_cache = httpcache.ResponseCache()
+
+    client = github.GitHubApiClient("github-test-token", response_cache=response_cache)
+    first = client.get("/api/endpoint", params={"key": "value"})
+    second = client.get("/api/endpoint", params={"key": "value"})
+
+    assert first == second == {"value": 1}
+    assert session.request.call_args_list[0].kwargs["headers"] is None
+    assert session.request.call_args_list[1].kwargs["headers"] == {
+        "If-None-Match": '"abc"'
+    }
+    assert metrics.METRICS.counters["github.not_modified"] == 1
+
+
+def test_github_api_client_get_commit(session):
+    """
+    Test `GitHubApiClient.get_commit` correctly builds the API endpoint, triggers the
+    HTTP GET call via the session and projects the response to a `Commit`.
     """
     repo = "github/repo-name"
     sha = "hash-1"
+    session.request.return_value.json.return_value = [rest_commit(sha, True)]
 
     client = github.GitHubApiClient("github-test-token")
     result = client.get_commit(repo=repo, sha=sha)
 
-    assert result == requests.get.return_value.json.return_value
+    assert result == github.Commit(
+        sha=sha,
+        html_url=f"https://github.com/{repo}/commit/{sha}",
+        author="user1",
+        verified=True,
+    )
+
+    session.request.assert_called_once_with(
+        "GET",
+        f"https://api.github.com/repos/{repo}/commits",
+        timeout=mock.ANY,
+        params={"sha": sha, "per_page": "1"},
+        headers=None,
+    )
+
 
-    requests.get.assert_called_once_with(
-        f"https://api.github.com/repos/{repo}/commits/{sha}",
+def test_github_api_client_get_commit_other_listed(session):
+    """
+    Test `GitHubApiClient.get_commit` reads the commit from the single commit endpoint
+    when the commit listed first is not the requested one.
+    """
+    repo = "github/repo-name"
+    listed = mock.MagicMock(status_code=200, headers={})
+    listed.json.return_value = [rest_commit("hash-2", True)]
+    single = mock.MagicMock(status_code=200, headers={})
+    single.json.return_value = rest_commit("hash-1", False)
+    session.request.side_effect = [listed, single]
+
+    client = github.GitHubApiClient("github-test-token")
+    result = client.get_commit(repo=repo, sha="hash-1")
+
+    assert result.sha == "hash-1"
+    assert not result.verified
+    session.request.assert_called_with(
+        "GET",
+        f"https://api.github.com/repos/{repo}/commits/hash-1",
+        timeout=mock.ANY,
         params=None,
-        headers=mock.ANY,
+        headers=None,
     )
 
 
-@mock.patch("src.github.requests")
-def test_github_api_client_get_commit_bad_resp(requests):
+def test_github_api_client_get_commit_bad_resp(session):
     """
     Test `GitHubApiClient.get_commits` correctly raises a `ValueError` if the GitHub
     API does not send back any data.
@@ -122,14 +367,430 @@ def test_github_api_client_get_commit_bad_resp(requests):
     repo = "github/repo-name"
     sha = "hash-1"
 
-    requests.get.return_value.content = None
+    session.request.return_value.content = None
 
     client = github.GitHubApiClient("github-test-token")
     with pytest.raises(ValueError):
         client.get_commit(repo=repo, sha=sha)
 
-    requests.get.assert_called_once_with(
-        f"https://api.github.com/repos/{repo}/commits/{sha}",
+    session.request.assert_called_once_with(
+        "GET",
+        f"https://api.github.com/repos/{repo}/commits",
+        timeout=mock.ANY,
+        params={"sha": sha, "per_page": "1"},
+        headers=None,
+    )
+
+
+def graphql_node(sha, valid, login="user1"):
+    """Build a `VerifiedCommit` GraphQL node for tests."""
+    return {
+        "oid": sha,
+        "url": f"https://github.com/github/repo-name/commit/{sha}",
+        "signature": {"isValid": valid} if valid is not None else None,
+        "author": {"name": "User One", "user": {"login": login} if login else None},
+    }
+
+
+def test_github_api_client_get_commits(session):
+    """
+    Test `GitHubApiClient.get_commits` resolves commits in chunked GraphQL queries and
+    returns the commits in order.
+    """
+    shas = ["hash-0", "hash-1", "hash-2"]
+
+    def mock_request(method, url, **kwargs):
+        assert method == "POST"
+        assert url == "https://api.github.com/graphql"
+        variables = kwargs["json"]["variables"]
+        assert variables["owner"] == "github"
+        assert variables["name"] == "repo-name"
+        oids = [v for k, v in sorted(variables.items()) if k.startswith("oid")]
+        nodes = {
+            f"c{i}": graphql_node(oid, oid != "hash-1") for i, oid in enumerate(oids)
+        }
+
+        resp = mock.MagicMock(status_code=200, headers={})
+        resp.json.return_value = {"data": {"repository": nodes}}
+        return resp
+
+    session.request.side_effect = mock_request
+
+    client = github.GitHubApiClient("github-test-token")
+    result = client.get_commits(repo="github/repo-name", shas=shas, chunk_size=2)
+
+    assert session.request.call_count == 2
+    assert [commit.sha for commit in result] == shas
+    assert [commit.verified for commit in result] == [True, False, True]
+    assert result[0].author == "user1"
+    assert result[0].html_url == "https://github.com/github/repo-name/commit/hash-0"
+
+
+def test_github_api_client_get_commits_missing(session):
+    """
+    Test `GitHubApiClient.get_commits` raises a `ValueError` when a commit cannot be
+    found.
+    """
+    session.request.return_value.json.return_value = {
+        "data": {"repository": {"c0": None}}
+    }
+
+    client = github.GitHubApiClient("github-test-token")
+    with pytest.raises(ValueError):
+        client.get_commits(repo="github/repo-name", shas=["hash-0"])
+
+
+def test_github_api_client_graphql_errors(session):
+    """Test `GitHubApiClient.graphql` raises a `ValueError` for GraphQL errors."""
+    session.request.return_value.json.return_value = {
+        "data": None,
+        "errors": [{"message": "Something went wrong"}],
+    }
+
+    client = github.GitHubApiClient("github-test-token")
+    with pytest.raises(ValueError):
+        client.graphql("query { viewer { login } }", {})
+
+
+@pytest.mark.parametrize(
+    "node, expected",
+    [
+        (graphql_node("hash-0", True), True),
+        (graphql_node("hash-0", False), False),
+        (graphql_node("hash-0", None), False),
+    ],
+)
+def test_commit_from_graphql(node, expected):
+    """Test `Commit.from_graphql` projects GraphQL nodes correctly."""
+    commit = github.Commit.from_graphql(node)
+    assert commit.verified == expected
+    assert commit.author == "user1"
+
+
+def test_commit_from_graphql_no_user():
+    """
+    Test `Commit.from_graphql` uses the git author name when the author is not a GitHub
+    user.
+    """
+    commit = github.Commit.from_graphql(graphql_node("hash-0", True, login=None))
+    assert commit.author == "User One"
+
+
+def test_commit_from_graphql_no_author():
+    """Test `Commit.from_graphql` accepts commits without an author."""
+    node = graphql_node("hash-0", True)
+    node["author"] = None
+    commit = github.Commit.from_graphql(node)
+    assert commit.author == ""
+    assert commit.verified
+
+
+@pytest.mark.parametrize("verified", [True, False])
+def test_commit_from_rest(verified):
+    """Test `Commit.from_rest` projects REST API commit objects correctly."""
+    commit = github.Commit.from_rest(rest_commit("hash-0", verified))
+    assert commit == github.Commit(
+        sha="hash-0",
+        html_url="https://github.com/github/repo-name/commit/hash-0",
+        author="user1",
+        verified=verified,
+    )
+
+
+def test_commit_from_rest_no_user():
+    """
+    Test `Commit.from_rest` uses the git author name when the author is not a GitHub
+    user.
+    """
+    commit = github.Commit.from_rest(rest_commit("hash-0", True, login=None))
+    assert commit.author == "User One"
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"sha": "hash-0", "html_url": "url", "author": {"login": "user1"}},
+        {
+            "sha": "hash-0",
+            "html_url": "url",
+            "author": {"login": "user1"},
+            "commit": {},
+        },
+        {
+            "sha": "hash-0",
+            "html_url": "url",
+            "author": {"login": "user1"},
+            "commit": {"verification": {}},
+        },
+    ],
+)
+def test_commit_from_rest_no_verified_key(payload):
+    """
+    Test `Commit.from_rest` fails correctly when the verification keys are not present
+    in the GitHub API response object.
+    """
+    with pytest.raises(KeyError):
+        github.Commit.from_rest(payload)
+
+
+def test_commit_slots():
+    """Test `Commit` only holds its projected fields."""
+    commit = github.Commit.from_rest(rest_commit("hash-0", True))
+    assert not hasattr(commit, "__dict__")
+    with pytest.raises(AttributeError):
+        commit.files = []  # pylint: disable=assigning-non-slot
+
+
+def test_build_commits_query():
+    """Test build_commits_query includes one aliased lookup per commit."""
+    query = github.build_commits_query(3)
+    for i in range(3):
+        assert f"$oid{i}: GitObjectID!" in query
+        assert f"c{i}: object(oid: $oid{i})" in query
+    assert "fragment VerifiedCommit on Commit" in query
+
+
+def test_github_api_client_compare_commits(session):
+    """
+    Test `GitHubApiClient.compare_commits` follows the compare endpoint's pagination
+    and yields every commit in order.
+    """
+    first = mock.MagicMock(status_code=200, headers={})
+    first.json.return_value = {
+        "commits": [rest_commit("hash-1", True), rest_commit("hash-2", False)]
+    }
+    first.links = {"next": {"url": "https://api.github.com/next-page"}}
+    second = mock.MagicMock(status_code=200, headers={})
+    second.json.return_value = {"commits": [rest_commit("hash-3", True)]}
+    second.links = {}
+    session.request.side_effect = [first, second]
+
+    client = github.GitHubApiClient("github-test-token")
+    result = client.compare_commits(repo="github/repo-name", base="base", head="head")
+
+    assert [commit.sha for commit in result] == ["hash-1", "hash-2", "hash-3"]
+    assert session.request.call_args_list == [
+        mock.call(
+            "GET",
+            "https://api.github.com/repos/github/repo-name/compare/base...head",
+            timeout=mock.ANY,
+            params={"per_page": "100"},
+            headers=None,
+        ),
+        mock.call(
+            "GET",
+            "https://api.github.com/next-page",
+            timeout=mock.ANY,
+            params=None,
+            headers=None,
+        ),
+    ]
+
+
+def test_github_api_client_get_pages_bad_resp(session):
+    """
+    Test `GitHubApiClient.get_pages` raises a `ValueError` if the GitHub API does not
+    send back any data.
+    """
+    session.request.return_value.content = None
+
+    client = github.GitHubApiClient("github-test-token")
+    with pytest.raises(ValueError):
+        list(client.get_pages("/api/endpoint"))
+
+
+def test_github_api_client_request_rate_limited(session):
+    """
+    Test `GitHubApiClient.request` waits out a rate limited response through its rate
+    limiter, then retries the request.
+    """
+    limited = mock.MagicMock(status_code=429, headers={"Retry-After": "5"})
+    okay = mock.MagicMock(status_code=200, headers={})
+    session.request.side_effect = [limited, okay]
+    wait = mock.MagicMock()
+
+    limiter = ratelimit.RateLimiter(clock=lambda: 1000.0, wait=wait)
+    wait.side_effect = lambda delay, _: setattr(
+        limiter, "clock", lambda: 1000.0 + delay
+    )
+
+    client = github.GitHubApiClient("github-test-token", rate_limiter=limiter)
+    result = client.request("GET", "https://api.github.com/api/endpoint")
+
+    assert result is okay
+    assert session.request.call_count == 2
+    wait.assert_called_once_with(5.0, mock.ANY)
+    assert limiter.in_flight == 0
+
+
+def test_github_api_client_request_fails_over_credentials(session):
+    """
+    Test `GitHubApiClient.request` retries a rate limited request with another
+    credential of its pool instead of waiting for the limit to reset.
+    """
+    limited = mock.MagicMock(
+        status_code=403,
+        headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "5000"},
+    )
+    okay = mock.MagicMock(status_code=200, headers={})
+    session.request.side_effect = [limited, okay]
+    wait = mock.MagicMock()
+
+    def credential(token):
+        limiter = ratelimit.RateLimiter(clock=lambda: 1000.0, wait=wait)
+        return auth.StaticToken(token, rate_limiter=limiter)
+
+    pool = auth.CredentialPool([credential("github-test-token"), credential("other")])
+    client = github.GitHubApiClient("github-test-token", credentials=pool)
+    result = client.request("GET", "https://api.github.com/api/endpoint")
+
+    assert result is okay
+    assert not wait.called
+    first, second = session.request.call_args_list
+    assert "headers" not in first.kwargs
+    assert second.kwargs["headers"] == {"Authorization": "token other"}
+
+
+def test_github_api_client_list_commits(session):
+    """
+    Test `GitHubApiClient.list_commits` yields each page of commits with the URL of
+    the next page.
+    """
+    first = mock.MagicMock(status_code=200, headers={})
+    first.json.return_value = [
+        rest_commit("hash-2", True),
+        rest_commit("hash-1", False),
+    ]
+    first.links = {"next": {"url": "https://api.github.com/next-page"}}
+    second = mock.MagicMock(status_code=200, headers={})
+    second.json.return_value = [rest_commit("hash-0", True)]
+    second.links = {}
+    session.request.side_effect = [first, second]
+
+    client = github.GitHubApiClient("github-test-token")
+    pages = list(
+        client.list_commits(repo="github/repo-name", sha="main", since="2022-01-01")
+    )
+
+    assert [[c.sha for c in commits] for commits, _ in pages] == [
+        ["hash-2", "hash-1"],
+        ["hash-0"],
+    ]
+    assert [next_url for _, next_url in pages] == [
+        "https://api.github.com/next-page",
+        None,
+    ]
+    session.request.assert_any_call(
+        "GET",
+        "https://api.github.com/repos/github/repo-name/commits",
+        timeout=mock.ANY,
+        params={"sha": "main", "per_page": "100", "since": "2022-01-01"},
+        headers=None,
+    )
+
+
+def test_github_api_client_list_pull_request_commits(session):
+    """
+    Test `GitHubApiClient.list_pull_request_commits` lists every page of a pull
+    request's commits.
+    """
+    first = mock.MagicMock(status_code=200, headers={})
+    first.json.return_value = [rest_commit("hash-1", True)]
+    first.links = {"next": {"url": "https://api.github.com/next-page"}}
+    second = mock.MagicMock(status_code=200, headers={})
+    second.json.return_value = [rest_commit("hash-2", False)]
+    second.links = {}
+    session.request.side_effect = [first, second]
+
+    client = github.GitHubApiClient("github-test-token")
+    commits = list(client.list_pull_request_commits(repo="github/repo-name", number=7))
+
+    assert [(c.sha, c.verified) for c in commits] == [
+        ("hash-1", True),
+        ("hash-2", False),
+    ]
+    assert session.request.call_args_list[0] == mock.call(
+        "GET",
+        "https://api.github.com/repos/github/repo-name/pulls/7/commits",
+        timeout=mock.ANY,
+        params={"per_page": "100"},
+        headers=None,
+    )
+
+
+def test_github_api_client_list_commits_resume(session):
+    """Test `GitHubApiClient.list_commits` resumes from a page URL."""
+    session.request.return_value.json.return_value = [rest_commit("hash-0", True)]
+    session.request.return_value.links = {}
+
+    client = github.GitHubApiClient("github-test-token")
+    list(
+        client.list_commits(
+            repo="github/repo-name",
+            sha="main",
+            page_url="https://api.github.com/next-page",
+        )
+    )
+
+    session.request.assert_called_once_with(
+        "GET",
+        "https://api.github.com/next-page",
+        timeout=mock.ANY,
         params=None,
-        headers=mock.ANY,
+        headers=None,
+    )
+
+
+@pytest.mark.parametrize(
+    "account_type, endpoint", [("Organization", "orgs"), ("User", "users")]
+)
+def test_github_api_client_list_repositories(session, account_type, endpoint):
+    """
+    Test `GitHubApiClient.list_repositories` lists the repositories of organisations
+    and users from their own endpoints.
+    """
+    account = mock.MagicMock(status_code=200, headers={})
+    account.json.return_value = {"login": "github", "type": account_type}
+    repos = mock.MagicMock(status_code=200, headers={}, links={})
+    repos.json.return_value = [{"full_name": "github/repo-name"}]
+    session.request.side_effect = [account, repos]
+
+    client = github.GitHubApiClient("github-test-token")
+    assert list(client.list_repositories(owner="github")) == [
+        {"full_name": "github/repo-name"}
+    ]
+    session.request.assert_called_with(
+        "GET",
+        f"https://api.github.com/{endpoint}/github/repos",
+        timeout=mock.ANY,
+        params={"per_page": "100"},
+        headers=None,
+    )
+
+
+def test_github_api_client_enterprise_urls(session):
+    """
+    Test `GitHubApiClient` uses the API URLs of GitHub Enterprise Server when they are
+    set in the environment.
+    """
+    session.request.return_value.json.return_value = {"data": {}}
+    env = {
+        "GITHUB_API_URL": "https://github.example.com/api/v3",
+        "GITHUB_GRAPHQL_URL": "https://github.example.com/api/graphql",
+    }
+    with mock.patch.dict(os.environ, env):
+        client = github.GitHubApiClient("github-test-token")
+
+    client.get("/repos/github/repo-name")
+    session.request.assert_called_with(
+        "GET",
+        "https://github.example.com/api/v3/repos/github/repo-name",
+        timeout=mock.ANY,
+        params=None,
+        headers=None,
+    )
+    client.graphql("query {}", {})
+    assert session.request.call_args.args[1] == "https://github.example.com/api/graphql"
+    assert client.url("https://github.example.com/next") == (
+        "https://github.example.com/next"
     )
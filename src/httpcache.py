@@ -0,0 +1,168 @@
+"""
+Cache of GitHub API responses, revalidated with conditional requests.
+
+GitHub answers a request carrying the `ETag` or `Last-Modified` validators of an earlier
+response with a `304 Not Modified` when nothing changed, and such responses do not count
+against the rate limit. `GitHubApiClient` sends the validators of cached responses with
+each GET request and serves `304`s from the cache.
+"""
+import collections
+import logging
+import threading
+from typing import Dict, Optional
+
+from . import storage, transport
+
+LOGGER = logging.getLogger(__name__)
+
+# Default maximum size in MiB of the response bodies kept in the cache
+DEFAULT_MAX_SIZE = 32
+# Version of the on-disk format, caches with a different version are ignored
+CACHE_VERSION = 1
+# Response headers kept with a cached body
+CACHED_HEADERS = ("ETag", "Last-Modified", "Link", "Content-Type")
+
+
+class CachedResponse:
+    """
+    A cached successful response: its body and the headers needed to revalidate and
+    paginate it.
+    """
+
+    __slots__ = ("url", "headers", "content")
+
+    def __init__(self, *, url: str, headers: Dict[str, str], content: bytes):
+        self.url = url
+        self.headers = headers
+        self.content = content
+
+    @property
+    def validators(self) -> Dict[str, str]:
+        """The conditional request headers that revalidate this response."""
+        validators = {}
+        if "ETag" in self.headers:
+            validators["If-None-Match"] = self.headers["ETag"]
+        if "Last-Modified" in self.headers:
+            validators["If-Modified-Since"] = self.headers["Last-Modified"]
+        return validators
+
+    def response(self) -> transport.StdlibResponse:
+        """A `200` response with the cached body, as if it was just received."""
+        return transport.StdlibResponse(
+            status_code=200,
+            headers=transport.Headers(list(self.headers.items())),
+            content=self.content,
+            url=self.url,
+        )
+
+
+class ResponseCache:
+    """
+    A size bounded LRU cache of GitHub API responses, keyed by request URL.
+
+    Only responses with an `ETag` or `Last-Modified` validator are cached. Once the
+    cached bodies add up to more than `max_bytes`, the least recently used responses
+    are evicted.
+
+    On disk the cache is a gzipped JSON document holding one `[url, headers, body]`
+    entry per response, from least to most recently used.
+    """
+
+    def __init__(
+        self, path: Optional[str] = None, max_bytes: int = DEFAULT_MAX_SIZE << 20
+    ):
+        self.path = path
+        self.max_bytes = max(1, max_bytes)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: "collections.OrderedDict[str, CachedResponse]"
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @classmethod
+    def load(
+        cls, path: str, max_bytes: int = DEFAULT_MAX_SIZE << 20
+    ) -> "ResponseCache":
+        """
+        Load a cache from the file at `path`, an empty cache if the file is missing,
+        unreadable, outdated or malformed.
+        """
+        cache = cls(path, max_bytes)
+        entries = storage.load_entries(
+            path, version=CACHE_VERSION, kind="response cache"
+        )
+        try:
+            for url, headers, body in entries:
+                cache._store(
+                    CachedResponse(url=url, headers=headers, content=body.encode())
+                )
+        except (AttributeError, TypeError, ValueError) as ex:
+            LOGGER.warning("Ignoring malformed response cache %s: %s", path, ex)
+            return cls(path, max_bytes)
+        LOGGER.debug("Loaded %s responses from response cache %s", len(cache), path)
+        return cache
+
+    def save(self):
+        """Atomically write the cache to its `path`."""
+        if not self.path:
+            raise ValueError("ResponseCache has no path to save to")
+
+        with self._lock:
+            entries = [
+                [entry.url, entry.headers, entry.content.decode()]
+                for entry in self._entries.values()
+            ]
+
+        storage.save_entries(self.path, entries, version=CACHE_VERSION)
+        LOGGER.debug("Saved %s responses to response cache %s", len(entries), self.path)
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """Get the cached response to a GET request of `url`, if there is one."""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(url)
+            return entry
+
+    def put(self, url: str, response: transport.Response):
+        """
+        Cache the successful `response` to a GET request of `url`, if it has a
+        validator to revalidate it with.
+        """
+        headers = {
+            name: response.headers[name]
+            for name in CACHED_HEADERS
+            if name in response.headers
+        }
+        if "ETag" not in headers and "Last-Modified" not in headers:
+            return
+        try:
+            response.content.decode()
+        except UnicodeDecodeError:
+            return
+        with self._lock:
+            self._store(
+                CachedResponse(url=url, headers=headers, content=response.content)
+            )
+
+    def _store(self, entry: CachedResponse):
+        """Store a single entry, evicting the least recently used ones if needed."""
+        size = len(entry.content)
+        if size > self.max_bytes:
+            return
+        previous = self._entries.pop(entry.url, None)
+        if previous is not None:
+            self.size -= len(previous.content)
+        self._entries[entry.url] = entry
+        self.size += size
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted.content)
@@ -0,0 +1,118 @@
+"""Unit tests for the httpcache.py module."""
+import gzip
+import json
+
+from . import httpcache, transport
+
+
+def make_response(content=b"{}", **headers):
+    """Build a successful response with `headers` for tests."""
+    return transport.StdlibResponse(
+        status_code=200,
+        headers=transport.Headers(
+            [(name.replace("_", "-"), value) for name, value in headers.items()]
+        ),
+        content=content,
+        url="https://api.github.com/endpoint",
+    )
+
+
+def test_response_cache_get_and_put():
+    """Test cached responses are returned with their validators and counted."""
+    response_cache = httpcache.ResponseCache()
+    response_cache.put("/etag", make_response(b'{"a": 1}', ETag='"abc"'))
+    response_cache.put(
+        "/modified", make_response(Last_Modified="Mon, 01 Jan 2024 00:00:00 GMT")
+    )
+
+    cached = response_cache.get("/etag")
+    assert cached is not None
+    assert cached.validators == {"If-None-Match": '"abc"'}
+    assert cached.response().json() == {"a": 1}
+    assert cached.response().headers["etag"] == '"abc"'
+
+    cached = response_cache.get("/modified")
+    assert cached is not None
+    assert cached.validators == {"If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+
+    assert response_cache.get("/missing") is None
+    assert response_cache.hits == 2
+    assert response_cache.misses == 1
+
+
+def test_response_cache_put_without_validator():
+    """Test responses that cannot be revalidated are not cached."""
+    response_cache = httpcache.ResponseCache()
+    response_cache.put("/endpoint", make_response(Content_Type="application/json"))
+
+    assert len(response_cache) == 0
+
+
+def test_response_cache_lru_eviction():
+    """Test the least recently used responses are evicted once over `max_bytes`."""
+    response_cache = httpcache.ResponseCache(max_bytes=10)
+    response_cache.put("/one", make_response(b"1234", ETag="1"))
+    response_cache.put("/two", make_response(b"1234", ETag="2"))
+    response_cache.get("/one")
+    response_cache.put("/three", make_response(b"1234", ETag="3"))
+    response_cache.put("/too-large", make_response(b"12345678901", ETag="4"))
+
+    assert response_cache.get("/two") is None
+    assert response_cache.get("/too-large") is None
+    assert response_cache.get("/one") is not None
+    assert response_cache.get("/three") is not None
+    assert response_cache.size == 8
+
+
+def test_response_cache_replace():
+    """Test caching a newer response to the same URL replaces the older one."""
+    response_cache = httpcache.ResponseCache()
+    response_cache.put("/endpoint", make_response(b"old body", ETag="1"))
+    response_cache.put("/endpoint", make_response(b"new", ETag="2"))
+
+    cached = response_cache.get("/endpoint")
+    assert cached is not None
+    assert cached.content == b"new"
+    assert response_cache.size == 3
+
+
+def test_response_cache_save_and_load(tmp_path):
+    """Test a saved cache loads back with the same responses in the same LRU order."""
+    path = str(tmp_path / "cache" / "responses.json.gz")
+    response_cache = httpcache.ResponseCache(path)
+    response_cache.put("/one", make_response(b"1234", ETag="1", Link="<next>"))
+    response_cache.put("/two", make_response(b"5678", ETag="2"))
+    response_cache.save()
+
+    loaded = httpcache.ResponseCache.load(path, max_bytes=4)
+
+    assert len(loaded) == 1
+    cached = loaded.get("/two")
+    assert cached is not None
+    assert cached.content == b"5678"
+    assert cached.validators == {"If-None-Match": "2"}
+
+
+def test_response_cache_load_missing(tmp_path):
+    """Test loading a cache file that does not exist gives an empty cache."""
+    loaded = httpcache.ResponseCache.load(str(tmp_path / "missing.json.gz"))
+    assert len(loaded) == 0
+
+
+def test_response_cache_load_corrupt(tmp_path):
+    """Test loading a corrupt cache file gives an empty cache instead of failing."""
+    path = tmp_path / "corrupt.json.gz"
+    path.write_bytes(b"not gzip")
+
+    loaded = httpcache.ResponseCache.load(str(path))
+    assert len(loaded) == 0
+
+
+def test_response_cache_load_other_version(tmp_path):
+    """Test loading a cache file with a different format version is ignored."""
+    path = tmp_path / "old.json.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        json.dump({"version": 0, "entries": [["/one", {"ETag": "1"}, "{}"]]}, file)
+
+    loaded = httpcache.ResponseCache.load(str(path))
+    assert len(loaded) == 0
@@ -0,0 +1,333 @@
+"""
+Offline verification of commit signatures from a local git checkout.
+
+Commits are read with a single `git cat-file --batch` process and their `gpgsig`
+signatures are checked locally, GPG signatures with `gpg` against a keyring and SSH
+signatures with `ssh-keygen` against an allowed signers file.
+"""
+import collections
+import itertools
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+from concurrent import futures
+from typing import IO, Deque, Iterable, Iterator, List, Optional, Tuple
+
+from . import github
+
+LOGGER = logging.getLogger(__name__)
+
+# `safe.directory` lets git read a checkout owned by another user, like the mounted
+# GitHub Actions workspace, and is only honoured when set on the command line.
+GIT = ["git", "-c", "safe.directory=*"]
+
+SIGNATURE_HEADERS = (b"gpgsig", b"gpgsig-sha256")
+GPG_SIGNATURE = b"-----BEGIN PGP SIGNATURE-----"
+SSH_SIGNATURE = b"-----BEGIN SSH SIGNATURE-----"
+
+# Default number of commits handed to a verification worker process at a time
+DEFAULT_CHUNK_SIZE = 64
+
+
+class RawCommit:  # pylint: disable=too-few-public-methods
+    """
+    A git commit object read from a local repository, split into the parts needed to
+    verify its signature.
+
+    `payload` is the commit object without its signature header, which is the data
+    the `signature` was made over.
+    """
+
+    __slots__ = ("sha", "author", "signature", "payload")
+
+    def __init__(
+        self, *, sha: str, author: str, signature: Optional[bytes], payload: bytes
+    ):
+        self.sha = sha
+        self.author = author
+        self.signature = signature
+        self.payload = payload
+
+
+class SignatureVerifier:
+    """
+    Verify commit signatures with locally trusted keys.
+
+    `gpg_keyring` is the path to a binary GPG keyring (as written by `gpg --export`)
+    holding the trusted public keys. Without it GPG signatures are checked against the
+    default keyring of the user running the check.
+
+    `allowed_signers` is the path to an SSH allowed signers file, as used by git's
+    `gpg.ssh.allowedSignersFile` setting. Without it SSH signatures are never verified.
+    """
+
+    def __init__(
+        self,
+        *,
+        gpg_keyring: Optional[str] = None,
+        allowed_signers: Optional[str] = None,
+    ):
+        self.gpg_keyring = gpg_keyring
+        self.allowed_signers = allowed_signers
+
+    @classmethod
+    def from_env(cls) -> "SignatureVerifier":
+        """
+        Create a verifier from the `GPG_KEYRING` and `SSH_ALLOWED_SIGNERS` environment
+        variables, relative to the GitHub Actions workspace.
+        """
+        return cls(
+            gpg_keyring=workspace_path(os.environ.get("GPG_KEYRING")),
+            allowed_signers=workspace_path(os.environ.get("SSH_ALLOWED_SIGNERS")),
+        )
+
+    def verify(self, commit: RawCommit) -> bool:
+        """`True` if `commit` has a valid signature from a trusted key."""
+        if not commit.signature:
+            return False
+        if commit.signature.startswith(GPG_SIGNATURE):
+            return self.verify_gpg(commit)
+        if commit.signature.startswith(SSH_SIGNATURE):
+            return self.verify_ssh(commit)
+
+        LOGGER.debug("Commit %s has an unsupported signature type", commit.sha)
+        return False
+
+    def verify_gpg(self, commit: RawCommit) -> bool:
+        """`True` if the GPG signature of `commit` is good and made by a known key."""
+        with tempfile.TemporaryDirectory() as home:
+            sig_path = write_signature(home, commit)
+            cmd = ["gpg", "--batch", "--no-tty", "--status-fd", "1"]
+            if self.gpg_keyring:
+                cmd += ["--homedir", home, "--no-default-keyring"]
+                cmd += ["--keyring", os.path.abspath(self.gpg_keyring)]
+            cmd += ["--verify", sig_path, "-"]
+
+            result = subprocess.run(
+                cmd, input=commit.payload, capture_output=True, check=False
+            )
+
+        status = result.stdout.splitlines()
+        good = any(line.startswith(b"[GNUPG:] GOODSIG ") for line in status)
+        valid = any(line.startswith(b"[GNUPG:] VALIDSIG ") for line in status)
+        LOGGER.debug("gpg verify %s: good=%s, valid=%s", commit.sha, good, valid)
+        return result.returncode == 0 and good and valid
+
+    def verify_ssh(self, commit: RawCommit) -> bool:
+        """`True` if the SSH signature of `commit` is good and by an allowed signer."""
+        if not self.allowed_signers:
+            LOGGER.debug("No SSH allowed signers file to verify %s with", commit.sha)
+            return False
+
+        with tempfile.TemporaryDirectory() as directory:
+            sig_path = write_signature(directory, commit)
+            keygen = ["ssh-keygen", "-Y"]
+            signers = ["-f", self.allowed_signers, "-s", sig_path]
+
+            found = subprocess.run(
+                keygen + ["find-principals"] + signers,
+                capture_output=True,
+                check=False,
+            )
+            if found.returncode != 0:
+                LOGGER.debug("No allowed signer found for %s", commit.sha)
+                return False
+
+            for principal in found.stdout.decode().split():
+                verified = subprocess.run(
+                    keygen + ["verify", "-n", "git", "-I", principal] + signers,
+                    input=commit.payload,
+                    capture_output=True,
+                    check=False,
+                )
+                if verified.returncode == 0:
+                    return True
+
+        return False
+
+
+def get_commits(
+    *,
+    repo: str,
+    shas: List[str],
+    path: str,
+    verifier: SignatureVerifier,
+    workers: int = 1,
+) -> List[github.Commit]:
+    """
+    Get the verification details of the commits `shas` from the local checkout of
+    `repo` at `path`, in the same order as `shas`.
+
+    With more than one of `workers` the signatures are verified in parallel by a pool
+    of that many processes, see `verify_commits`.
+
+    Commits are not linked to GitHub users offline, so each commit's author is its git
+    author name.
+    """
+    raw_commits, to_verify = itertools.tee(read_commits(path, shas))
+    results = verify_commits(verifier, to_verify, workers=workers)
+    return [
+        github.Commit(
+            sha=commit.sha,
+            html_url=github.commit_html_url(repo, commit.sha),
+            author=commit.author,
+            verified=verified,
+        )
+        for commit, verified in zip(raw_commits, results)
+    ]
+
+
+def verify_commits(
+    verifier: SignatureVerifier,
+    commits: Iterable[RawCommit],
+    *,
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[bool]:
+    """
+    Verify the signature of each of `commits`, yielding the results in the same order.
+
+    With more than one of `workers` the commits are split into chunks of `chunk_size`
+    that are verified by a pool of `workers` processes. Only a few chunks per worker
+    are queued at once, so `commits` can be a stream too long to hold in memory.
+    """
+    if workers <= 1:
+        for commit in commits:
+            yield verifier.verify(commit)
+        return
+
+    chunks = iter(lambda: list(itertools.islice(commits, chunk_size)), [])
+    with futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Deque[futures.Future] = collections.deque()
+        try:
+            for chunk in chunks:
+                pending.append(executor.submit(verify_chunk, verifier, chunk))
+                if len(pending) >= workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def verify_chunk(verifier: SignatureVerifier, chunk: List[RawCommit]) -> List[bool]:
+    """Verify a chunk of commits in a worker process."""
+    return [verifier.verify(commit) for commit in chunk]
+
+
+def read_commits(path: str, shas: List[str]) -> Iterator[RawCommit]:
+    """Read the commit objects `shas` from the git repository at `path`, in order."""
+    for sha, data in cat_file(path, shas):
+        yield parse_commit(sha, data)
+
+
+def cat_file(path: str, shas: List[str]) -> Iterator[Tuple[str, bytes]]:
+    """
+    Stream the contents of the git commit objects `shas` from the repository at `path`
+    through a single `git cat-file --batch` process.
+    """
+    with subprocess.Popen(
+        GIT + ["-C", path, "cat-file", "--batch"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+    ) as proc:
+        stdin, stdout = proc.stdin, proc.stdout
+        if stdin is None or stdout is None:
+            raise RuntimeError("Unable to open pipes to git cat-file")
+
+        # Write the requests from another thread, so large outputs can't deadlock
+        writer = threading.Thread(
+            target=write_lines, args=(stdin, shas), name="cat-file", daemon=True
+        )
+        writer.start()
+        try:
+            for sha in shas:
+                header = stdout.readline().split()
+                if len(header) != 3:
+                    raise ValueError(f"Commit {sha} not found in {path}")
+                if header[1] != b"commit":
+                    raise ValueError(f"Object {sha} in {path} is not a commit")
+
+                data = stdout.read(int(header[2]))
+                stdout.read(1)  # Trailing newline after each object
+                yield sha, data
+        finally:
+            proc.kill()
+            writer.join()
+
+
+def write_lines(stream: IO[bytes], lines: List[str]):
+    """Write each of `lines` to `stream` then close it."""
+    try:
+        for line in lines:
+            stream.write(line.encode() + b"\n")
+        stream.close()
+    except (BrokenPipeError, ValueError):
+        # The reader stopped early and git has already gone away
+        pass
+
+
+def parse_commit(sha: str, data: bytes) -> RawCommit:
+    """
+    Parse a raw git commit object, splitting out its signature header.
+
+    The signature header value is continued on following lines that start with a
+    space, and everything other than the signature header forms the signed payload.
+    """
+    headers, separator, message = data.partition(b"\n\n")
+
+    author = ""
+    signature: List[bytes] = []
+    payload: List[bytes] = []
+    in_signature = False
+    for line in headers.split(b"\n"):
+        if line.startswith(b" ") and in_signature:
+            signature.append(line[1:])
+            continue
+
+        name, _, value = line.partition(b" ")
+        in_signature = name in SIGNATURE_HEADERS
+        if in_signature:
+            signature.append(value)
+            continue
+
+        payload.append(line)
+        if name == b"author":
+            author = value.split(b" <", 1)[0].decode(errors="replace")
+
+    return RawCommit(
+        sha=sha,
+        author=author,
+        signature=b"\n".join(signature) + b"\n" if signature else None,
+        payload=b"\n".join(payload) + separator + message,
+    )
+
+
+def write_signature(directory: str, commit: RawCommit) -> str:
+    """Write the signature of `commit` to a file in `directory`, returning its path."""
+    sig_path = os.path.join(directory, f"{commit.sha}.sig")
+    with open(sig_path, "wb") as file:
+        file.write(commit.signature or b"")
+    return sig_path
+
+
+def workspace_path(path: Optional[str]) -> Optional[str]:
+    """Resolve `path` relative to the GitHub Actions workspace, `GITHUB_WORKSPACE`."""
+    if not path:
+        return None
+    return os.path.join(os.environ.get("GITHUB_WORKSPACE", ""), path)
+
+
+def repository_path() -> str:
+    """
+    Get the path to the local checkout, from the `GIT_REPOSITORY_PATH` environment
+    variable, defaulting to the GitHub Actions workspace.
+    """
+    return (
+        workspace_path(os.environ.get("GIT_REPOSITORY_PATH"))
+        or os.environ.get("GITHUB_WORKSPACE")
+        or "."
+    )
@@ -0,0 +1,281 @@
+"""Unit tests for the localgit.py module."""
+import os
+import shutil
+import subprocess
+
+import pytest  # type: ignore
+
+from . import github, localgit
+
+requires_git = pytest.mark.skipif(not shutil.which("git"), reason="git not installed")
+requires_ssh_keygen = pytest.mark.skipif(
+    not shutil.which("ssh-keygen"), reason="ssh-keygen not installed"
+)
+requires_gpg = pytest.mark.skipif(not shutil.which("gpg"), reason="gpg not installed")
+
+SIGNED_COMMIT = (
+    b"tree 4b825dc642cb6eb9a060e54bf8d69288fbee4904\n"
+    b"author User One <user1@example.com> 1600000000 +0000\n"
+    b"committer User One <user1@example.com> 1600000000 +0000\n"
+    b"gpgsig -----BEGIN SSH SIGNATURE-----\n"
+    b" U1NIU0lH\n"
+    b" \n"
+    b" -----END SSH SIGNATURE-----\n"
+    b"\n"
+    b"Commit message\n"
+)
+
+
+def git(path, *args, env=None):
+    """Run a git command in the repository at `path`, returning its output."""
+    result = subprocess.run(
+        ["git", "-C", str(path), *args],
+        check=True,
+        capture_output=True,
+        env={**os.environ, **(env or {})},
+    )
+    return result.stdout.decode().strip()
+
+
+def make_commit(path, message, *config):
+    """Create an empty commit in the repository at `path`, returning its SHA."""
+    settings = []
+    for setting in config:
+        settings += ["-c", setting]
+    git(path, *settings, "commit", "--allow-empty", "-q", "-m", message)
+    return git(path, "rev-parse", "HEAD")
+
+
+@pytest.fixture(name="repo_path")
+def fixture_repo_path(tmp_path):
+    """Create an empty git repository with a configured identity."""
+    path = tmp_path / "repo"
+    path.mkdir()
+    git(path, "init", "-q")
+    git(path, "config", "user.name", "User One")
+    git(path, "config", "user.email", "user1@example.com")
+    git(path, "config", "commit.gpgsign", "false")
+    return path
+
+
+def test_parse_commit_signed():
+    """Test parse_commit splits the signature header out of the signed payload."""
+    raw = localgit.parse_commit("hash-1", SIGNED_COMMIT)
+
+    assert raw.author == "User One"
+    assert raw.signature == (
+        b"-----BEGIN SSH SIGNATURE-----\nU1NIU0lH\n\n-----END SSH SIGNATURE-----\n"
+    )
+    assert raw.payload == (
+        b"tree 4b825dc642cb6eb9a060e54bf8d69288fbee4904\n"
+        b"author User One <user1@example.com> 1600000000 +0000\n"
+        b"committer User One <user1@example.com> 1600000000 +0000\n"
+        b"\n"
+        b"Commit message\n"
+    )
+
+
+def test_parse_commit_unsigned():
+    """Test parse_commit leaves unsigned commits untouched."""
+    data = SIGNED_COMMIT.replace(
+        SIGNED_COMMIT[
+            SIGNED_COMMIT.index(b"gpgsig") : SIGNED_COMMIT.index(b"\n\n") + 1
+        ],
+        b"",
+    )
+    raw = localgit.parse_commit("hash-1", data)
+
+    assert raw.signature is None
+    assert raw.payload == data
+
+
+def test_verify_unsigned():
+    """Test unsigned commits are never verified."""
+    raw = localgit.RawCommit(
+        sha="hash-1", author="User One", signature=None, payload=b""
+    )
+    assert not localgit.SignatureVerifier().verify(raw)
+
+
+def test_verify_ssh_without_allowed_signers():
+    """Test SSH signatures are not verified without an allowed signers file."""
+    raw = localgit.parse_commit("hash-1", SIGNED_COMMIT)
+    assert not localgit.SignatureVerifier().verify(raw)
+
+
+@requires_git
+def test_read_commits(repo_path):
+    """Test read_commits streams every requested commit in order."""
+    shas = [make_commit(repo_path, f"Commit {i}") for i in range(3)]
+
+    result = list(localgit.read_commits(str(repo_path), list(reversed(shas))))
+
+    assert [raw.sha for raw in result] == list(reversed(shas))
+    assert all(raw.author == "User One" for raw in result)
+    assert result[0].payload.endswith(b"Commit 2\n")
+
+
+@requires_git
+def test_read_commits_missing(repo_path):
+    """Test read_commits fails correctly for commits not in the repository."""
+    make_commit(repo_path, "Commit")
+    with pytest.raises(ValueError):
+        list(localgit.read_commits(str(repo_path), ["0" * 40]))
+
+
+@requires_git
+@requires_ssh_keygen
+def test_get_commits_ssh(repo_path, tmp_path):
+    """
+    Test get_commits verifies SSH signed commits against the allowed signers file.
+    """
+    key = tmp_path / "key"
+    subprocess.run(
+        ["ssh-keygen", "-q", "-t", "ed25519", "-N", "", "-f", str(key)], check=True
+    )
+    allowed_signers = tmp_path / "allowed_signers"
+    allowed_signers.write_text(
+        f"user1@example.com {(tmp_path / 'key.pub').read_text()}"
+    )
+    untrusted = tmp_path / "untrusted"
+    untrusted.write_text("")
+
+    signing = ("gpg.format=ssh", f"user.signingkey={key}", "commit.gpgsign=true")
+    signed = make_commit(repo_path, "Signed", *signing)
+    unsigned = make_commit(repo_path, "Unsigned")
+
+    verifier = localgit.SignatureVerifier(allowed_signers=str(allowed_signers))
+    result = localgit.get_commits(
+        repo="github/repo-name",
+        shas=[signed, unsigned],
+        path=str(repo_path),
+        verifier=verifier,
+    )
+
+    assert result == [
+        github.Commit(
+            sha=signed,
+            html_url=f"https://github.com/github/repo-name/commit/{signed}",
+            author="User One",
+            verified=True,
+        ),
+        github.Commit(
+            sha=unsigned,
+            html_url=f"https://github.com/github/repo-name/commit/{unsigned}",
+            author="User One",
+            verified=False,
+        ),
+    ]
+
+    assert (
+        localgit.get_commits(
+            repo="github/repo-name",
+            shas=[signed, unsigned],
+            path=str(repo_path),
+            verifier=verifier,
+            workers=2,
+        )
+        == result
+    )
+
+    verifier = localgit.SignatureVerifier(allowed_signers=str(untrusted))
+    raw = next(localgit.read_commits(str(repo_path), [signed]))
+    assert not verifier.verify(raw)
+
+
+@requires_git
+@requires_gpg
+def test_get_commits_gpg(repo_path, tmp_path):
+    """Test get_commits verifies GPG signed commits against the keyring."""
+    home = tmp_path / "gnupg"
+    home.mkdir(mode=0o700)
+    env = {"GNUPGHOME": str(home)}
+    subprocess.run(
+        [
+            "gpg",
+            "--batch",
+            "--passphrase",
+            "",
+            "--quick-gen-key",
+            "User One <user1@example.com>",
+            "ed25519",
+            "sign",
+            "never",
+        ],
+        check=True,
+        capture_output=True,
+        env={**os.environ, **env},
+    )
+    keyring = tmp_path / "keyring.gpg"
+    with open(keyring, "wb") as file:
+        subprocess.run(
+            ["gpg", "--batch", "--export"],
+            check=True,
+            stdout=file,
+            env={**os.environ, **env},
+        )
+
+    git(
+        repo_path,
+        "-c",
+        "user.signingkey=user1@example.com",
+        "commit",
+        "--allow-empty",
+        "-q",
+        "-S",
+        "-m",
+        "Signed",
+        env=env,
+    )
+    signed = git(repo_path, "rev-parse", "HEAD")
+
+    verifier = localgit.SignatureVerifier(gpg_keyring=str(keyring))
+    raw = next(localgit.read_commits(str(repo_path), [signed]))
+    assert raw.signature.startswith(localgit.GPG_SIGNATURE)
+    assert verifier.verify(raw)
+
+    other_keyring = tmp_path / "other.gpg"
+    other_keyring.write_bytes(b"")
+    assert not localgit.SignatureVerifier(gpg_keyring=str(other_keyring)).verify(raw)
+
+
+def test_repository_path(monkeypatch):
+    """Test repository_path defaults to the GitHub Actions workspace."""
+    monkeypatch.setenv("GITHUB_WORKSPACE", "/github/workspace")
+    monkeypatch.delenv("GIT_REPOSITORY_PATH", raising=False)
+    assert localgit.repository_path() == "/github/workspace"
+
+    monkeypatch.setenv("GIT_REPOSITORY_PATH", "checkout")
+    assert localgit.repository_path() == "/github/workspace/checkout"
+
+
+class FakeVerifier(localgit.SignatureVerifier):
+    """A verifier that trusts every commit with an even numbered SHA."""
+
+    def verify(self, commit):
+        return int(commit.sha.split("-")[1]) % 2 == 0
+
+
+@pytest.mark.parametrize("workers, chunk_size", [(2, 1), (2, 7), (3, 64)])
+def test_verify_commits_parallel(workers, chunk_size):
+    """
+    Test verify_commits gives the same results in the same order in parallel as it
+    does serially.
+    """
+    commits = [
+        localgit.RawCommit(
+            sha=f"hash-{i}", author="User One", signature=None, payload=b""
+        )
+        for i in range(100)
+    ]
+    verifier = FakeVerifier()
+
+    serial = list(localgit.verify_commits(verifier, iter(commits)))
+    parallel = list(
+        localgit.verify_commits(
+            verifier, iter(commits), workers=workers, chunk_size=chunk_size
+        )
+    )
+
+    assert parallel == serial
+    assert serial == [i % 2 == 0 for i in range(100)]
@@ -1,18 +1,96 @@
 """
 Format and send a message indicating the git commits listed in hashes are not verified.
 
-Each sender method should have the same signature as `send_to_console`.
+Each sender method should have the same signature as `send_to_console`, and each
+backend has a batch sender with the same signature as `send_batch_to_console` that
+sends the messages for every author of a run.
 """
+import json
 import logging
 import os
-from typing import List
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional
 
-import requests
+from . import github, ratelimit, transport
 
 LOGGER = logging.getLogger(__name__)
 
+# Maximum number of blocks Slack accepts in a single message
+SLACK_MAX_BLOCKS = 50
+# Maximum length of the text of a Slack section block
+SLACK_MAX_TEXT = 3000
+# Default number of times a rate limited webhook message is retried
+DEFAULT_WEBHOOK_RETRIES = 3
+# Default timeout in seconds for each request to a webhook
+DEFAULT_WEBHOOK_TIMEOUT = 10.0
 
-def send_to_console(*, author: str, repo: str, commits: List[dict]):
+# The `Webhook` of each URL messages were sent to, reused for the rest of the run
+WEBHOOKS: Dict[str, "Webhook"] = {}
+WEBHOOKS_LOCK = threading.Lock()
+
+
+class Webhook:  # pylint: disable=too-few-public-methods
+    """
+    Send JSON messages to a webhook URL, like a Slack incoming webhook, over a single
+    pooled connection.
+
+    Messages rejected by a rate limit with a `429 Too Many Requests` response are
+    retried up to `retries` times, after waiting for as long as the response's
+    `Retry-After` header asks.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        retries: int = DEFAULT_WEBHOOK_RETRIES,
+        timeout: float = DEFAULT_WEBHOOK_TIMEOUT,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.url = url
+        self.retries = retries
+        self.timeout = timeout
+        self.sleep = sleep
+        self.session = transport.new_session(pool_size=1)
+
+    def post(self, body: dict):
+        """Send the message `body` to the webhook."""
+        attempt = 0
+        while True:
+            LOGGER.debug("POST %s %s", self.url, body)
+            resp = self.session.post(self.url, json=body, timeout=self.timeout)
+            if resp.status_code == 429 and attempt < self.retries:
+                retry_after = ratelimit.parse_int_header(
+                    resp.headers.get("Retry-After")
+                )
+                delay = float(retry_after) if retry_after is not None else 1.0
+                LOGGER.warning("Webhook rate limited, retrying in %.1fs", delay)
+                self.sleep(delay)
+                attempt += 1
+                continue
+
+            try:
+                resp.raise_for_status()
+            except Exception:
+                LOGGER.error("Unable to publish to webhook: %s", resp.text)
+                raise
+            return
+
+
+def get_webhook(url: str) -> Webhook:
+    """
+    Get the `Webhook` for `url`, creating it on first use, so every message of the run
+    is sent over the same pooled connection.
+    """
+    with WEBHOOKS_LOCK:
+        webhook = WEBHOOKS.get(url)
+        if webhook is None:
+            webhook = WEBHOOKS[url] = Webhook(url)
+        return webhook
+
+
+def send_to_console(*, author: str, repo: str, commits: List[github.Commit]):
     """
     Print a message to std::out describing the unverified commits.
 
@@ -30,12 +108,28 @@ def send_to_console(*, author: str, repo: str, commits: List[dict]):
         f"GitHub user {author.title()} pushed {len(commits)} "
         f"unverified commits to {repo}:\n\n"
     )
-    msg += "\n".join([f"\t* {commit['html_url']}" for commit in commits])
+    msg += "\n".join([f"\t* {commit.html_url}" for commit in commits])
 
     print(msg)
 
 
-def send_to_slack(*, author: str, repo: str, commits: List[dict]):
+def send_batch_to_console(
+    *, repo: str, grouped_commits: Dict[str, List[github.Commit]]
+):
+    """
+    Print a message to std::out for each author's unverified commits.
+
+    `send_batch_to_console` is the demonstration batch send method, the parameters
+    have the same meaning in all other batch send methods.
+
+    `grouped_commits` maps the name of each GitHub user who pushed unverified commits
+    to `repo` to their list of unverified commits.
+    """
+    for author, commits in grouped_commits.items():
+        send_to_console(author=author, repo=repo, commits=commits)
+
+
+def send_to_slack(*, author: str, repo: str, commits: List[github.Commit]):
     """
     Send a message to a Slack webhook URL describing the unverified commits.
 
@@ -44,27 +138,141 @@ def send_to_slack(*, author: str, repo: str, commits: List[dict]):
 
     Arguments are the same as in `send_to_console`.
     """
+    send_batch_to_slack(repo=repo, grouped_commits={author: commits})
+
+
+def send_batch_to_slack(
+    *,
+    repo: str,
+    grouped_commits: Dict[str, List[github.Commit]],
+    webhook: Optional[Webhook] = None,
+):
+    """
+    Send messages to a Slack webhook URL describing every author's unverified commits.
+
+    The blocks describing each author's commits are combined into as few messages as
+    Slack's block limits allow, which are sent one after another over the same
+    connection.
+
+    Arguments are the same as in `send_batch_to_console`.
+    """
+    webhook = webhook or get_webhook(os.environ["SLACK_WEBHOOK_URL"])
+
+    blocks = [
+        block
+        for author, commits in grouped_commits.items()
+        for block in slack_blocks(author=author, repo=repo, commits=commits)
+    ]
+    count = sum(len(commits) for commits in grouped_commits.values())
+    if len(grouped_commits) == 1:
+        author = next(iter(grouped_commits))
+        plain_text = f"{author.title()} pushed {count} unverified commits"
+    else:
+        plain_text = f"{len(grouped_commits)} users pushed {count} unverified commits"
+
+    for start in range(0, len(blocks), SLACK_MAX_BLOCKS):
+        webhook.post(
+            {"text": plain_text, "blocks": blocks[start : start + SLACK_MAX_BLOCKS]}
+        )
+
+
+def slack_blocks(*, author: str, repo: str, commits: List[github.Commit]) -> List[dict]:
+    """
+    Format the Slack blocks describing an author's unverified commits.
+
+    Markdown too long for a single section block is split over several, one commit
+    per line.
+    """
+    return [
+        {"type": "section", "text": {"type": "mrkdwn", "text": markdown}}
+        for markdown in split_text(slack_markdown(author, repo, commits))
+    ]
+
+
+def slack_markdown(author: str, repo: str, commits: List[github.Commit]) -> str:
+    """Format the Slack markdown describing an author's unverified commits."""
     markdown = (
         f"GitHub user `<https://github.com/{author}|{author.title()}>` pushed "
         f"*{len(commits)}* unverified commits to `<https://github.com/{repo}|{repo}>`\n"
     )
     for commit in commits:
-        markdown += f"\t:heavy_minus_sign: `<{commit['html_url']}|{commit['sha']}>`\n"
-
-    # Simplified plaintext message for notification body and anywhere else that can't
-    # display the entire markdown message
-    plain_text = f"{author.title()} pushed {len(commits)} unverified commits"
-
-    webhook_url = os.environ["SLACK_WEBHOOK_URL"]
-    body = {
-        "text": plain_text,
-        "blocks": [{"type": "section", "text": {"type": "mrkdwn", "text": markdown}}],
-    }
-
-    try:
-        LOGGER.debug(f"POST {webhook_url} {body}")
-        resp = requests.post(webhook_url, json=body)
-        resp.raise_for_status()
-    except Exception:
-        LOGGER.error(f"Unable to publish to Slack webhook: {resp.text}")
-        raise
+        markdown += f"\t:heavy_minus_sign: `<{commit.html_url}|{commit.sha}>`\n"
+    return markdown
+
+
+def split_text(text: str, limit: int = SLACK_MAX_TEXT) -> Iterator[str]:
+    """Split `text` into parts of at most `limit` characters, between lines."""
+    part = ""
+    for line in text.splitlines(keepends=True):
+        if part and len(part) + len(line) > limit:
+            yield part
+            part = ""
+        part += line
+    if part:
+        yield part
+
+
+def send_to_webhook(*, author: str, repo: str, commits: List[github.Commit]):
+    """
+    Send a JSON message describing the unverified commits to the webhook URL in the
+    environment variable `WEBHOOK_URL`.
+
+    Arguments are the same as in `send_to_console`.
+    """
+    send_batch_to_webhook(repo=repo, grouped_commits={author: commits})
+
+
+def send_batch_to_webhook(
+    *,
+    repo: str,
+    grouped_commits: Dict[str, List[github.Commit]],
+    webhook: Optional[Webhook] = None,
+):
+    """
+    Send a single JSON message describing every author's unverified commits to the
+    webhook URL in the environment variable `WEBHOOK_URL`.
+
+    Arguments are the same as in `send_batch_to_console`.
+    """
+    webhook = webhook or get_webhook(os.environ["WEBHOOK_URL"])
+    webhook.post(
+        {
+            "repo": repo,
+            "authors": [
+                {"author": author, "commits": [commit_details(c) for c in commits]}
+                for author, commits in grouped_commits.items()
+            ],
+        }
+    )
+
+
+def send_to_file(*, author: str, repo: str, commits: List[github.Commit]):
+    """
+    Append a line of JSON describing the unverified commits to the file at the path in
+    the environment variable `MESSAGE_FILE_PATH`.
+
+    Arguments are the same as in `send_to_console`.
+    """
+    send_batch_to_file(repo=repo, grouped_commits={author: commits})
+
+
+def send_batch_to_file(*, repo: str, grouped_commits: Dict[str, List[github.Commit]]):
+    """
+    Append a line of JSON describing each author's unverified commits to the file at
+    the path in the environment variable `MESSAGE_FILE_PATH`.
+
+    Arguments are the same as in `send_batch_to_console`.
+    """
+    with open(os.environ["MESSAGE_FILE_PATH"], "a", encoding="utf-8") as file:
+        for author, commits in grouped_commits.items():
+            message = {
+                "repo": repo,
+                "author": author,
+                "commits": [commit_details(commit) for commit in commits],
+            }
+            file.write(json.dumps(message) + "\n")
+
+
+def commit_details(commit: github.Commit) -> dict:
+    """Describe an unverified commit in a JSON message."""
+    return {"sha": commit.sha, "html_url": commit.html_url}
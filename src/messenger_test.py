@@ -1,7 +1,41 @@
 """Unit tests for the messenger.py module."""
 from unittest import mock
+import json
 import os
-from . import messenger
+
+import pytest  # type: ignore
+
+from . import github, messenger
+
+
+@pytest.fixture(autouse=True, name="webhooks")
+def fixture_webhooks():
+    """Forget the webhooks created by each test."""
+    yield messenger.WEBHOOKS
+    messenger.WEBHOOKS.clear()
+
+
+def make_commits(author, count):
+    """Build `count` unverified commits by `author`."""
+    return [
+        github.Commit(
+            sha=f"sha{i}", html_url=f"https://url.{i}", author=author, verified=False
+        )
+        for i in range(count)
+    ]
+
+
+def make_webhook(*responses):
+    """Create a `Webhook` with a mock session returning `responses` in turn."""
+    webhook = messenger.Webhook("https://hooks.slack.com/test", sleep=mock.Mock())
+    webhook.session = mock.MagicMock()
+    webhook.session.post.side_effect = list(responses) or None
+    return webhook
+
+
+def make_response(status_code=200, **headers):
+    """Create a mock webhook response."""
+    return mock.MagicMock(status_code=status_code, headers=headers)
 
 
 def test_send_to_console(capsys):
@@ -9,7 +43,14 @@ def test_send_to_console(capsys):
     # pylint: disable=protected-access
     author = "test-user"
     repo = "github/repo-name"
-    commits = [{"html_url": "https://url.1"}, {"html_url": "https://url.2"}]
+    commits = [
+        github.Commit(
+            sha="sha1", html_url="https://url.1", author=author, verified=False
+        ),
+        github.Commit(
+            sha="sha2", html_url="https://url.2", author=author, verified=False
+        ),
+    ]
 
     expected = (
         "GitHub user Test-User pushed 2 unverified commits to github/repo-name:"
@@ -22,16 +63,20 @@ def test_send_to_console(capsys):
     assert captured.out == expected
 
 
-@mock.patch("src.messenger.requests")
-def test_send_to_slack(requests):
+@mock.patch("src.messenger.transport.new_session")
+def test_send_to_slack(new_session):
     """
     Test send_to_slack formats a message and POSTs it to the webhook URL correctly.
     """
     author = "test-user"
     repo = "github/repo-name"
     commits = [
-        {"html_url": "https://url.1", "sha": "sha1"},
-        {"html_url": "https://url.2", "sha": "sha2"},
+        github.Commit(
+            sha="sha1", html_url="https://url.1", author=author, verified=False
+        ),
+        github.Commit(
+            sha="sha2", html_url="https://url.2", author=author, verified=False
+        ),
     ]
     url = "https://google.com"
     os.environ["SLACK_WEBHOOK_URL"] = url
@@ -51,5 +96,152 @@ def test_send_to_slack(requests):
         "blocks": [{"type": "section", "text": {"type": "mrkdwn", "text": markdown}}],
     }
 
-    requests.post.return_value.raise_for_status.assert_called_once()
-    requests.post.assert_called_once_with(url, json=expected)
+    session = new_session.return_value
+    session.post.return_value.raise_for_status.assert_called_once()
+    session.post.assert_called_once_with(
+        url, json=expected, timeout=messenger.DEFAULT_WEBHOOK_TIMEOUT
+    )
+
+
+@mock.patch("src.messenger.transport.new_session")
+def test_send_to_slack_reuses_webhook(new_session, webhooks):
+    """Test every message to the same Slack webhook URL is sent over one session."""
+    os.environ["SLACK_WEBHOOK_URL"] = "https://hooks.slack.com/reused"
+
+    for _ in range(2):
+        messenger.send_to_slack(
+            author="user1", repo="github/repo-name", commits=make_commits("user1", 1)
+        )
+
+    new_session.assert_called_once()
+    assert new_session.return_value.post.call_count == 2
+    assert list(webhooks) == ["https://hooks.slack.com/reused"]
+
+
+def test_send_batch_to_console(capsys):
+    """Test send_batch_to_console prints a message for each author."""
+    messenger.send_batch_to_console(
+        repo="github/repo-name",
+        grouped_commits={
+            "user1": make_commits("user1", 1),
+            "user2": make_commits("user2", 2),
+        },
+    )
+
+    captured = capsys.readouterr()
+    assert "User1 pushed 1 unverified commits" in captured.out
+    assert "User2 pushed 2 unverified commits" in captured.out
+
+
+def test_send_batch_to_slack():
+    """Test send_batch_to_slack combines every author's block into one message."""
+    webhook = make_webhook()
+    grouped_commits = {
+        f"user{i}": make_commits(f"user{i}", 2)
+        for i in range(messenger.SLACK_MAX_BLOCKS)
+    }
+
+    messenger.send_batch_to_slack(
+        repo="github/repo-name", grouped_commits=grouped_commits, webhook=webhook
+    )
+
+    webhook.session.post.assert_called_once()
+    body = webhook.session.post.call_args.kwargs["json"]
+    assert body["text"] == "50 users pushed 100 unverified commits"
+    assert len(body["blocks"]) == messenger.SLACK_MAX_BLOCKS
+
+
+def test_send_batch_to_slack_block_limit():
+    """Test send_batch_to_slack splits messages at Slack's block limit."""
+    webhook = make_webhook()
+    grouped_commits = {f"user{i}": make_commits(f"user{i}", 1) for i in range(120)}
+
+    messenger.send_batch_to_slack(
+        repo="github/repo-name", grouped_commits=grouped_commits, webhook=webhook
+    )
+
+    sizes = [
+        len(call.kwargs["json"]["blocks"])
+        for call in webhook.session.post.call_args_list
+    ]
+    assert sizes == [50, 50, 20]
+
+
+def test_slack_blocks_text_limit():
+    """Test an author's commits are split over blocks at Slack's text limit."""
+    commits = make_commits("user1", 200)
+
+    blocks = messenger.slack_blocks(author="user1", repo="github/repo", commits=commits)
+
+    texts = [block["text"]["text"] for block in blocks]
+    assert len(texts) > 1
+    assert all(len(text) <= messenger.SLACK_MAX_TEXT for text in texts)
+    assert "".join(texts) == messenger.slack_markdown("user1", "github/repo", commits)
+
+
+def test_webhook_retry_after():
+    """Test a rate limited message is retried after the `Retry-After` delay."""
+    webhook = make_webhook(make_response(429, **{"Retry-After": "5"}), make_response())
+
+    webhook.post({"text": "message"})
+
+    assert webhook.session.post.call_count == 2
+    webhook.sleep.assert_called_once_with(5.0)
+
+
+def test_webhook_retries_exhausted():
+    """Test a message still rate limited after every retry fails."""
+    responses = [make_response(429)] * (messenger.DEFAULT_WEBHOOK_RETRIES + 1)
+    responses[-1].raise_for_status.side_effect = ValueError("429 Too Many Requests")
+    webhook = make_webhook(*responses)
+
+    with pytest.raises(ValueError):
+        webhook.post({"text": "message"})
+
+    assert webhook.session.post.call_count == messenger.DEFAULT_WEBHOOK_RETRIES + 1
+
+
+def test_send_batch_to_webhook():
+    """Test send_batch_to_webhook POSTs one JSON message describing every author."""
+    webhook = make_webhook()
+
+    messenger.send_batch_to_webhook(
+        repo="github/repo-name",
+        grouped_commits={"user1": make_commits("user1", 1)},
+        webhook=webhook,
+    )
+
+    webhook.session.post.assert_called_once_with(
+        "https://hooks.slack.com/test",
+        json={
+            "repo": "github/repo-name",
+            "authors": [
+                {
+                    "author": "user1",
+                    "commits": [{"sha": "sha0", "html_url": "https://url.0"}],
+                }
+            ],
+        },
+        timeout=messenger.DEFAULT_WEBHOOK_TIMEOUT,
+    )
+
+
+def test_send_batch_to_file(tmp_path):
+    """Test send_batch_to_file appends a line of JSON for each author."""
+    path = tmp_path / "messages.jsonl"
+    grouped_commits = {
+        "user1": make_commits("user1", 1),
+        "user2": make_commits("user2", 2),
+    }
+
+    with mock.patch.dict(os.environ, {"MESSAGE_FILE_PATH": str(path)}):
+        messenger.send_batch_to_file(
+            repo="github/repo-name", grouped_commits=grouped_commits
+        )
+        messenger.send_to_file(
+            author="user3", repo="github/repo-name", commits=make_commits("user3", 1)
+        )
+
+    messages = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [message["author"] for message in messages] == ["user1", "user2", "user3"]
+    assert len(messages[1]["commits"]) == 2
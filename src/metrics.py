@@ -0,0 +1,235 @@
+"""
+Metrics recorded during a run of the action.
+
+Counters, latency histograms and phase timings are recorded in `METRICS` as the action
+runs. At the end of a run `report` appends them as tables to the job's step summary,
+`GITHUB_STEP_SUMMARY`, and writes them as JSON to `METRICS_PATH` when it is set, so they
+can be collected across many runs.
+"""
+import bisect
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the latency histogram buckets, the last bucket is unbounded
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Version of the JSON metrics format
+METRICS_VERSION = 1
+
+
+class Histogram:
+    """
+    A histogram of durations in seconds, counted into fixed `buckets`.
+
+    Only the bucket counts are kept, so a histogram uses the same memory however many
+    durations are observed, and quantiles are estimated from the buckets.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        """Count a duration of `value` seconds."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        """The mean of the observed durations."""
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, fraction: float) -> float:
+        """
+        Estimate the `fraction` quantile of the observed durations, as the upper bound
+        of the bucket it falls in, or the largest duration if that is smaller.
+        """
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        """The histogram in the JSON metrics format, with cumulative bucket counts."""
+        buckets = {}
+        seen = 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            seen += count
+            buckets[str(bound)] = seen
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "max": round(self.max, 6),
+            "buckets": buckets,
+        }
+
+
+class Metrics:
+    """
+    Counters, histograms and phase timings recorded by the action.
+
+    Counters are named totals like the number of requests sent or bytes received,
+    histograms record the latency of repeated operations like each API request, and
+    phases record the total time spent in each step of the run.
+
+    A single `Metrics` is safe to record into from several threads.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.counters: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self.phases: Dict[str, float] = {}
+
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1):
+        """Add `value` to the counter `name`."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name: str, value: float):
+        """Set the counter `name` to `value`, for values like ratios."""
+        with self._lock:
+            self.counters[name] = value
+
+    def observe(self, name: str, seconds: float):
+        """Record a duration of `seconds` in the histogram `name`."""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    @contextlib.contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Record the duration of the `with` block in the histogram `name`."""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.observe(name, self.clock() - start)
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Add the duration of the `with` block to the time spent in phase `name`."""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            elapsed = self.clock() - start
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def reset(self):
+        """Forget everything recorded so far."""
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.phases.clear()
+
+    def to_dict(self) -> dict:
+        """The metrics in the JSON metrics format."""
+        with self._lock:
+            return {
+                "version": METRICS_VERSION,
+                "phases": {
+                    name: round(value, 6) for name, value in self.phases.items()
+                },
+                "counters": dict(self.counters),
+                "histograms": {
+                    name: histogram.to_dict()
+                    for name, histogram in self.histograms.items()
+                },
+            }
+
+    def summary(self, title: str) -> str:
+        """The metrics as Markdown tables, for the job's step summary."""
+        with self._lock:
+            lines = [f"### {title}", ""]
+            if self.phases:
+                lines += table(
+                    ["Phase", "Seconds"],
+                    [[name, f"{value:.3f}"] for name, value in self.phases.items()],
+                )
+            if self.histograms:
+                lines += table(
+                    ["Latency", "Count", "Mean", "p50", "p95", "Max"],
+                    [
+                        [name, str(histogram.count)]
+                        + [
+                            f"{value:.3f}s"
+                            for value in (
+                                histogram.mean,
+                                histogram.quantile(0.5),
+                                histogram.quantile(0.95),
+                                histogram.max,
+                            )
+                        ]
+                        for name, histogram in self.histograms.items()
+                    ],
+                )
+            if self.counters:
+                lines += table(
+                    ["Counter", "Value"],
+                    [[name, f"{value:g}"] for name, value in self.counters.items()],
+                )
+            return "\n".join(lines)
+
+
+# The metrics of the current run
+METRICS = Metrics()
+
+
+def table(header: List[str], rows: List[List[str]]) -> List[str]:
+    """The lines of a Markdown table, followed by a blank line."""
+    lines = [
+        f"| {' | '.join(header)} |",
+        f"| {' | '.join('---' for _ in header)} |",
+    ]
+    lines += [f"| {' | '.join(row)} |" for row in rows]
+    return lines + [""]
+
+
+def report(title: str, metrics: Optional[Metrics] = None):
+    """
+    Report the run's `metrics` to the job's step summary under the heading `title`, and
+    to the JSON file at `METRICS_PATH` when it is set.
+
+    Relative `METRICS_PATH`s are relative to the GitHub Actions workspace,
+    `GITHUB_WORKSPACE`. Failing to write the metrics is logged but never fails the run.
+    """
+    metrics = metrics or METRICS
+
+    summary_path = os.environ.get("GITHUB_STEP_SUMMARY")
+    if summary_path:
+        try:
+            with open(summary_path, "a", encoding="utf-8") as file:
+                file.write(metrics.summary(title) + "\n")
+        except OSError as ex:
+            LOGGER.warning("Unable to write the step summary %s: %s", summary_path, ex)
+
+    metrics_path = os.environ.get("METRICS_PATH")
+    if metrics_path:
+        metrics_path = os.path.join(
+            os.environ.get("GITHUB_WORKSPACE", ""), metrics_path
+        )
+        try:
+            with open(metrics_path, "w", encoding="utf-8") as file:
+                json.dump(metrics.to_dict(), file, indent=2)
+        except OSError as ex:
+            LOGGER.warning("Unable to write metrics to %s: %s", metrics_path, ex)
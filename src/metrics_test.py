@@ -0,0 +1,123 @@
+"""Unit tests for the metrics.py module."""
+import json
+import os
+from unittest import mock
+
+import pytest  # type: ignore
+
+from . import metrics
+
+
+class FakeClock:  # pylint: disable=too-few-public-methods
+    """A clock that advances by `step` seconds each time it is read."""
+
+    def __init__(self, step: float):
+        self.step = step
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        self.now += self.step
+        return self.now
+
+
+def test_histogram():
+    """Test a histogram counts durations into buckets and estimates quantiles."""
+    histogram = metrics.Histogram(buckets=(0.1, 1.0))
+    for value in [0.05, 0.05, 0.05, 0.5, 2.0]:
+        histogram.observe(value)
+
+    assert histogram.count == 5
+    assert histogram.mean == pytest.approx(0.53)
+    assert histogram.max == 2.0
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.8) == 1.0
+    assert histogram.quantile(0.95) == 2.0
+    assert histogram.to_dict()["buckets"] == {"0.1": 3, "1.0": 4, "+Inf": 5}
+
+
+def test_histogram_quantile_below_bucket_bound():
+    """Test quantile estimates never exceed the largest duration."""
+    histogram = metrics.Histogram(buckets=(1.0,))
+    histogram.observe(0.2)
+
+    assert histogram.quantile(0.5) == 0.2
+
+
+def test_metrics_record():
+    """Test counters, timers and phases are recorded."""
+    run_metrics = metrics.Metrics(clock=FakeClock(0.5))
+
+    run_metrics.increment("requests")
+    run_metrics.increment("bytes", 100)
+    run_metrics.increment("bytes", 20)
+    run_metrics.set("hit_rate", 0.25)
+    with run_metrics.timer("request"):
+        pass
+    with run_metrics.phase("lookup"):
+        pass
+    with run_metrics.phase("lookup"):
+        pass
+
+    assert run_metrics.counters == {"requests": 1, "bytes": 120, "hit_rate": 0.25}
+    assert run_metrics.histograms["request"].sum == 0.5
+    assert run_metrics.phases == {"lookup": 1.0}
+
+
+def test_metrics_summary():
+    """Test the metrics are summarised as Markdown tables."""
+    run_metrics = metrics.Metrics(clock=FakeClock(0.5))
+    run_metrics.increment("github.requests", 3)
+    with run_metrics.phase("lookup"):
+        pass
+    run_metrics.observe("github.request", 0.2)
+
+    assert run_metrics.summary("Run").splitlines() == [
+        "### Run",
+        "",
+        "| Phase | Seconds |",
+        "| --- | --- |",
+        "| lookup | 0.500 |",
+        "",
+        "| Latency | Count | Mean | p50 | p95 | Max |",
+        "| --- | --- | --- | --- | --- | --- |",
+        "| github.request | 1 | 0.200s | 0.200s | 0.200s | 0.200s |",
+        "",
+        "| Counter | Value |",
+        "| --- | --- |",
+        "| github.requests | 3 |",
+    ]
+
+
+def test_report(tmp_path):
+    """Test report appends to the step summary and writes the JSON metrics file."""
+    summary_path = tmp_path / "summary.md"
+    summary_path.write_text("Earlier step\n")
+    run_metrics = metrics.Metrics()
+    run_metrics.increment("github.requests", 3)
+    run_metrics.observe("github.request", 0.2)
+
+    env = {
+        "GITHUB_STEP_SUMMARY": str(summary_path),
+        "GITHUB_WORKSPACE": str(tmp_path),
+        "METRICS_PATH": "metrics.json",
+    }
+    with mock.patch.dict(os.environ, env):
+        metrics.report("Run", run_metrics)
+
+    summary = summary_path.read_text()
+    assert summary.startswith("Earlier step\n### Run\n")
+    assert "| github.requests | 3 |" in summary
+    data = json.loads((tmp_path / "metrics.json").read_text())
+    assert data["version"] == metrics.METRICS_VERSION
+    assert data["counters"] == {"github.requests": 3}
+    assert data["histograms"]["github.request"]["count"] == 1
+
+
+def test_report_unwritable(tmp_path):
+    """Test failing to write the metrics does not fail the run."""
+    env = {
+        "GITHUB_STEP_SUMMARY": str(tmp_path / "missing" / "summary.md"),
+        "METRICS_PATH": str(tmp_path / "missing" / "metrics.json"),
+    }
+    with mock.patch.dict(os.environ, env):
+        metrics.report("Run", metrics.Metrics())
@@ -0,0 +1,296 @@
+"""
+Send notifications for unverified commits while the remaining commits are still being
+looked up.
+
+Unverified commits are handed to a `Notifier` as soon as they are found. It groups
+them by author on a background thread and passes each batch to the messenger backend
+once it is large or old enough, so message delivery overlaps with the lookups instead
+of waiting for all of them to finish.
+
+A `FanOut` delivers each batch to several messenger backends at once, each from its
+own `Delivery` thread and queue so a slow or failing backend can't hold up the others.
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from . import github, metrics
+
+LOGGER = logging.getLogger(__name__)
+
+# Default number of an author's commits that are sent as soon as they are found
+DEFAULT_BATCH_SIZE = 50
+# Default number of seconds a found commit waits for others before being sent
+DEFAULT_FLUSH_INTERVAL = 5.0
+# Default number of batches each backend may have waiting to be delivered
+DEFAULT_QUEUE_SIZE = 100
+# Default number of seconds to wait for each backend's deliveries at the end of a run
+DEFAULT_DELIVERY_TIMEOUT = 30.0
+
+# A messenger batch backend, see `messenger.send_batch_to_console`
+Backend = Callable[..., None]
+
+
+class Notifier:  # pylint: disable=too-many-instance-attributes
+    """
+    Incrementally group unverified commits by author and send them to `backend`.
+
+    An author's commits are sent as soon as `batch_size` of them are waiting, and all
+    waiting commits are sent once the oldest has waited `flush_interval` seconds, or
+    when the notifier is closed. While every lookup finishes within `flush_interval`,
+    each author receives a single message just as if all the commits were sent at once.
+
+    Used as a context manager, the notifier is started on entry and closed on exit.
+    Failures of `backend` are raised by `close`.
+    """
+
+    def __init__(
+        self,
+        backend: Backend,
+        *,
+        repo: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.backend = backend
+        self.repo = repo
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.found = 0
+        self.sent = 0
+
+        self._queue: "queue.Queue[Optional[github.Commit]]" = queue.Queue()
+        self._pending: Dict[str, List[github.Commit]] = {}
+        self._oldest: Optional[float] = None
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+
+    def __enter__(self) -> "Notifier":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self.close():
+            LOGGER.error("Notifications were not delivered to every backend")
+
+    def start(self):
+        """Start sending notifications on a background thread."""
+        self._thread.start()
+
+    def put(self, commit: github.Commit):
+        """Queue an unverified commit to be sent."""
+        self.found += 1
+        self._queue.put(commit)
+
+    def close(self):
+        """Send every queued commit and wait for the notifications to finish."""
+        self._queue.put(None)
+        self._thread.join()
+        if self._error:
+            raise self._error
+
+    def _run(self):
+        """Group queued commits and send them until the notifier is closed."""
+        while True:
+            timeout = None
+            if self._oldest is not None:
+                timeout = max(0.0, self._oldest + self.flush_interval - self.clock())
+            try:
+                commit = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                LOGGER.debug("Sending unverified commits after the flush interval")
+                self._flush(list(self._pending))
+                continue
+
+            if commit is None:
+                self._flush(list(self._pending))
+                return
+
+            commits = self._pending.setdefault(commit.author, [])
+            commits.append(commit)
+            if self._oldest is None:
+                self._oldest = self.clock()
+            if len(commits) >= self.batch_size:
+                LOGGER.debug("Sending a full batch of commits by %s", commit.author)
+                self._flush([commit.author])
+
+    def _flush(self, authors: List[str]):
+        """Send the waiting commits of `authors` in a single batch."""
+        grouped = {author: self._pending.pop(author) for author in authors}
+        self._oldest = self.clock() if self._pending else None
+        if not grouped or self._error:
+            return
+
+        try:
+            self.backend(repo=self.repo, grouped_commits=grouped)
+        except Exception as ex:  # pylint: disable=broad-except
+            LOGGER.error("Unable to send notifications: %s", ex)
+            self._error = ex
+            return
+        self.sent += sum(len(commits) for commits in grouped.values())
+
+
+class Delivery:  # pylint: disable=too-many-instance-attributes
+    """
+    Deliver batches of commits to a single messenger `backend` from a background
+    thread, recording how long each delivery took.
+
+    At most `queue_size` batches wait to be delivered. Once the queue is full further
+    batches wait up to `timeout` seconds for room, and are dropped after that rather
+    than blocking the caller forever. Failures of `backend` are logged and counted.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        backend: Backend,
+        *,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        timeout: float = DEFAULT_DELIVERY_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.backend = backend
+        self.timeout = timeout
+        self.clock = clock
+        self.latencies = metrics.Histogram()
+        self.failures = 0
+        self.dropped = 0
+
+        # Each item is a batch with the time it was submitted, `None` when closing
+        self._queue: "queue.Queue[Optional[Tuple[float, str, dict]]]"
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._thread = threading.Thread(
+            target=self._run, name=f"delivery-{name}", daemon=True
+        )
+
+    def start(self):
+        """Start delivering batches on a background thread."""
+        self._thread.start()
+
+    def submit(self, *, repo: str, grouped_commits: Dict[str, List[github.Commit]]):
+        """
+        Queue a batch of commits to deliver, waiting for room in a full queue and
+        dropping the batch if there is none within the timeout.
+        """
+        try:
+            self._queue.put((self.clock(), repo, grouped_commits), timeout=self.timeout)
+        except queue.Full:
+            LOGGER.error("Dropping notifications for %s, queue is full", self.name)
+            metrics.METRICS.increment(f"messenger.{self.name}.dropped")
+            self.dropped += 1
+
+    def close(self, deadline: float) -> bool:
+        """
+        Wait until the monotonic time `deadline` for the queued batches to be delivered.
+
+        Returns `False` if they were not all delivered in time. The background thread
+        is abandoned in that case, and stops when the process exits.
+        """
+        try:
+            self._queue.put(None, timeout=max(0.0, deadline - self.clock()))
+        except queue.Full:
+            pass
+        self._thread.join(timeout=max(0.0, deadline - self.clock()))
+        if self._thread.is_alive():
+            LOGGER.error("Timed out delivering notifications to %s", self.name)
+            return False
+        return True
+
+    def _run(self):
+        """Deliver queued batches until the delivery is closed."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            submitted, repo, grouped_commits = item
+            try:
+                with metrics.METRICS.timer(f"messenger.{self.name}"):
+                    self.backend(repo=repo, grouped_commits=grouped_commits)
+            except Exception as ex:  # pylint: disable=broad-except
+                LOGGER.error("Unable to send notifications to %s: %s", self.name, ex)
+                metrics.METRICS.increment(f"messenger.{self.name}.failures")
+                self.failures += 1
+            self.latencies.observe(self.clock() - submitted)
+
+
+class FanOut:
+    """
+    A messenger batch backend that delivers each batch to every one of `backends`
+    concurrently, see `Delivery`.
+
+    Used as a context manager, the deliveries are started on entry and closed on exit,
+    waiting at most `timeout` seconds for every backend to finish, after which the
+    delivery latency of each backend is logged.
+    """
+
+    def __init__(
+        self,
+        backends: Dict[str, Backend],
+        *,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        timeout: float = DEFAULT_DELIVERY_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.timeout = timeout
+        self.clock = clock
+        self.deliveries = [
+            Delivery(name, backend, queue_size=queue_size, timeout=timeout, clock=clock)
+            for name, backend in backends.items()
+        ]
+
+    def __call__(self, *, repo: str, grouped_commits: Dict[str, List[github.Commit]]):
+        for delivery in self.deliveries:
+            delivery.submit(repo=repo, grouped_commits=grouped_commits)
+
+    def __enter__(self) -> "FanOut":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self.close():
+            LOGGER.error("Notifications were not delivered to every backend")
+
+    def start(self):
+        """Start delivering to every backend."""
+        for delivery in self.deliveries:
+            delivery.start()
+
+    def close(self) -> bool:
+        """
+        Wait for the queued batches to be delivered to every backend, then log the
+        delivery latencies.
+
+        Returns `False` if any backend failed or did not finish within the timeout.
+        """
+        deadline = self.clock() + self.timeout
+        finished = [delivery.close(deadline) for delivery in self.deliveries]
+        for delivery in self.deliveries:
+            log_latency(delivery)
+        return all(finished) and not any(
+            delivery.failures or delivery.dropped for delivery in self.deliveries
+        )
+
+
+def log_latency(delivery: Delivery):
+    """Log the delivery latency of a backend."""
+    latencies = delivery.latencies
+    if not latencies.count:
+        LOGGER.info("No notifications delivered to %s", delivery.name)
+        return
+
+    LOGGER.info(
+        "Delivered %s notification batches to %s (%s failed, %s dropped), "
+        "latency mean %.3fs, max %.3fs",
+        latencies.count,
+        delivery.name,
+        delivery.failures,
+        delivery.dropped,
+        latencies.mean,
+        latencies.max,
+    )
@@ -0,0 +1,160 @@
+"""Unit tests for the pipeline.py module."""
+import threading
+from unittest import mock
+
+import pytest  # type: ignore
+
+from . import pipeline
+from .conftest import make_commit
+
+
+class RecordingBackend:  # pylint: disable=too-few-public-methods
+    """A messenger batch backend recording each batch it is sent."""
+
+    def __init__(self):
+        self.batches = []
+        self.sent = threading.Event()
+
+    def __call__(self, *, repo, grouped_commits):
+        assert repo == "github/repo-name"
+        self.batches.append(
+            {
+                author: [c.sha for c in commits]
+                for author, commits in grouped_commits.items()
+            }
+        )
+        self.sent.set()
+
+
+def test_notifier_groups_by_author():
+    """Test commits found within the flush interval are sent together by author."""
+    backend = RecordingBackend()
+
+    with pipeline.Notifier(backend, repo="github/repo-name") as notifier:
+        notifier.put(make_commit("hash-1", False, "user1"))
+        notifier.put(make_commit("hash-2", False, "user2"))
+        notifier.put(make_commit("hash-3", False, "user1"))
+
+    assert backend.batches == [{"user1": ["hash-1", "hash-3"], "user2": ["hash-2"]}]
+    assert notifier.found == notifier.sent == 3
+
+
+def test_notifier_batch_size():
+    """Test an author's commits are sent as soon as a full batch is waiting."""
+    backend = RecordingBackend()
+
+    with pipeline.Notifier(backend, repo="github/repo-name", batch_size=2) as notifier:
+        notifier.put(make_commit("hash-1", False, "user1"))
+        notifier.put(make_commit("hash-2", False, "user2"))
+        notifier.put(make_commit("hash-3", False, "user1"))
+        assert backend.sent.wait(timeout=5)
+
+    assert backend.batches == [{"user1": ["hash-1", "hash-3"]}, {"user2": ["hash-2"]}]
+
+
+def test_notifier_flush_interval():
+    """Test waiting commits are sent once the flush interval has passed."""
+    backend = RecordingBackend()
+
+    with pipeline.Notifier(
+        backend, repo="github/repo-name", flush_interval=0.01
+    ) as notifier:
+        notifier.put(make_commit("hash-1", False, "user1"))
+        assert backend.sent.wait(timeout=5)
+        assert backend.batches == [{"user1": ["hash-1"]}]
+        notifier.put(make_commit("hash-2", False, "user1"))
+
+    assert backend.batches == [{"user1": ["hash-1"]}, {"user1": ["hash-2"]}]
+
+
+def test_notifier_backend_error():
+    """Test a failure to send notifications is raised when the notifier closes."""
+    backend = mock.Mock(side_effect=ValueError("Slack is down"))
+    notifier = pipeline.Notifier(backend, repo="github/repo-name", batch_size=1)
+    notifier.start()
+    notifier.put(make_commit("hash-1", False, "user1"))
+    notifier.put(make_commit("hash-2", False, "user1"))
+
+    with pytest.raises(ValueError, match="Slack is down"):
+        notifier.close()
+
+    backend.assert_called_once()
+    assert notifier.sent == 0
+
+
+def test_fan_out():
+    """Test every batch is delivered to every backend."""
+    first, second = RecordingBackend(), RecordingBackend()
+
+    with pipeline.FanOut({"first": first, "second": second}) as fan_out:
+        fan_out(
+            repo="github/repo-name",
+            grouped_commits={"user1": [make_commit("hash-1", False, "user1")]},
+        )
+
+    assert first.batches == second.batches == [{"user1": ["hash-1"]}]
+    assert [delivery.latencies.count for delivery in fan_out.deliveries] == [1, 1]
+
+
+def test_fan_out_isolates_failures():
+    """Test a slow or failing backend doesn't hold up or fail the other backends."""
+    release = threading.Event()
+    slow = mock.Mock(side_effect=lambda **_: release.wait(timeout=5))
+    failing = mock.Mock(side_effect=ValueError("Slack is down"))
+    working = RecordingBackend()
+    grouped_commits = {"user1": [make_commit("hash-1", False, "user1")]}
+
+    fan_out = pipeline.FanOut(
+        {"slow": slow, "failing": failing, "working": working}, timeout=0.05
+    )
+    fan_out.start()
+    fan_out(repo="github/repo-name", grouped_commits=grouped_commits)
+    assert working.sent.wait(timeout=5)
+
+    assert not fan_out.close()
+    release.set()
+
+    slow_delivery, failing_delivery, working_delivery = fan_out.deliveries
+    assert not slow_delivery.latencies.count
+    assert failing_delivery.failures == 1
+    assert working_delivery.failures == 0
+    assert working.batches == [{"user1": ["hash-1"]}]
+
+
+def test_delivery_bounded_queue():
+    """Test batches are dropped once a backend's queue stays full for the timeout."""
+    delivery = pipeline.Delivery("test", RecordingBackend(), queue_size=1, timeout=0.01)
+
+    delivery.submit(repo="github/repo-name", grouped_commits={})
+    delivery.submit(repo="github/repo-name", grouped_commits={})
+
+    assert delivery.dropped == 1
+
+
+def test_delivery_waits_for_room():
+    """Test a batch submitted to a full queue waits for room instead of dropping."""
+    backend = RecordingBackend()
+    delivery = pipeline.Delivery("test", backend, queue_size=1, timeout=5)
+    delivery.submit(repo="github/repo-name", grouped_commits={})
+
+    submitter = threading.Thread(
+        target=delivery.submit,
+        kwargs={"repo": "github/repo-name", "grouped_commits": {}},
+    )
+    submitter.start()
+    delivery.start()
+    submitter.join(timeout=5)
+
+    assert delivery.close(delivery.clock() + 5)
+    assert backend.batches == [{}, {}]
+    assert delivery.dropped == 0
+
+
+def test_fan_out_logs_failed_delivery(caplog):
+    """Test leaving the fan out logs an error when a backend failed."""
+    failing = mock.Mock(side_effect=ValueError("Slack is down"))
+
+    with pipeline.FanOut({"failing": failing}) as fan_out:
+        fan_out(repo="github/repo-name", grouped_commits={})
+
+    assert "Notifications were not delivered to every backend" in caplog.text
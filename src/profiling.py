@@ -0,0 +1,122 @@
+"""
+Opt-in profiling of a run of the action.
+
+Setting the `PROFILE` environment variable to a comma separated list of `cpu` and
+`memory` profiles the run, writing the profiles to the directory `PROFILE_PATH`
+(`profile` by default, relative to the workspace) to be uploaded as an artifact:
+
+- `cpu.prof` holds `cProfile` statistics of every thread of the run, which can be read
+  with `python -m pstats` or a viewer like snakeviz.
+- `memory.txt` holds the peak memory traced by `tracemalloc` and the largest allocation
+  sites still alive at the end of the run, and `memory.snapshot` the full snapshot,
+  which can be loaded with `tracemalloc.Snapshot.load`.
+
+A summary of each profile is also logged.
+"""
+import contextlib
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+from typing import Iterator, List
+
+LOGGER = logging.getLogger(__name__)
+
+# Kinds of profile that can be selected in `PROFILE`
+PROFILES = ("cpu", "memory")
+# Default directory profiles are written to, relative to the workspace
+DEFAULT_PROFILE_PATH = "profile"
+# Number of functions or allocation sites included in the logged summaries
+SUMMARY_SIZE = 20
+# Number of stack frames recorded for each traced memory allocation
+TRACEMALLOC_FRAMES = 10
+
+
+@contextlib.contextmanager
+def profile() -> Iterator[None]:
+    """Profile the `with` block as selected by the `PROFILE` environment variable."""
+    kinds = [kind.strip() for kind in os.environ.get("PROFILE", "").lower().split(",")]
+    kinds = [kind for kind in kinds if kind]
+    for kind in kinds:
+        if kind not in PROFILES:
+            raise ValueError(f"Unknown profile {kind}")
+    if not kinds:
+        yield
+        return
+
+    directory = os.path.join(
+        os.environ.get("GITHUB_WORKSPACE", ""),
+        os.environ.get("PROFILE_PATH") or DEFAULT_PROFILE_PATH,
+    )
+    os.makedirs(directory, exist_ok=True)
+    with contextlib.ExitStack() as stack:
+        if "memory" in kinds:
+            stack.enter_context(trace_memory(directory))
+        if "cpu" in kinds:
+            stack.enter_context(profile_cpu(directory))
+        yield
+
+
+@contextlib.contextmanager
+def profile_cpu(directory: str) -> Iterator[None]:
+    """
+    Profile the CPU time of the `with` block, including threads started in it, and
+    write the statistics to `cpu.prof` in `directory`.
+
+    Before Python 3.12 a `cProfile.Profile` only sees the thread that enabled it, so
+    each thread started in the block enables its own profile, and the profiles of every
+    thread are merged at the end.
+    """
+    profiles: List[cProfile.Profile] = [cProfile.Profile()]
+    per_thread = sys.version_info < (3, 12)
+
+    def start_thread_profile(*_):
+        sys.setprofile(None)
+        thread_profile = cProfile.Profile()
+        profiles.append(thread_profile)
+        thread_profile.enable()
+
+    if per_thread:
+        threading.setprofile(start_thread_profile)
+    profiles[0].enable()
+    try:
+        yield
+    finally:
+        profiles[0].disable()
+        if per_thread:
+            threading.setprofile(None)  # type: ignore
+
+        path = os.path.join(directory, "cpu.prof")
+        summary = io.StringIO()
+        stats = pstats.Stats(*profiles, stream=summary)
+        stats.dump_stats(path)
+        stats.sort_stats("cumulative").print_stats(SUMMARY_SIZE)
+        LOGGER.info("Wrote CPU profile to %s\n%s", path, summary.getvalue())
+
+
+@contextlib.contextmanager
+def trace_memory(directory: str) -> Iterator[None]:
+    """
+    Trace the memory allocated by the `with` block and write the peak and the largest
+    allocation sites still alive at its end to `memory.txt` in `directory`, and the
+    full snapshot to `memory.snapshot`.
+    """
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        snapshot.dump(os.path.join(directory, "memory.snapshot"))
+        lines = [f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB", ""]
+        lines += [str(stat) for stat in snapshot.statistics("lineno")[:SUMMARY_SIZE]]
+        path = os.path.join(directory, "memory.txt")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+        LOGGER.info("Wrote memory profile to %s\n%s", path, "\n".join(lines))
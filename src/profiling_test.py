@@ -0,0 +1,66 @@
+"""Unit tests for the profiling.py module."""
+import os
+import pstats
+import threading
+import tracemalloc
+from unittest import mock
+
+import pytest  # type: ignore
+
+from . import profiling
+
+
+def busy_thread_work():
+    """A function run on a separate thread while profiling."""
+    return sum(range(1000))
+
+
+def test_profile_disabled(tmp_path):
+    """Test nothing is profiled or written without `PROFILE`."""
+    env = {"PROFILE": "", "GITHUB_WORKSPACE": str(tmp_path)}
+    with mock.patch.dict(os.environ, env):
+        with profiling.profile():
+            pass
+
+    assert not list(tmp_path.iterdir())
+
+
+def test_profile_unknown(tmp_path):
+    """Test an unknown profile fails correctly."""
+    env = {"PROFILE": "cpu,disk", "GITHUB_WORKSPACE": str(tmp_path)}
+    with mock.patch.dict(os.environ, env):
+        with pytest.raises(ValueError):
+            with profiling.profile():
+                pass
+
+
+def test_profile_cpu(tmp_path):
+    """Test the CPU profile includes the work of threads started while profiling."""
+    env = {"PROFILE": "cpu", "GITHUB_WORKSPACE": str(tmp_path)}
+    with mock.patch.dict(os.environ, env):
+        with profiling.profile():
+            thread = threading.Thread(target=busy_thread_work)
+            thread.start()
+            thread.join()
+
+    stats = pstats.Stats(str(tmp_path / profiling.DEFAULT_PROFILE_PATH / "cpu.prof"))
+    functions = [name for _, _, name in stats.stats]  # type: ignore
+    assert "busy_thread_work" in functions
+
+
+def test_profile_memory(tmp_path):
+    """Test the memory profile writes the peak memory and a snapshot."""
+    env = {
+        "PROFILE": "memory",
+        "GITHUB_WORKSPACE": str(tmp_path),
+        "PROFILE_PATH": "memory-profile",
+    }
+    with mock.patch.dict(os.environ, env):
+        with profiling.profile():
+            kept = [bytes(1000) for _ in range(100)]
+
+    directory = tmp_path / "memory-profile"
+    assert (directory / "memory.txt").read_text().startswith("Peak traced memory:")
+    assert tracemalloc.Snapshot.load(str(directory / "memory.snapshot")).traces
+    assert not tracemalloc.is_tracing()
+    assert len(kept) == 100
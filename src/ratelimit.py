@@ -0,0 +1,210 @@
+"""Scheduling of GitHub API requests around GitHub's rate limits."""
+import logging
+import math
+import threading
+import time
+from typing import Callable, Optional
+
+from . import metrics, transport
+
+LOGGER = logging.getLogger(__name__)
+
+# Default number of requests that may be in flight at once while budget is plentiful
+DEFAULT_MAX_CONCURRENCY = 10
+# Remaining request budget below which requests are spaced out and concurrency shrinks
+DEFAULT_LOW_BUDGET = 100
+# Delay in seconds after a secondary rate limit response without a `Retry-After`
+SECONDARY_LIMIT_DELAY = 60.0
+# Delay in seconds after an exhausted primary rate limit that should already have
+# reset, when the local clock is ahead of GitHub's
+RESET_SKEW_DELAY = 1.0
+
+
+def wait_for_event(delay: float, event: threading.Event) -> bool:
+    """Block for `delay` seconds or until `event` is set, `True` if it was set."""
+    return event.wait(delay)
+
+
+class RateLimiter:  # pylint: disable=too-many-instance-attributes
+    """
+    Schedule requests to the GitHub API so they stay within its rate limits.
+
+    The remaining request budget is tracked from the `X-RateLimit-*` headers of each
+    response. While the budget is plentiful up to `max_concurrency` requests may be in
+    flight at once. Once fewer than `low_budget` requests remain, concurrency shrinks
+    in proportion and requests are spaced evenly over the time left until the budget
+    resets, after which concurrency grows back to `max_concurrency`.
+
+    Responses that hit the primary or secondary rate limit pause all requests until
+    GitHub says they may be retried.
+
+    A single `RateLimiter` is safe to share between threads and between several
+    `GitHubApiClient` instances that use the same credentials. Waits for the rate limit
+    go through `wait(delay, event)`, which returns early once `event` is set.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        low_budget: int = DEFAULT_LOW_BUDGET,
+        clock: Callable[[], float] = time.time,
+        wait: Callable[[float, threading.Event], bool] = wait_for_event,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.low_budget = max(1, low_budget)
+        self.clock = clock
+        self.wait = wait
+
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at = 0.0
+        self.blocked_until = 0.0
+        self.next_request_at = 0.0
+        self.in_flight = 0
+        self.throttled = 0.0
+
+        self._condition = threading.Condition()
+
+    @property
+    def concurrency(self) -> int:
+        """The number of requests currently allowed to be in flight at once."""
+        if self.remaining is None or self.remaining >= self.low_budget:
+            return self.max_concurrency
+        share = self.max_concurrency * self.remaining / self.low_budget
+        return max(1, math.ceil(share))
+
+    @property
+    def budget(self) -> float:
+        """
+        The requests left in the current rate limit window less those in flight, or
+        infinity while the budget is unknown.
+        """
+        with self._condition:
+            self._refresh(self.clock())
+            if self.remaining is None:
+                return math.inf
+            return self.remaining - self.in_flight
+
+    @property
+    def paused(self) -> bool:
+        """`True` while requests are paused by a rate limit response."""
+        return self.blocked_until > self.clock()
+
+    def acquire(self, cancelled: Optional[threading.Event] = None) -> bool:
+        """
+        Block until another request may be sent to the GitHub API.
+
+        Setting `cancelled` interrupts the wait for the rate limit, in which case no
+        request is started and `False` is returned.
+        """
+        if cancelled is None:
+            cancelled = threading.Event()
+        while True:
+            if cancelled.is_set():
+                return False
+            with self._condition:
+                now = self.clock()
+                self._refresh(now)
+
+                delay = max(self.blocked_until, self.next_request_at) - now
+                if delay <= 0:
+                    if self.in_flight >= self.concurrency:
+                        self._condition.wait()
+                        continue
+
+                    self.in_flight += 1
+                    self.next_request_at = now + self._interval(now)
+                    return True
+
+            self._throttle(delay, cancelled)
+
+    def release(self, response: Optional[transport.Response]) -> bool:
+        """
+        Record the outcome of a request started with `acquire`.
+
+        `response` is the response to the request, or `None` if it failed without one.
+
+        Returns `True` if the response was rejected by a rate limit, in which case the
+        request should be retried once `acquire` returns again.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            limited = False
+            if response is not None:
+                limited = self._update(response, self.clock())
+            self._condition.notify_all()
+            return limited
+
+    def _update(self, response: transport.Response, now: float) -> bool:
+        """Update the tracked budget from `response`, `True` if it was rate limited."""
+        headers = response.headers
+        remaining = parse_int_header(headers.get("X-RateLimit-Remaining"))
+        if remaining is not None:
+            self.remaining = remaining
+            self.limit = parse_int_header(headers.get("X-RateLimit-Limit"))
+            self.reset_at = float(
+                parse_int_header(headers.get("X-RateLimit-Reset")) or 0
+            )
+
+        if response.status_code not in (403, 429):
+            return False
+
+        retry_after = parse_int_header(headers.get("Retry-After"))
+        if retry_after is not None:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+        elif remaining == 0:
+            reset_at = max(self.reset_at, now + RESET_SKEW_DELAY)
+            self.blocked_until = max(self.blocked_until, reset_at)
+        elif "rate limit" in (response.text or "").lower():
+            self.blocked_until = max(self.blocked_until, now + SECONDARY_LIMIT_DELAY)
+        else:
+            return False
+
+        LOGGER.warning(
+            "GitHub API rate limit hit, pausing requests for %.1fs",
+            self.blocked_until - now,
+        )
+        return True
+
+    def _refresh(self, now: float):
+        """Forget the tracked budget once the rate limit window has reset."""
+        if self.reset_at and now >= self.reset_at:
+            LOGGER.debug("GitHub API rate limit has reset")
+            self.remaining = None
+            self.reset_at = 0.0
+            self._condition.notify_all()
+
+    def _interval(self, now: float) -> float:
+        """Get the delay needed between requests to stretch the remaining budget."""
+        if self.remaining is None or self.remaining >= self.low_budget:
+            return 0.0
+        window = max(0.0, self.reset_at - now)
+        if self.remaining <= 0:
+            return window
+        return window / self.remaining
+
+    def _throttle(self, delay: float, cancelled: threading.Event):
+        """
+        Wait `delay` seconds for the rate limit, or until `cancelled` is set, recording
+        the time spent waiting.
+        """
+        with self._condition:
+            self.throttled += delay
+            total = self.throttled
+        metrics.METRICS.increment("github.throttled")
+        metrics.METRICS.increment("github.throttled_seconds", delay)
+        LOGGER.info(
+            "Throttling GitHub API requests for %.1fs (%.1fs in total)", delay, total
+        )
+        self.wait(delay, cancelled)
+
+
+def parse_int_header(value: Optional[str]) -> Optional[int]:
+    """Parse an integer header value, `None` if it is missing or not an integer."""
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
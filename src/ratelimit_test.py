@@ -0,0 +1,228 @@
+"""Unit tests for the ratelimit.py module."""
+import threading
+from typing import List
+from unittest import mock
+
+import pytest  # type: ignore
+
+from . import ratelimit
+
+
+class FakeClock:
+    """A controllable clock, waiting advances the time instead of blocking."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+        self.waits: List[float] = []
+
+    def time(self) -> float:
+        """Get the current fake time."""
+        return self.now
+
+    def wait(self, delay: float, event: threading.Event) -> bool:
+        """Advance the fake time by `delay` seconds."""
+        self.waits.append(delay)
+        self.now += delay
+        return event.is_set()
+
+
+def make_limiter(clock: FakeClock, **kwargs) -> ratelimit.RateLimiter:
+    """Create a `RateLimiter` driven by `clock`."""
+    return ratelimit.RateLimiter(clock=clock.time, wait=clock.wait, **kwargs)
+
+
+def make_response(status_code=200, text="", **headers):
+    """Create a mock response with the given status code and headers."""
+    return mock.MagicMock(status_code=status_code, text=text, headers=headers)
+
+
+def budget_response(remaining: int, reset: float, limit: int = 5000):
+    """Create a mock okay response carrying rate limit headers."""
+    return make_response(
+        **{
+            "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(int(reset)),
+        }
+    )
+
+
+def test_rate_limiter_plentiful_budget():
+    """Test requests are not delayed while the budget is plentiful."""
+    clock = FakeClock()
+    limiter = make_limiter(clock, max_concurrency=4)
+
+    for _ in range(10):
+        limiter.acquire()
+        assert not limiter.release(budget_response(4000, clock.now + 3600))
+
+    assert not clock.waits
+    assert limiter.concurrency == 4
+    assert limiter.in_flight == 0
+
+
+def test_rate_limiter_spaces_requests_on_low_budget():
+    """Test requests are spread over the reset window once the budget is low."""
+    clock = FakeClock()
+    limiter = make_limiter(clock, low_budget=100)
+
+    limiter.acquire()
+    limiter.release(budget_response(10, clock.now + 100))
+    limiter.acquire()
+    limiter.release(None)
+    limiter.acquire()
+    limiter.release(None)
+
+    assert clock.waits == [pytest.approx(10.0)]
+    assert limiter.throttled == pytest.approx(10.0)
+
+
+@pytest.mark.parametrize(
+    "remaining, expected", [(None, 8), (500, 8), (100, 8), (50, 4), (10, 1), (0, 1)]
+)
+def test_rate_limiter_concurrency_shrinks(remaining, expected):
+    """Test the allowed concurrency shrinks as the remaining budget runs low."""
+    limiter = ratelimit.RateLimiter(max_concurrency=8, low_budget=100)
+    limiter.remaining = remaining
+    assert limiter.concurrency == expected
+
+
+def test_rate_limiter_concurrency_grows_after_reset():
+    """Test the allowed concurrency grows again once the budget resets."""
+    clock = FakeClock()
+    limiter = make_limiter(clock, max_concurrency=8, low_budget=100)
+
+    limiter.acquire()
+    limiter.release(budget_response(10, clock.now + 60))
+    assert limiter.concurrency == 1
+
+    clock.now += 61
+    limiter.acquire()
+    limiter.release(None)
+    assert limiter.concurrency == 8
+
+
+def test_rate_limiter_retry_after():
+    """Test a secondary rate limit with `Retry-After` pauses the next request."""
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+
+    limiter.acquire()
+    assert limiter.release(make_response(403, **{"Retry-After": "30"}))
+    limiter.acquire()
+    limiter.release(None)
+
+    assert clock.waits == [30.0]
+
+
+def test_rate_limiter_primary_limit_exhausted():
+    """Test an exhausted primary rate limit pauses requests until it resets."""
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+
+    limiter.acquire()
+    response = make_response(
+        403,
+        **{"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(int(clock.now + 90))},
+    )
+    assert limiter.release(response)
+    limiter.acquire()
+    limiter.release(None)
+
+    assert sum(clock.waits) == pytest.approx(90.0)
+
+
+def test_rate_limiter_secondary_limit_without_retry_after():
+    """
+    Test a secondary rate limit without `Retry-After` pauses requests for the default
+    delay.
+    """
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+
+    limiter.acquire()
+    response = make_response(
+        403, text='{"message": "You have exceeded a secondary rate limit"}'
+    )
+    assert limiter.release(response)
+    limiter.acquire()
+    limiter.release(None)
+
+    assert clock.waits == [ratelimit.SECONDARY_LIMIT_DELAY]
+
+
+def test_rate_limiter_forbidden_not_rate_limited():
+    """Test a 403 response unrelated to rate limits is not treated as one."""
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+
+    limiter.acquire()
+    assert not limiter.release(make_response(403, text="Resource not accessible"))
+    assert limiter.blocked_until == 0.0
+
+
+@pytest.mark.parametrize(
+    "value, expected", [(None, None), ("42", 42), ("", None), ("soon", None)]
+)
+def test_parse_int_header(value, expected):
+    """Test parse_int_header parses integer headers and ignores invalid ones."""
+    assert ratelimit.parse_int_header(value) == expected
+
+
+def test_rate_limiter_primary_limit_reset_skew():
+    """
+    Test an exhausted primary rate limit that should already have reset pauses
+    requests briefly, rather than being mistaken for a secondary rate limit.
+    """
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+
+    limiter.acquire()
+    response = make_response(
+        403,
+        text='{"message": "API rate limit exceeded"}',
+        **{"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(int(clock.now - 1))},
+    )
+    assert limiter.release(response)
+    limiter.acquire()
+    limiter.release(None)
+
+    assert clock.waits == [ratelimit.RESET_SKEW_DELAY]
+
+
+def test_rate_limiter_budget_and_paused():
+    """Test the budget left and the pause are reported for choosing a credential."""
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    assert limiter.budget == float("inf")
+    assert not limiter.paused
+
+    limiter.acquire()
+    limiter.acquire()
+    assert limiter.budget == float("inf")
+    limiter.release(budget_response(remaining=500, reset=clock.now + 60))
+    assert limiter.budget == 499
+
+    limiter.release(make_response(429, **{"Retry-After": "30"}))
+    assert limiter.paused
+    clock.now += 61
+    assert limiter.budget == float("inf")
+    assert not limiter.paused
+
+
+def test_rate_limiter_acquire_cancelled():
+    """Test cancelling interrupts the wait for a rate limit without a request."""
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    limiter.acquire()
+    limiter.release(make_response(429, **{"Retry-After": "600"}))
+
+    def cancel_while_waiting(delay: float, event: threading.Event) -> bool:
+        clock.wait(delay / 2, event)
+        event.set()
+        return True
+
+    limiter.wait = cancel_while_waiting
+    assert not limiter.acquire(threading.Event())
+    assert limiter.in_flight == 0
+    assert clock.waits == [300.0]
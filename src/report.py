@@ -0,0 +1,76 @@
+"""
+Report the unverified commits recorded in the audit index.
+
+Audits and scans with `AUDIT_INDEX_PATH` set record every commit they see in the index,
+so the unverified commits of a repository, or of every audited repository, can be
+listed by author from the index alone, without calling the GitHub API.
+"""
+import json
+import logging
+import os
+import sys
+from typing import IO, Optional
+
+from . import action, audit, auditindex, metrics, profiling
+
+LOGGER = logging.getLogger("verified_commits_check.report")
+
+
+def main() -> int:
+    """
+    Report the unverified commits in the audit index, of `REPORT_REPO` and by
+    `REPORT_AUTHOR` when they are set.
+
+    Returns 1 if the index holds any such unverified commits, 0 otherwise.
+    """
+    index = auditindex.open_index()
+    if index is None:
+        LOGGER.error("Environment variable AUDIT_INDEX_PATH must be set")
+        return 1
+
+    repo = os.environ.get("REPORT_REPO") or None
+    with index, audit.open_report(
+        os.environ.get("AUDIT_REPORT_PATH"), resume=False
+    ) as report:
+        authors = report_index(
+            index, repo=repo, author=os.environ.get("REPORT_AUTHOR"), report=report
+        )
+
+    LOGGER.info(
+        "Audit index holds %s unverified commits in %s",
+        sum(authors.values()),
+        repo or "every repository",
+    )
+    for author, count in authors.items():
+        LOGGER.info("\t%s: %s unverified commits", author, count)
+    metrics.report("Verified commits index report")
+    return 1 if authors else 0
+
+
+def report_index(
+    index: auditindex.AuditIndex,
+    *,
+    repo: Optional[str] = None,
+    author: Optional[str] = None,
+    report: Optional[IO[str]] = None,
+) -> dict:
+    """
+    Count the unverified commits in `index` by author, of `repo` and by `author` when
+    they are given, writing each of them to `report` as a line of JSON.
+    """
+    with metrics.METRICS.phase("query"):
+        authors = index.unverified_authors(repo)
+        if author:
+            authors = {author: authors[author]} if author in authors else {}
+        if report:
+            for commit_repo, commit in index.unverified_commits(repo, author=author):
+                report.write(
+                    json.dumps(audit.commit_report(commit_repo, commit)) + "\n"
+                )
+    return authors
+
+
+if __name__ == "__main__":
+    action.configure_logging()
+    with profiling.profile():
+        sys.exit(main())
@@ -0,0 +1,63 @@
+"""Unit tests for the report.py module."""
+import io
+import json
+import os
+from unittest import mock
+
+from . import auditindex, github, report
+from .conftest import make_commit
+
+
+def make_index(path):
+    """Build an audit index with commits of two authors."""
+    with auditindex.AuditIndex(str(path)) as index:
+        index.put_many(
+            "github/repo-name",
+            [
+                make_commit("hash-1", False),
+                make_commit("hash-2", True),
+                make_commit("hash-3", False, author="user2"),
+            ],
+        )
+
+
+def test_report_index_author(tmp_path):
+    """Test the report can be limited to the unverified commits of one author."""
+    make_index(tmp_path / "index.db")
+    output = io.StringIO()
+
+    with auditindex.AuditIndex(str(tmp_path / "index.db")) as index:
+        authors = report.report_index(index, author="user2", report=output)
+
+    assert authors == {"user2": 1}
+    assert [json.loads(line)["sha"] for line in output.getvalue().splitlines()] == [
+        "hash-3"
+    ]
+
+
+def test_main(tmp_path):
+    """Test the index report lists unverified commits without calling the API."""
+    make_index(tmp_path / "index.db")
+    env = {
+        "AUDIT_INDEX_PATH": str(tmp_path / "index.db"),
+        "AUDIT_REPORT_PATH": str(tmp_path / "report.jsonl"),
+        "REPORT_REPO": "github/repo-name",
+    }
+
+    with mock.patch.dict(os.environ, env):
+        assert report.main() == 1
+
+    lines = (tmp_path / "report.jsonl").read_text().splitlines()
+    assert json.loads(lines[0]) == {
+        "repo": "github/repo-name",
+        "sha": "hash-1",
+        "author": "user1",
+        "html_url": github.commit_html_url("github/repo-name", "hash-1"),
+    }
+    assert len(lines) == 2
+
+
+def test_main_no_index():
+    """Test the report fails without an audit index to read."""
+    with mock.patch.dict(os.environ, {"AUDIT_INDEX_PATH": ""}):
+        assert report.main() == 1
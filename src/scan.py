@@ -0,0 +1,234 @@
+"""
+Audit every repository of a GitHub organisation or user in one run.
+
+The repositories of `SCAN_OWNER` are listed a page at a time and each is audited as
+soon as it is listed, by a bounded pool of worker threads. The workers share a single
+`GitHubApiClient`, and so a single connection pool and rate limit budget, so the scan
+runs as fast as the API allows rather than one repository after another.
+
+With an audit index (`AUDIT_INDEX_PATH`) each repository's default branch is only
+audited from its high-water mark, so a scheduled scan only visits new commits.
+"""
+import contextlib
+import io
+import logging
+import os
+import sys
+from concurrent import futures
+from typing import IO, Iterable, List, Optional, Set
+
+from . import action, audit, auditindex, github, metrics, profiling
+
+LOGGER = logging.getLogger("verified_commits_check.scan")
+
+# Default number of repositories audited at the same time
+DEFAULT_CONCURRENCY = 4
+
+
+class ScanResult:  # pylint: disable=too-few-public-methods
+    """
+    The outcome of auditing one repository of a scan.
+
+    `checkpoint` holds the audit's results, or `error` describes why the repository
+    could not be audited. `report` holds the repository's JSON lines report entries.
+    """
+
+    def __init__(
+        self,
+        *,
+        repo: str,
+        checkpoint: Optional[audit.AuditCheckpoint] = None,
+        error: Optional[str] = None,
+        report: str = "",
+    ):
+        self.repo = repo
+        self.checkpoint = checkpoint
+        self.error = error
+        self.report = report
+
+    @property
+    def failed(self) -> bool:
+        """`True` if the repository has unverified commits or could not be audited."""
+        return bool(self.error or (self.checkpoint and self.checkpoint.unverified))
+
+
+def main() -> int:
+    """
+    Audit the repositories of the organisation or user configured in the environment.
+
+    Returns 1 if any unverified commits were found or any repository could not be
+    audited, 0 otherwise.
+    """
+    try:
+        github_token = os.environ["GITHUB_TOKEN"]
+        owner = os.environ.get("SCAN_OWNER") or os.environ["GITHUB_REPOSITORY_OWNER"]
+    except KeyError as ex:
+        LOGGER.error("Environment variable %s must be set", ex)
+        raise ex
+
+    concurrency = action.env_int("SCAN_CONCURRENCY", DEFAULT_CONCURRENCY)
+    response_cache = action.load_response_cache()
+    client = github.GitHubApiClient(
+        github_token, pool_size=concurrency, response_cache=response_cache
+    )
+
+    index = auditindex.open_index()
+    with contextlib.ExitStack() as stack:
+        if index:
+            stack.enter_context(index)
+        report = stack.enter_context(
+            audit.open_report(os.environ.get("SCAN_REPORT_PATH"), resume=False)
+        )
+        results = scan(
+            client,
+            client.list_repositories(owner=owner),
+            concurrency=concurrency,
+            since=os.environ.get("AUDIT_SINCE"),
+            until=os.environ.get("AUDIT_UNTIL"),
+            report=report,
+            index=index,
+        )
+
+    if response_cache:
+        response_cache.save()
+    log_summary(owner, results)
+    metrics.report("Verified commits scan")
+    return 1 if any(result.failed for result in results) else 0
+
+
+def scan(  # pylint: disable=too-many-arguments
+    client: github.GitHubApiClient,
+    repositories: Iterable[dict],
+    *,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    report: Optional[IO[str]] = None,
+    index: Optional[auditindex.AuditIndex] = None,
+) -> List[ScanResult]:
+    """
+    Audit the default branch of each of `repositories`, as returned by
+    `GitHubApiClient.list_repositories`, with up to `concurrency` audits at a time.
+
+    Only a few repositories per worker are queued at once, so audits start while
+    `repositories` is still being listed. The report entries of each repository are
+    written to `report` together once its audit is done. Every audit records its
+    commits in, and starts from the high-water marks of, the shared `index`.
+    """
+    results: List[ScanResult] = []
+    listed = 0
+
+    def collect(done: Iterable[futures.Future]):
+        for future in done:
+            result = future.result()
+            results.append(result)
+            if report and result.report:
+                report.write(result.report)
+                report.flush()
+            log_progress(results, listed)
+
+    with futures.ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="scan"
+    ) as executor:
+        pending: Set[futures.Future] = set()
+        for repository in repositories:
+            if not repository.get("size"):
+                LOGGER.debug("Skipping empty repository %s", repository["full_name"])
+                continue
+
+            listed += 1
+            pending.add(
+                executor.submit(
+                    scan_repository,
+                    client,
+                    repository,
+                    since=since,
+                    until=until,
+                    index=index,
+                )
+            )
+            if len(pending) >= concurrency * 2:
+                done, pending = futures.wait(
+                    pending, return_when=futures.FIRST_COMPLETED
+                )
+                collect(done)
+
+        collect(futures.as_completed(pending))
+
+    return sorted(results, key=lambda result: result.repo)
+
+
+def scan_repository(
+    client: github.GitHubApiClient,
+    repository: dict,
+    *,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    index: Optional[auditindex.AuditIndex] = None,
+) -> ScanResult:
+    """
+    Audit the default branch of a single repository in a scan worker thread.
+
+    Errors are recorded in the result rather than raised, so one repository that
+    can't be audited doesn't stop the rest of the scan.
+    """
+    repo = repository["full_name"]
+    report = io.StringIO()
+    try:
+        checkpoint = audit.start_audit(
+            client,
+            repo=repo,
+            ref=repository.get("default_branch"),
+            since=since,
+            until=until,
+            index=index,
+        )
+        audit.audit(
+            client, checkpoint, since=since, until=until, report=report, index=index
+        )
+    except Exception as ex:  # pylint: disable=broad-except
+        LOGGER.warning("Unable to audit %s: %s", repo, ex)
+        return ScanResult(repo=repo, error=str(ex))
+
+    return ScanResult(repo=repo, checkpoint=checkpoint, report=report.getvalue())
+
+
+def log_progress(results: List[ScanResult], listed: int):
+    """Log the progress of a scan after another repository is done."""
+    checkpoints = [result.checkpoint for result in results if result.checkpoint]
+    scanned = sum(checkpoint.scanned for checkpoint in checkpoints)
+    unverified = sum(checkpoint.unverified for checkpoint in checkpoints)
+    LOGGER.info(
+        "Scanned %s/%s repositories: %s commits, %s unverified",
+        len(results),
+        listed,
+        scanned,
+        unverified,
+    )
+
+
+def log_summary(owner: str, results: List[ScanResult]):
+    """Log the combined results of a scan."""
+    failed = [result for result in results if result.failed]
+    LOGGER.info(
+        "Scanned %s repositories of %s, %s with unverified commits or errors",
+        len(results),
+        owner,
+        len(failed),
+    )
+    for result in failed:
+        if result.error:
+            LOGGER.info("\t%s: error: %s", result.repo, result.error)
+        elif result.checkpoint:
+            LOGGER.info(
+                "\t%s: %s of %s commits unverified",
+                result.repo,
+                result.checkpoint.unverified,
+                result.checkpoint.scanned,
+            )
+
+
+if __name__ == "__main__":
+    action.configure_logging()
+    with profiling.profile():
+        sys.exit(main())
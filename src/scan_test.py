@@ -0,0 +1,131 @@
+"""Unit tests for the scan.py module."""
+import io
+import json
+import os
+import threading
+import time
+from unittest import mock
+
+import pytest  # type: ignore
+
+from . import scan
+from .conftest import make_commit
+
+
+def make_repository(name, size=1):
+    """Build a repository as listed by `GitHubApiClient.list_repositories`."""
+    return {"full_name": f"github/{name}", "default_branch": "main", "size": size}
+
+
+@pytest.fixture(name="client")
+def fixture_client():
+    """
+    A mock GitHub API client whose repositories each have one verified commit and,
+    for `github/unverified`, one unverified commit.
+    """
+    client = mock.MagicMock()
+    client.get_commit.side_effect = lambda repo, sha: make_commit(
+        "head", True, repo=repo
+    )
+
+    def list_commits(repo, **_):
+        commits = [make_commit("hash-1", True, repo=repo)]
+        if repo == "github/unverified":
+            commits.append(make_commit("hash-2", False, repo=repo))
+        yield commits, None
+
+    client.list_commits.side_effect = list_commits
+    return client
+
+
+def test_scan(client):
+    """Test scan audits every repository and combines the reports."""
+    repositories = [
+        make_repository("verified"),
+        make_repository("unverified"),
+        make_repository("empty", size=0),
+    ]
+    report = io.StringIO()
+
+    results = scan.scan(client, repositories, concurrency=2, report=report)
+
+    assert [result.repo for result in results] == [
+        "github/unverified",
+        "github/verified",
+    ]
+    assert [result.failed for result in results] == [True, False]
+    entries = [json.loads(line) for line in report.getvalue().splitlines()]
+    assert entries == [
+        {
+            "repo": "github/unverified",
+            "sha": "hash-2",
+            "author": "user1",
+            "html_url": "https://github.com/github/unverified/commit/hash-2",
+        }
+    ]
+
+
+def test_scan_error(client):
+    """Test a repository that can't be audited doesn't stop the scan."""
+    client.get_commit.side_effect = [
+        ValueError("Git Repository is empty"),
+        make_commit("head", True, repo="github/verified"),
+    ]
+
+    results = scan.scan(
+        client,
+        [make_repository("broken"), make_repository("verified")],
+        concurrency=1,
+    )
+
+    assert results[0].repo == "github/broken"
+    assert results[0].error == "Git Repository is empty"
+    assert results[0].failed
+    assert results[1].checkpoint.scanned == 1
+
+
+def test_scan_bounded_concurrency(client):
+    """Test no more than `concurrency` repositories are audited at once."""
+    lock = threading.Lock()
+    active = [0, 0]
+
+    def list_commits(repo, **_):
+        with lock:
+            active[0] += 1
+            active[1] = max(active)
+        time.sleep(0.01)
+        with lock:
+            active[0] -= 1
+        yield [make_commit("hash-1", True, repo=repo)], None
+
+    client.list_commits.side_effect = list_commits
+    repositories = (make_repository(f"repo-{i}") for i in range(20))
+
+    results = scan.scan(client, repositories, concurrency=3)
+
+    assert len(results) == 20
+    assert 1 < active[1] <= 3
+
+
+@mock.patch("src.scan.github")
+def test_main(mock_github, client, tmp_path):
+    """Test the scan end-to-end with settings from the environment."""
+    mock_github.GitHubApiClient.return_value = client
+    client.list_repositories.return_value = iter(
+        [make_repository("verified"), make_repository("unverified")]
+    )
+    env = {
+        "GITHUB_TOKEN": "github-test-token",
+        "GITHUB_REPOSITORY_OWNER": "github",
+        "SCAN_CONCURRENCY": "2",
+        "SCAN_REPORT_PATH": str(tmp_path / "report.jsonl"),
+    }
+
+    with mock.patch.dict(os.environ, env):
+        assert scan.main() == 1
+
+    mock_github.GitHubApiClient.assert_called_once_with(
+        "github-test-token", pool_size=2, response_cache=None
+    )
+    client.list_repositories.assert_called_once_with(owner="github")
+    assert len((tmp_path / "report.jsonl").read_text().splitlines()) == 1
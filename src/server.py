@@ -0,0 +1,370 @@
+"""
+Verified Commits Check webhook service.
+
+Instead of starting a container for every push, the service accepts GitHub `push`
+webhooks directly and checks them in a long running process. Each webhook's signature
+is verified with the `WEBHOOK_SECRET` shared with GitHub, and the event is queued for a
+pool of worker threads. Every check shares one `GitHubApiClient`, so kept-alive
+connections, the rate limit budget, the verification cache and the GitHub API response
+cache stay warm between events.
+"""
+import collections
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from http import server
+from typing import Callable, Optional, Tuple
+
+from . import action, cache, github, httpcache, metrics, profiling
+
+LOGGER = logging.getLogger(__name__)
+
+# Default port the service listens on
+DEFAULT_PORT = 8080
+# Default number of events checked at the same time
+DEFAULT_WORKERS = 4
+# Default number of events waiting to be checked before new events are turned away
+DEFAULT_QUEUE_SIZE = 100
+# Default number of recent delivery IDs remembered to ignore redelivered events
+DEFAULT_DELIVERY_HISTORY = 10000
+# Default number of seconds to finish the queued events in when shutting down
+DEFAULT_SHUTDOWN_TIMEOUT = 30
+# Largest webhook payload accepted, GitHub caps payloads at 25 MB
+MAX_PAYLOAD_SIZE = 25 * 1024 * 1024
+# Seconds a sender is asked to wait before retrying when the queue is full
+RETRY_AFTER = 30
+
+# A queued event's delivery ID and payload
+QueuedEvent = Tuple[str, dict]
+
+
+class WebhookServer(server.ThreadingHTTPServer):
+    """
+    An HTTP server accepting GitHub webhooks and passing `push` events to `process`.
+
+    Accepted events are queued and processed by `workers` background threads. When
+    `queue_size` events are already waiting new events are refused with a `503`, so a
+    burst of pushes cannot exhaust the service's memory, and GitHub's delivery log
+    shows which deliveries to redeliver. The last `delivery_history` delivery IDs are
+    remembered, and redelivered events are acknowledged without being checked again.
+
+    `close` stops accepting events and waits for the queued events to be processed.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    daemon_threads = True
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        address: Tuple[str, int],
+        *,
+        secret: str,
+        process: Callable[[dict], None],
+        workers: int = DEFAULT_WORKERS,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        delivery_history: int = DEFAULT_DELIVERY_HISTORY,
+    ):
+        super().__init__(address, Handler)
+        self.secret = secret.encode()
+        self.process = process
+        self.delivery_history = max(1, delivery_history)
+        self.processed = 0
+        self.failed = 0
+
+        self._queue: "queue.Queue[Optional[QueuedEvent]]"
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._deliveries: "collections.OrderedDict[str, None]"
+        self._deliveries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._closing = False
+        self._workers = [
+            threading.Thread(target=self._work, name=f"webhook-{index}", daemon=True)
+            for index in range(max(1, workers))
+        ]
+
+    def start(self, poll_interval: float = 0.5):
+        """
+        Start the worker threads and serve requests on a background thread, checking
+        for `close` every `poll_interval` seconds.
+        """
+        for worker in self._workers:
+            worker.start()
+        threading.Thread(
+            target=self.serve_forever,
+            kwargs={"poll_interval": poll_interval},
+            name="webhook-server",
+            daemon=True,
+        ).start()
+
+    def submit(self, delivery: str, payload: dict) -> Tuple[int, str]:
+        """
+        Queue the `push` event `payload` of the webhook `delivery`.
+
+        Returns the HTTP status code and message to reply to the webhook with.
+        """
+        with self._lock:
+            if self._closing:
+                return 503, "shutting down"
+            if delivery and delivery in self._deliveries:
+                self._deliveries.move_to_end(delivery)
+                metrics.METRICS.increment("server.duplicates")
+                return 200, "duplicate delivery"
+            try:
+                self._queue.put_nowait((delivery, payload))
+            except queue.Full:
+                metrics.METRICS.increment("server.rejected")
+                return 503, "queue full"
+            if delivery:
+                self._deliveries[delivery] = None
+                while len(self._deliveries) > self.delivery_history:
+                    self._deliveries.popitem(last=False)
+        metrics.METRICS.increment("server.queued")
+        return 202, "queued"
+
+    def close(self, timeout: float = DEFAULT_SHUTDOWN_TIMEOUT) -> bool:
+        """
+        Stop accepting webhooks and wait up to `timeout` seconds for the queued events
+        to be processed.
+
+        Returns `False` if they were not all processed in time.
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self._closing = True
+        self.shutdown()
+        self.server_close()
+
+        for _ in self._workers:
+            try:
+                self._queue.put(None, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+        for worker in self._workers:
+            worker.join(timeout=max(0.0, deadline - time.monotonic()))
+        if any(worker.is_alive() for worker in self._workers):
+            LOGGER.error("Timed out processing %s queued events", self._queue.qsize())
+            return False
+        return True
+
+    def _work(self):
+        """Process queued events until the server is closed."""
+        for delivery, payload in iter(self._queue.get, None):
+            try:
+                with metrics.METRICS.timer("server.event"):
+                    self.process(payload)
+            except Exception as ex:  # pylint: disable=broad-except
+                LOGGER.error("Unable to check delivery %s: %s", delivery, ex)
+                metrics.METRICS.increment("server.failed")
+                with self._lock:
+                    self.failed += 1
+                    # Let a redelivery of a failed event be checked again
+                    self._deliveries.pop(delivery, None)
+                continue
+            with self._lock:
+                self.processed += 1
+
+
+class Handler(server.BaseHTTPRequestHandler):
+    """Verify and queue a GitHub webhook."""
+
+    protocol_version = "HTTP/1.1"
+    server: WebhookServer
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Answer health checks."""
+        self.reply(200, "ok")
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handle a webhook delivery."""
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_PAYLOAD_SIZE:
+            self.close_connection = True
+            self.reply(413, "payload too large")
+            return
+        body = self.rfile.read(length)
+
+        signature = self.headers.get("X-Hub-Signature-256")
+        if not verify_signature(self.server.secret, body, signature):
+            metrics.METRICS.increment("server.bad_signatures")
+            self.reply(401, "invalid signature")
+            return
+
+        event_name = self.headers.get("X-GitHub-Event", "")
+        delivery = self.headers.get("X-GitHub-Delivery", "")
+        if event_name != "push":
+            self.reply(202, f"ignored {event_name} event")
+            return
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self.reply(400, "invalid JSON payload")
+            return
+
+        status, message = self.server.submit(delivery, payload)
+        LOGGER.debug("Delivery %s: %s", delivery, message)
+        self.reply(status, message)
+
+    def reply(self, status: int, message: str):
+        """Send a JSON response with a `message`."""
+        content = json.dumps({"message": message}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        if status == 503:
+            self.send_header("Retry-After", str(RETRY_AFTER))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Log requests at debug level instead of writing them to stderr."""
+        LOGGER.debug("%s - %s", self.address_string(), format % args)
+
+
+class PushChecker:  # pylint: disable=too-few-public-methods
+    """
+    Check the commits of push events, sharing one GitHub API client, verification
+    cache and message backend between every event.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        github_client: github.GitHubApiClient,
+        *,
+        backend: Callable[..., None],
+        concurrency: int = 1,
+        lookup: str = "rest",
+        verification_cache: Optional[cache.VerificationCache] = None,
+        new_only: bool = False,
+    ):
+        if lookup == "local":
+            raise ValueError("The webhook service cannot use the local lookup backend")
+        self.github_client = github_client
+        self.backend = backend
+        self.concurrency = concurrency
+        self.lookup = lookup
+        self.verification_cache = verification_cache
+        self.new_only = new_only
+
+    def __call__(self, event: dict):
+        """Check the commits of the push `event` and send messages for them."""
+        repo = event["repository"]["full_name"]
+        commit_range, lookup = action.select_commit_range(
+            event, lookup=self.lookup, new_only=self.new_only
+        )
+        repeated = set()
+        if self.new_only:
+            repeated = action.get_repeated_commits_from_event(event)
+        commits = [
+            commit
+            for commit in action.iter_unverified_commits(
+                token=self.github_client.token,
+                repo=repo,
+                commit_hashes=action.get_commits_from_event(
+                    event, new_only=self.new_only
+                ),
+                concurrency=self.concurrency,
+                lookup=lookup,
+                commit_range=commit_range,
+                verification_cache=self.verification_cache,
+                github_client=self.github_client,
+            )
+            if commit.sha not in repeated
+        ]
+        LOGGER.info("Found %s unverified commits pushed to %s", len(commits), repo)
+        if commits:
+            self.backend(repo=repo, grouped_commits=action.group_by_author(commits))
+
+
+def verify_signature(secret: bytes, body: bytes, signature: Optional[str]) -> bool:
+    """
+    Check `signature`, a webhook's `X-Hub-Signature-256` header, is the HMAC of its
+    `body` with `secret`.
+    """
+    if not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret, body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature[len("sha256=") :], expected)
+
+
+def main() -> int:
+    """
+    Run the webhook service until it receives `SIGTERM` or `SIGINT`.
+
+    Returns 1 if the queued events could not all be processed before shutting down,
+    0 otherwise.
+    """
+    try:
+        github_token = os.environ["GITHUB_TOKEN"]
+        secret = os.environ["WEBHOOK_SECRET"]
+    except KeyError as ex:
+        LOGGER.error("Environment variable %s must be set", ex)
+        raise ex
+
+    concurrency = action.env_int("FETCH_CONCURRENCY", 1)
+    workers = action.env_int("SERVER_WORKERS", DEFAULT_WORKERS)
+    verification_cache = action.load_cache()
+    # Responses are always cached in memory, and also saved when a path is set
+    response_cache = action.load_response_cache() or httpcache.ResponseCache(
+        max_bytes=action.env_int("RESPONSE_CACHE_SIZE", httpcache.DEFAULT_MAX_SIZE)
+        << 20
+    )
+    backend = action.select_backend()
+    checker = PushChecker(
+        github.GitHubApiClient(
+            github_token,
+            # Each worker can have up to `concurrency` lookups in flight
+            pool_size=concurrency * workers,
+            response_cache=response_cache,
+        ),
+        backend=backend,
+        concurrency=concurrency,
+        lookup=os.environ.get("LOOKUP_BACKEND", "rest").lower(),
+        verification_cache=verification_cache,
+        new_only=action.commit_scope() == "new",
+    )
+    httpd = WebhookServer(
+        ("", action.env_int("SERVER_PORT", DEFAULT_PORT)),
+        secret=secret,
+        process=checker,
+        workers=workers,
+        queue_size=action.env_int("SERVER_QUEUE_SIZE", DEFAULT_QUEUE_SIZE),
+        delivery_history=action.env_int(
+            "SERVER_DELIVERY_HISTORY", DEFAULT_DELIVERY_HISTORY
+        ),
+    )
+
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+
+    with backend:
+        httpd.start()
+        LOGGER.info("Listening for webhooks on port %s", httpd.server_address[1])
+        stopping.wait()
+        LOGGER.info("Shutting down, finishing queued events")
+        finished = httpd.close(
+            action.env_int("SHUTDOWN_TIMEOUT", DEFAULT_SHUTDOWN_TIMEOUT)
+        )
+    if verification_cache:
+        verification_cache.save()
+    if response_cache.path:
+        response_cache.save()
+
+    LOGGER.info("Checked %s events, %s failed", httpd.processed, httpd.failed)
+    metrics.report("Verified commits service")
+    return 0 if finished else 1
+
+
+if __name__ == "__main__":
+    action.configure_logging()
+    with profiling.profile():
+        sys.exit(main())
@@ -0,0 +1,232 @@
+"""Unit tests for the server.py module."""
+import hashlib
+import hmac
+import json
+import threading
+from unittest import mock
+from urllib import error, request
+
+import pytest  # type: ignore
+
+from . import github, server
+
+SECRET = "webhook-test-secret"
+
+
+def make_event(repo="github/repo-name", shas=("hash-1", "hash-2")):
+    """A push event payload."""
+    return {
+        "repository": {"full_name": repo},
+        "commits": [{"id": sha} for sha in shas],
+    }
+
+
+def sign(body: bytes, secret: str = SECRET) -> str:
+    """The `X-Hub-Signature-256` header of a webhook `body`."""
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+@pytest.fixture(name="webhook_server")
+def fixture_webhook_server():
+    """A started webhook server recording the events it processes."""
+    processed = []
+    httpd = server.WebhookServer(
+        ("127.0.0.1", 0), secret=SECRET, process=processed.append, workers=2
+    )
+    httpd.processed_events = processed  # type: ignore
+    httpd.start(poll_interval=0.01)
+    yield httpd
+    httpd.close(timeout=5)
+
+
+def post(httpd, payload, *, event="push", delivery="delivery-1", signature=None):
+    """Post a webhook to `httpd`, returning the status code and response body."""
+    body = json.dumps(payload).encode()
+    req = request.Request(
+        f"http://127.0.0.1:{httpd.server_address[1]}/",
+        data=body,
+        headers={
+            "Content-Type": "application/json",
+            "X-GitHub-Event": event,
+            "X-GitHub-Delivery": delivery,
+            "X-Hub-Signature-256": signature or sign(body),
+        },
+    )
+    try:
+        with request.urlopen(req, timeout=5) as resp:
+            return resp.status, json.load(resp)
+    except error.HTTPError as ex:
+        return ex.code, json.load(ex)
+
+
+@pytest.mark.parametrize(
+    "signature,valid",
+    [
+        (sign(b"body"), True),
+        (sign(b"body", "other-secret"), False),
+        (sign(b"other body"), False),
+        (sign(b"body").replace("sha256=", "sha1="), False),
+        (None, False),
+    ],
+)
+def test_verify_signature(signature, valid):
+    """Test webhook signatures are checked against the secret and body."""
+    assert server.verify_signature(SECRET.encode(), b"body", signature) is valid
+
+
+def test_webhook_server_push(webhook_server):
+    """Test a signed push event is queued and processed."""
+    event = make_event()
+
+    assert post(webhook_server, event) == (202, {"message": "queued"})
+    webhook_server.close(timeout=5)
+
+    assert webhook_server.processed_events == [event]
+    assert webhook_server.processed == 1
+
+
+def test_webhook_server_bad_signature(webhook_server):
+    """Test events with an invalid signature are refused."""
+    status, _ = post(webhook_server, make_event(), signature=sign(b"something else"))
+    webhook_server.close(timeout=5)
+
+    assert status == 401
+    assert not webhook_server.processed_events
+
+
+def test_webhook_server_other_events(webhook_server):
+    """Test events other than pushes are acknowledged but not processed."""
+    status, _ = post(webhook_server, {"zen": "Keep it simple."}, event="ping")
+    webhook_server.close(timeout=5)
+
+    assert status == 202
+    assert not webhook_server.processed_events
+
+
+def test_webhook_server_redelivery(webhook_server):
+    """Test a redelivered event is only processed once."""
+    event = make_event()
+
+    assert post(webhook_server, event)[0] == 202
+    assert post(webhook_server, event) == (200, {"message": "duplicate delivery"})
+    assert post(webhook_server, event, delivery="delivery-2")[0] == 202
+    webhook_server.close(timeout=5)
+
+    assert len(webhook_server.processed_events) == 2
+
+
+def test_webhook_server_backpressure():
+    """Test events are refused while the queue is full, then accepted again."""
+    started = threading.Event()
+    release = threading.Event()
+
+    def process(_):
+        started.set()
+        release.wait(timeout=5)
+
+    httpd = server.WebhookServer(
+        ("127.0.0.1", 0), secret=SECRET, process=process, workers=1, queue_size=1
+    )
+    httpd.start(poll_interval=0.01)
+
+    # The first event is being processed and the second fills the queue
+    assert post(httpd, make_event(), delivery="d1")[0] == 202
+    assert started.wait(timeout=5)
+    assert post(httpd, make_event(), delivery="d2")[0] == 202
+    status, body = post(httpd, make_event(), delivery="d3")
+    assert (status, body) == (503, {"message": "queue full"})
+    # The refused delivery was not recorded, so it is accepted once there is room
+    assert post(httpd, make_event(), delivery="d3")[0] == 503
+
+    release.set()
+    for _ in range(100):
+        if httpd.processed == 2:
+            break
+        threading.Event().wait(0.01)
+    assert post(httpd, make_event(), delivery="d3")[0] == 202
+    assert httpd.close(timeout=5)
+    assert httpd.processed == 3
+
+
+def test_webhook_server_failed_event_can_be_redelivered():
+    """Test a delivery that failed to process is processed again when redelivered."""
+    calls = []
+
+    def process(event):
+        calls.append(event)
+        if len(calls) == 1:
+            raise ValueError("GitHub is down")
+
+    httpd = server.WebhookServer(("127.0.0.1", 0), secret=SECRET, process=process)
+    httpd.start(poll_interval=0.01)
+    post(httpd, make_event())
+    for _ in range(100):
+        if httpd.failed:
+            break
+        threading.Event().wait(0.01)
+    post(httpd, make_event())
+    assert httpd.close(timeout=5)
+
+    assert len(calls) == 2
+    assert (httpd.processed, httpd.failed) == (1, 1)
+
+
+def test_webhook_server_close_timeout():
+    """Test close gives up waiting for events that take too long."""
+    release = threading.Event()
+    httpd = server.WebhookServer(
+        ("127.0.0.1", 0),
+        secret=SECRET,
+        process=lambda _: release.wait(timeout=5),
+        workers=1,
+    )
+    httpd.start(poll_interval=0.01)
+    post(httpd, make_event())
+
+    assert not httpd.close(timeout=0.1)
+    release.set()
+
+
+def test_push_checker():
+    """Test a push event's unverified commits are sent to the backend by author."""
+    client = mock.MagicMock(token="github-test-token")
+    client.get_commit.side_effect = lambda repo, sha: github.Commit(
+        sha=sha, html_url=f"url-{sha}", author="author", verified=sha == "hash-1"
+    )
+    backend = mock.Mock()
+
+    server.PushChecker(client, backend=backend)(make_event())
+
+    backend.assert_called_once()
+    grouped = backend.call_args.kwargs["grouped_commits"]
+    assert [commit.sha for commit in grouped["author"]] == ["hash-2"]
+    assert backend.call_args.kwargs["repo"] == "github/repo-name"
+
+
+def test_push_checker_new_only():
+    """Test commits that are not distinct are not checked with `new_only`."""
+    looked_up = []
+
+    def get_commit(repo, sha):  # pylint: disable=unused-argument
+        looked_up.append(sha)
+        return github.Commit(
+            sha=sha, html_url=f"url-{sha}", author="author", verified=False
+        )
+
+    client = mock.MagicMock(token="github-test-token")
+    client.get_commit.side_effect = get_commit
+    backend = mock.Mock()
+    event = make_event()
+    event["commits"][0]["distinct"] = False
+
+    server.PushChecker(client, backend=backend, new_only=True)(event)
+
+    assert looked_up == ["hash-2"]
+    grouped = backend.call_args.kwargs["grouped_commits"]
+    assert [commit.sha for commit in grouped["author"]] == ["hash-2"]
+
+
+def test_push_checker_local_lookup():
+    """Test the local lookup backend cannot be used by the service."""
+    with pytest.raises(ValueError):
+        server.PushChecker(mock.MagicMock(), backend=mock.Mock(), lookup="local")
@@ -0,0 +1,74 @@
+"""
+Files kept between runs: caches and audit checkpoints.
+
+Every file is written atomically, to a temporary file in the same directory that then
+replaces it, so an interrupted run never leaves a truncated file behind. Caches are
+gzipped JSON documents holding a format `version` and a list of `entries`, and a
+missing, unreadable or outdated cache loads as empty so a broken cache never fails the
+check.
+"""
+import gzip
+import json
+import logging
+import os
+import tempfile
+from typing import Any, IO, List, cast
+
+LOGGER = logging.getLogger(__name__)
+
+
+def open_json(path: str, mode: str, *, compressed: bool) -> IO[str]:
+    """Open the JSON file at `path` as text, gzipped if `compressed`."""
+    if compressed:
+        return cast(IO[str], gzip.open(path, f"{mode}t", encoding="utf-8"))
+    return open(path, mode, encoding="utf-8")  # pylint: disable=consider-using-with
+
+
+def load_json(path: str, *, compressed: bool = False) -> Any:
+    """Load the JSON document at `path`, gzipped if `compressed`."""
+    with open_json(path, "r", compressed=compressed) as file:
+        return json.load(file)
+
+
+def save_json(path: str, data: Any, *, compressed: bool = False):
+    """Atomically write `data` as a JSON document to `path`, gzipped if `compressed`."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(handle)
+    try:
+        with open_json(temp_path, "w", compressed=compressed) as file:
+            json.dump(data, file, separators=(",", ":"))
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def load_entries(path: str, *, version: int, kind: str) -> List[Any]:
+    """
+    Load the entries of the `kind` cache at `path`, an empty list if the file is
+    missing, unreadable or has a format other than `version`.
+    """
+    try:
+        data = load_json(path, compressed=True)
+    except FileNotFoundError:
+        LOGGER.debug("No %s at %s, starting empty", kind, path)
+        return []
+    except (OSError, ValueError) as ex:
+        LOGGER.warning("Ignoring unreadable %s %s: %s", kind, path, ex)
+        return []
+
+    if not isinstance(data, dict) or data.get("version") != version:
+        LOGGER.warning("Ignoring %s %s with unknown version", kind, path)
+        return []
+    entries = data.get("entries", [])
+    if not isinstance(entries, list):
+        LOGGER.warning("Ignoring malformed %s %s", kind, path)
+        return []
+    return entries
+
+
+def save_entries(path: str, entries: List[Any], *, version: int):
+    """Atomically write `entries` to the cache at `path` with the format `version`."""
+    save_json(path, {"version": version, "entries": entries}, compressed=True)
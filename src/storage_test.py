@@ -0,0 +1,61 @@
+"""Unit tests for the storage.py module."""
+import gzip
+import json
+from unittest import mock
+
+import pytest  # type: ignore
+
+from . import storage
+
+
+@pytest.mark.parametrize("compressed", [True, False])
+def test_save_and_load_json(tmp_path, compressed):
+    """Test a saved JSON document loads back, creating missing directories."""
+    path = str(tmp_path / "nested" / "data.json")
+    storage.save_json(path, {"key": ["value"]}, compressed=compressed)
+
+    assert storage.load_json(path, compressed=compressed) == {"key": ["value"]}
+    assert [item.name for item in (tmp_path / "nested").iterdir()] == ["data.json"]
+
+
+def test_save_json_failure(tmp_path):
+    """Test a failed save keeps the previous file and leaves no temporary file."""
+    path = tmp_path / "data.json"
+    storage.save_json(str(path), {"saved": True})
+
+    with mock.patch("src.storage.json.dump", side_effect=KeyboardInterrupt):
+        with pytest.raises(KeyboardInterrupt):
+            storage.save_json(str(path), {"saved": False})
+
+    assert storage.load_json(str(path)) == {"saved": True}
+    assert [item.name for item in tmp_path.iterdir()] == ["data.json"]
+
+
+def test_load_entries(tmp_path):
+    """Test the entries of a cache with the expected version are loaded."""
+    path = str(tmp_path / "cache.json.gz")
+    storage.save_entries(path, [["a", 1]], version=2)
+
+    assert storage.load_entries(path, version=2, kind="test cache") == [["a", 1]]
+    assert not storage.load_entries(path, version=1, kind="test cache")
+
+
+@pytest.mark.parametrize(
+    "content",
+    [b"not gzip", gzip.compress(b"not json"), gzip.compress(b'{"version": 1}')],
+)
+def test_load_entries_unreadable(tmp_path, content):
+    """Test a missing, unreadable or empty cache loads no entries."""
+    path = tmp_path / "cache.json.gz"
+    assert not storage.load_entries(str(path), version=1, kind="test cache")
+
+    path.write_bytes(content)
+    assert not storage.load_entries(str(path), version=1, kind="test cache")
+
+
+def test_load_entries_malformed(tmp_path):
+    """Test a cache whose entries are not a list loads no entries."""
+    path = tmp_path / "cache.json.gz"
+    path.write_bytes(gzip.compress(json.dumps({"version": 1, "entries": 5}).encode()))
+
+    assert not storage.load_entries(str(path), version=1, kind="test cache")
@@ -0,0 +1,366 @@
+"""
+HTTP transports used to talk to the GitHub API and messenger webhooks.
+
+The `HTTP_TRANSPORT` environment variable selects the transport. `requests` (the
+default) uses a pooled `requests.Session`, and `stdlib` uses `StdlibSession`, a small
+keep-alive session built on `http.client` with no third party dependencies.
+
+`requests` is only imported when a `requests` session is created, so with the
+`stdlib` transport it is never imported at all, which shortens the action's cold start.
+"""
+import gzip
+import http.client
+import json
+import os
+import socket
+import ssl
+import sys
+import threading
+from typing import Any, Dict, List, Mapping, Optional, Protocol, Tuple, Type
+from urllib import parse
+
+# Default maximum number of kept-alive connections per host
+DEFAULT_POOL_SIZE = 10
+# Maximum number of redirects followed for a single request
+MAX_REDIRECTS = 5
+
+# Errors worth retrying from the `stdlib` transport: dropped connections and timeouts
+STDLIB_TRANSIENT_ERRORS: Tuple[Type[BaseException], ...] = (
+    ConnectionError,
+    socket.timeout,
+    http.client.RemoteDisconnected,
+    http.client.IncompleteRead,
+)
+
+# A pooled connection's `(scheme, host, port)`
+ConnectionKey = Tuple[str, str, int]
+
+
+class Response(Protocol):
+    """The parts of an HTTP response used by the action, from either transport."""
+
+    @property
+    def status_code(self) -> int:
+        """The HTTP status code of the response."""
+
+    @property
+    def headers(self) -> Mapping[str, str]:
+        """The response headers, with case insensitive names."""
+
+    @property
+    def content(self) -> bytes:
+        """The response body."""
+
+    @property
+    def text(self) -> str:
+        """The response body decoded to text."""
+
+    @property
+    def links(self) -> Dict[str, Dict[str, str]]:
+        """The links in the response's `Link` header, keyed by `rel`."""
+
+    def json(self) -> Any:
+        """The response body decoded from JSON."""
+
+    def raise_for_status(self) -> None:
+        """Raise an error if the response has a 4xx or 5xx status code."""
+
+
+class HTTPError(Exception):
+    """An HTTP response with a 4xx or 5xx status code from `StdlibSession`."""
+
+    def __init__(self, message: str, response: "StdlibResponse"):
+        super().__init__(message)
+        self.response = response
+
+
+class Headers(dict):
+    """Response headers, looked up by case insensitive name."""
+
+    def __init__(self, items: List[Tuple[str, str]]):
+        super().__init__((name.lower(), value) for name, value in items)
+
+    def __getitem__(self, name: str) -> str:
+        return super().__getitem__(name.lower())
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and super().__contains__(name.lower())
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return super().get(name.lower(), default)
+
+
+class StdlibResponse:
+    """A fully read HTTP response from `StdlibSession`."""
+
+    def __init__(self, *, status_code: int, headers: Headers, content: bytes, url: str):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+
+    @property
+    def text(self) -> str:
+        """The response body decoded with the charset of its `Content-Type`."""
+        message = http.client.HTTPMessage()
+        message["Content-Type"] = self.headers.get("Content-Type", "")
+        charset = message.get_content_charset() or "utf-8"
+        return self.content.decode(charset, errors="replace")
+
+    @property
+    def links(self) -> Dict[str, Dict[str, str]]:
+        """The links in the response's `Link` header, keyed by `rel`."""
+        return parse_links(self.headers.get("Link", ""))
+
+    def json(self) -> Any:
+        """The response body decoded from JSON."""
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        """Raise `HTTPError` if the response has a 4xx or 5xx status code."""
+        if self.status_code >= 400:
+            kind = "Client" if self.status_code < 500 else "Server"
+            raise HTTPError(
+                f"{self.status_code} {kind} Error for url: {self.url}", response=self
+            )
+
+
+class StdlibSession:
+    """
+    A minimal keep-alive HTTP session built on `http.client`.
+
+    Up to `pool_size` idle connections are kept open per host and reused by later
+    requests, which may come from several threads. Request bodies can be given as
+    `json`, responses are gzip compressed when the server supports it, and redirects
+    are followed.
+    """
+
+    def __init__(self, *, pool_size: int = DEFAULT_POOL_SIZE):
+        self.pool_size = max(1, pool_size)
+        self.headers: Dict[str, str] = {}
+
+        self._idle: Dict[ConnectionKey, List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self._ssl_context: Optional[ssl.SSLContext] = None
+
+    def request(  # pylint: disable=too-many-arguments
+        self,
+        method: str,
+        url: str,
+        *,
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        json: Any = None,  # pylint: disable=redefined-outer-name
+        timeout: Optional[float] = None,
+    ) -> StdlibResponse:
+        """Perform a HTTP request, following any redirects."""
+        if params:
+            url = add_params(url, params)
+
+        body = None
+        request_headers = {"Accept-Encoding": "gzip", **self.headers, **(headers or {})}
+        if json is not None:
+            body = dumps(json)
+            request_headers["Content-Type"] = "application/json"
+
+        for _ in range(MAX_REDIRECTS):
+            response = self.send(method, url, body, request_headers, timeout)
+            location = response.headers.get("Location")
+            if response.status_code not in (301, 302, 303, 307, 308) or not location:
+                return response
+
+            next_url = parse.urljoin(url, location)
+            if parse.urlsplit(next_url).netloc != parse.urlsplit(url).netloc:
+                # Like `requests`, never send credentials to another host
+                request_headers.pop("Authorization", None)
+            if response.status_code == 303 or (
+                response.status_code in (301, 302) and method == "POST"
+            ):
+                method, body = "GET", None
+                request_headers.pop("Content-Type", None)
+            url = next_url
+
+        raise http.client.HTTPException(f"Exceeded {MAX_REDIRECTS} redirects")
+
+    def post(self, url: str, **kwargs) -> StdlibResponse:
+        """Perform a HTTP POST request."""
+        return self.request("POST", url, **kwargs)
+
+    def send(  # pylint: disable=too-many-arguments
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+        headers: Dict[str, str],
+        timeout: Optional[float],
+    ) -> StdlibResponse:
+        """
+        Send a single request over a pooled connection and read the whole response.
+
+        A kept-alive connection may have been closed by the server while it was idle,
+        so a request that fails on a reused connection is retried once on a new one.
+        """
+        parts = parse.urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += f"?{parts.query}"
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        key = (parts.scheme, parts.hostname or "", port)
+
+        while True:
+            connection, reused = self.checkout(key, timeout)
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                raw = connection.getresponse()
+                content = raw.read()
+            except (
+                http.client.RemoteDisconnected,
+                ConnectionResetError,
+                BrokenPipeError,
+            ):
+                connection.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                connection.close()
+                raise
+            break
+
+        if raw.will_close:
+            connection.close()
+        else:
+            self.checkin(key, connection)
+
+        response_headers = Headers(raw.getheaders())
+        if response_headers.get("Content-Encoding") == "gzip":
+            content = gzip.decompress(content)
+        return StdlibResponse(
+            status_code=raw.status, headers=response_headers, content=content, url=url
+        )
+
+    def checkout(
+        self, key: ConnectionKey, timeout: Optional[float]
+    ) -> Tuple[http.client.HTTPConnection, bool]:
+        """
+        Take an idle connection to `key` from the pool, or open a new one.
+
+        Returns the connection and whether it was reused.
+        """
+        with self._lock:
+            idle = self._idle.get(key)
+            connection = idle.pop() if idle else None
+
+        if connection is not None:
+            connection.timeout = timeout
+            if connection.sock is not None:
+                connection.sock.settimeout(timeout)
+            return connection, True
+
+        scheme, host, port = key
+        if scheme == "https":
+            return (
+                http.client.HTTPSConnection(
+                    host, port, timeout=timeout, context=self.ssl_context()
+                ),
+                False,
+            )
+        return http.client.HTTPConnection(host, port, timeout=timeout), False
+
+    def checkin(self, key: ConnectionKey, connection: http.client.HTTPConnection):
+        """Return a connection to the pool, closing it if the pool is full."""
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.pool_size:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def ssl_context(self) -> ssl.SSLContext:
+        """Get the TLS context shared by the session's connections."""
+        with self._lock:
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            return self._ssl_context
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+def transient_errors() -> Tuple[Type[BaseException], ...]:
+    """
+    The errors worth retrying from either transport, connection errors and timeouts.
+
+    Errors in the request itself, like an invalid URL or a certificate that does not
+    verify, are not retried. `requests`' errors are only included once it is imported.
+    """
+    requests = sys.modules.get("requests")
+    if requests is None:
+        return STDLIB_TRANSIENT_ERRORS
+    return STDLIB_TRANSIENT_ERRORS + (requests.ConnectionError, requests.Timeout)
+
+
+def new_session(*, pool_size: int = DEFAULT_POOL_SIZE) -> Any:
+    """
+    Create a session of the transport selected by the `HTTP_TRANSPORT` environment
+    variable, keeping up to `pool_size` connections alive per host.
+
+    Returns a `requests.Session` or a `StdlibSession`, which both provide the
+    `headers`, `request` and `post` used by the action.
+    """
+    kind = os.environ.get("HTTP_TRANSPORT", "requests").lower()
+    if kind == "stdlib":
+        return StdlibSession(pool_size=pool_size)
+    if kind == "requests":
+        return requests_session(pool_size=pool_size)
+    raise ValueError(f"Unknown HTTP transport {kind}")
+
+
+def requests_session(*, pool_size: int = DEFAULT_POOL_SIZE) -> Any:
+    """Create a pooled `requests.Session`, importing `requests` on first use."""
+    # pylint: disable=import-outside-toplevel
+    import requests
+    import requests.adapters
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def add_params(url: str, params: Dict[str, str]) -> str:
+    """Add the query `params` to `url`."""
+    parts = parse.urlsplit(url)
+    query = parse.urlencode(params)
+    if parts.query:
+        query = f"{parts.query}&{query}"
+    return parse.urlunsplit(parts._replace(query=query))
+
+
+def dumps(body: Any) -> bytes:
+    """Encode a JSON request body."""
+    return json.dumps(body).encode()
+
+
+def parse_links(header: str) -> Dict[str, Dict[str, str]]:
+    """Parse a `Link` header into its links keyed by `rel`, like `requests` does."""
+    links = {}
+    for value in header.split(","):
+        url, _, params = value.partition(";")
+        url = url.strip().strip("<>")
+        if not url:
+            continue
+
+        link = {"url": url}
+        for param in params.split(";"):
+            name, _, param_value = param.partition("=")
+            if name.strip():
+                link[name.strip()] = param_value.strip().strip("'\"")
+        links[link.get("rel") or url] = link
+    return links
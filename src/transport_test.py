@@ -0,0 +1,216 @@
+"""Unit tests for the transport.py module."""
+import gzip
+import json
+import os
+import threading
+from http import server
+from unittest import mock
+
+import pytest  # type: ignore
+
+from . import github, transport
+
+
+class Handler(server.BaseHTTPRequestHandler):
+    """Record each request and reply with the response set up by the test."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handle a GET request."""
+        self.reply()
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handle a POST request."""
+        self.reply()
+
+    def reply(self):
+        """Record the request and send the next response."""
+        length = int(self.headers.get("Content-Length") or 0)
+        self.server.requests.append(  # type: ignore
+            {
+                "method": self.command,
+                "path": self.path,
+                "headers": dict(self.headers),
+                "body": self.rfile.read(length),
+                "client_port": self.client_address[1],
+            }
+        )
+        status, headers, body = self.server.responses.pop(0)  # type: ignore
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if self.server.drop_connections:  # type: ignore
+            # Close the connection without telling the client, like an idle timeout
+            self.close_connection = True
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keep the test output quiet."""
+
+
+@pytest.fixture(name="http_server")
+def fixture_http_server():
+    """A local HTTP server replying with the responses queued in `responses`."""
+    httpd = server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.requests = []  # type: ignore
+    httpd.responses = []  # type: ignore
+    httpd.drop_connections = False  # type: ignore
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"  # type: ignore
+    thread = threading.Thread(
+        target=httpd.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def json_response(body, status=200, **headers):
+    """A queued JSON response."""
+    return (
+        status,
+        {"Content-Type": "application/json", **headers},
+        json.dumps(body).encode(),
+    )
+
+
+@pytest.mark.parametrize("kind", ["stdlib", "requests"])
+def test_new_session(kind):
+    """Test new_session creates a session of the transport set in the environment."""
+    with mock.patch.dict(os.environ, {"HTTP_TRANSPORT": kind}):
+        session = transport.new_session(pool_size=4)
+
+    if kind == "stdlib":
+        assert isinstance(session, transport.StdlibSession)
+        assert session.pool_size == 4
+    else:
+        adapter = session.get_adapter("https://api.github.com")
+        assert adapter._pool_maxsize == 4  # pylint: disable=protected-access
+
+
+def test_new_session_unknown():
+    """Test new_session fails correctly for an unknown transport."""
+    with mock.patch.dict(os.environ, {"HTTP_TRANSPORT": "carrier-pigeon"}):
+        with pytest.raises(ValueError):
+            transport.new_session()
+
+
+def test_stdlib_session_request(http_server):
+    """Test a request sends the session and request headers, params and JSON body."""
+    http_server.responses.append(json_response({"ok": True}))
+    session = transport.StdlibSession()
+    session.headers.update({"Authorization": "token test"})
+
+    response = session.post(
+        f"{http_server.url}/path?a=1",
+        params={"b": "2"},
+        headers={"X-Test": "yes"},
+        json={"text": "message"},
+        timeout=5,
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
+    assert response.headers["content-type"] == "application/json"
+    request = http_server.requests[0]
+    assert request["method"] == "POST"
+    assert request["path"] == "/path?a=1&b=2"
+    assert request["headers"]["Authorization"] == "token test"
+    assert request["headers"]["X-Test"] == "yes"
+    assert json.loads(request["body"]) == {"text": "message"}
+
+
+def test_stdlib_session_keep_alive(http_server):
+    """Test requests reuse a kept-alive connection."""
+    http_server.responses += [json_response({}), json_response({})]
+    session = transport.StdlibSession()
+
+    session.request("GET", f"{http_server.url}/first", timeout=5)
+    session.request("GET", f"{http_server.url}/second", timeout=5)
+
+    first, second = http_server.requests
+    assert first["client_port"] == second["client_port"]
+
+
+def test_stdlib_session_stale_connection(http_server):
+    """Test a request on a connection closed by the server is retried on a new one."""
+    http_server.drop_connections = True
+    http_server.responses += [json_response({}), json_response({"second": True})]
+    session = transport.StdlibSession()
+
+    session.request("GET", f"{http_server.url}/first", timeout=5)
+    response = session.request("GET", f"{http_server.url}/second", timeout=5)
+
+    assert response.json() == {"second": True}
+    first, second = http_server.requests
+    assert first["client_port"] != second["client_port"]
+
+
+def test_stdlib_session_gzip(http_server):
+    """Test gzip compressed responses are decompressed."""
+    body = gzip.compress(json.dumps({"compressed": True}).encode())
+    http_server.responses.append((200, {"Content-Encoding": "gzip"}, body))
+
+    response = transport.StdlibSession().request("GET", http_server.url, timeout=5)
+
+    assert response.json() == {"compressed": True}
+    assert http_server.requests[0]["headers"]["Accept-Encoding"] == "gzip"
+
+
+def test_stdlib_session_redirect(http_server):
+    """Test redirects are followed."""
+    http_server.responses += [
+        (301, {"Location": "/moved"}, b""),
+        json_response({"moved": True}),
+    ]
+
+    response = transport.StdlibSession().request("GET", f"{http_server.url}/old")
+
+    assert response.json() == {"moved": True}
+    assert [request["path"] for request in http_server.requests] == ["/old", "/moved"]
+
+
+def test_stdlib_response_raise_for_status(http_server):
+    """Test raise_for_status raises for error status codes."""
+    http_server.responses.append(json_response({"message": "Not Found"}, status=404))
+
+    response = transport.StdlibSession().request("GET", http_server.url)
+
+    with pytest.raises(transport.HTTPError) as ex:
+        response.raise_for_status()
+    assert ex.value.response.status_code == 404
+    assert "Not Found" in response.text
+
+
+def test_parse_links():
+    """Test parse_links parses a GitHub pagination `Link` header."""
+    header = (
+        '<https://api.github.com/x?page=2>; rel="next", '
+        '<https://api.github.com/x?page=5>; rel="last"'
+    )
+    assert transport.parse_links(header) == {
+        "next": {"url": "https://api.github.com/x?page=2", "rel": "next"},
+        "last": {"url": "https://api.github.com/x?page=5", "rel": "last"},
+    }
+    assert not transport.parse_links("")
+
+
+def test_github_api_client_stdlib_transport(http_server):
+    """Test `GitHubApiClient` follows pagination over the stdlib transport."""
+    next_page = f'<{http_server.url}/items?page=2>; rel="next"'
+    http_server.responses += [
+        json_response([1, 2], Link=next_page),
+        json_response([3]),
+    ]
+
+    with mock.patch.dict(os.environ, {"HTTP_TRANSPORT": "stdlib"}):
+        client = github.GitHubApiClient("github-test-token")
+    client.base_url = http_server.url
+
+    assert list(client.get_pages("/items")) == [[1, 2], [3]]
+    assert http_server.requests[0]["headers"]["Authorization"] == (
+        "token github-test-token"
+    )